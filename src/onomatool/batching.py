@@ -0,0 +1,131 @@
+"""
+Pack small text files into batch LLM requests.
+
+For trees of many tiny notes the per-request overhead (system prompt, user
+prompt, round trip) dwarfs the content. `SuggestionBatcher` collects the
+extracted content of small files until the next one would exceed the token
+budget, then names the whole batch with one `get_batch_suggestions` call and
+hands each file's suggestions to a callback.
+"""
+
+from onomatool.budget import DEADLINE
+from onomatool.llm_integration import get_batch_suggestions
+from onomatool.usage import LEDGER
+
+# Upper bound on files per request, keeps responses well inside output limits
+MAX_BATCH_FILES = 20
+
+# Prompt tokens added per file for its id tags
+PER_FILE_OVERHEAD_TOKENS = 12
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (4 characters per token) used for packing."""
+    return len(text) // 4 + 1
+
+
+class SuggestionBatcher:
+    """
+    Accumulate small files and name them in batches.
+
+    Args:
+        config: The configuration dictionary
+        token_budget: Maximum estimated content tokens per batch request. A file
+            is batched only if it uses at most a quarter of the budget.
+        handle_result: Called with (file_path, suggestions) for every file
+        verbose_level: Verbosity level passed to the LLM calls
+        max_files: Maximum files per batch request
+        handle_failure: Called with (file_path, error) for every file whose
+            naming failed (all files of the batch if the batch call itself
+            failed). Without it, the failed files stay queued and the first
+            error is raised once the others have been handed to handle_result.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        token_budget: int,
+        handle_result,
+        verbose_level: int = 0,
+        max_files: int = MAX_BATCH_FILES,
+        handle_failure=None,
+    ):
+        self.config = config
+        self.token_budget = token_budget
+        self.max_item_tokens = token_budget // 4
+        self.handle_result = handle_result
+        self.verbose_level = verbose_level
+        self.max_files = max_files
+        self.handle_failure = handle_failure
+        self.batches = 0
+        self._items: list[tuple[str, str]] = []
+        self._tokens = 0
+
+    def add(self, file_path: str, content: str) -> bool:
+        """
+        Queue a file for batching.
+
+        Returns:
+            False if the file is too large to batch and must be named on its own.
+        """
+        tokens = estimate_tokens(content) + PER_FILE_OVERHEAD_TOKENS
+        if tokens > self.max_item_tokens:
+            return False
+        if self._items and self._tokens + tokens > self.token_budget:
+            self.flush()
+        self._items.append((file_path, content))
+        self._tokens += tokens
+        if len(self._items) >= self.max_files:
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        """Name all queued files and pass their suggestions to the callback."""
+        if not self._items:
+            return
+        items, self._items, self._tokens = self._items, [], 0
+        current_file = LEDGER.current_file
+        deadline = DEADLINE.file_path, DEADLINE.expires_at
+        # The batch call belongs to no single file, nor to its deadline
+        LEDGER.current_file = None
+        DEADLINE.clear()
+        failed: list[tuple[str, Exception]] = []
+        try:
+            results = get_batch_suggestions(
+                items,
+                verbose_level=self.verbose_level,
+                config=self.config,
+                handle_failure=lambda file_path, err: failed.append((file_path, err)),
+            )
+            self.batches += 1
+        except Exception as err:
+            results = {}
+            failed = [(file_path, err) for file_path, _ in items]
+        finally:
+            LEDGER.current_file = current_file
+            DEADLINE.file_path, DEADLINE.expires_at = deadline
+        for file_path, _ in items:
+            suggestions = results.get(file_path)
+            if suggestions:
+                self.handle_result(file_path, suggestions)
+        if not failed:
+            return
+        if self.handle_failure is None:
+            failed_paths = {file_path for file_path, _ in failed}
+            self._items = [
+                item for item in items if item[0] in failed_paths
+            ] + self._items
+            self._tokens = sum(
+                estimate_tokens(content) + PER_FILE_OVERHEAD_TOKENS
+                for _, content in self._items
+            )
+            raise failed[0][1]
+        for file_path, err in failed:
+            self.handle_failure(file_path, err)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, file_path: str) -> bool:
+        """Whether a file is queued and not yet named."""
+        return any(path == file_path for path, _ in self._items)
@@ -0,0 +1,359 @@
+"""
+End-to-end throughput benchmark (`onomatool-bench`).
+
+Generates a synthetic corpus (text, PDF, SVG, DOCX and images), starts the local
+stub server from `onomatool.testing` with the requested latency profile and runs
+`cli.main` over the corpus through the real OpenAI client path. Reports
+files/sec, per-file latency percentiles, peak RSS and LLM calls per file.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import toml
+
+from onomatool import cli
+from onomatool.profiling import percentile
+from onomatool.testing import StubServer
+
+CORPUS_TYPES = ("text", "pdf", "svg", "docx", "image")
+
+_PARAGRAPH = (
+    "Quarterly planning notes for the platform team covering hiring, budget, "
+    "vendor contracts and the migration of the reporting pipeline. "
+)
+
+
+def _write_text(path: str, index: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# Meeting notes {index}\n\n" + _PARAGRAPH * (5 + index % 20))
+
+
+def _write_pdf(path: str, index: int) -> None:
+    import fitz
+
+    doc = fitz.open()
+    for page_num in range(1 + index % 3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Report {index} page {page_num + 1}")
+        page.insert_textbox(fitz.Rect(72, 100, 520, 760), _PARAGRAPH * 6)
+    doc.save(path)
+    doc.close()
+
+
+def _write_svg(path: str, index: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            '<svg xmlns="http://www.w3.org/2000/svg" width="400" height="200">'
+            f'<rect width="400" height="200" fill="#{index * 2654435761 % 0xFFFFFF:06x}"/>'
+            f'<text x="20" y="100" font-size="32">Diagram {index}</text></svg>'
+        )
+
+
+def _write_docx(path: str, index: int) -> None:
+    # Minimal WordprocessingML package; avoids a python-docx dependency
+    body = "".join(
+        f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+        for text in (f"Proposal {index}", _PARAGRAPH * 4)
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>",
+        )
+        z.writestr(
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+            "</Relationships>",
+        )
+        z.writestr(
+            "word/document.xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body>{body}</w:body></w:document>",
+        )
+
+
+def _write_image(path: str, index: int) -> None:
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (640, 480), color=(index * 37 % 256, 120, 200))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((50 + index % 100, 50, 300, 300), fill=(255, 255, 255))
+    img.save(path, format="PNG")
+
+
+_WRITERS = {
+    "text": (".md", _write_text),
+    "pdf": (".pdf", _write_pdf),
+    "svg": (".svg", _write_svg),
+    "docx": (".docx", _write_docx),
+    "image": (".png", _write_image),
+}
+
+
+def generate_corpus(directory: str, files_per_type: int, types=CORPUS_TYPES):
+    """
+    Write a synthetic corpus into a directory.
+
+    Returns:
+        List of generated file paths
+    """
+    paths = []
+    for corpus_type in types:
+        ext, writer = _WRITERS[corpus_type]
+        for index in range(files_per_type):
+            path = os.path.join(directory, f"{corpus_type}_{index:05d}{ext}")
+            writer(path, index)
+            paths.append(path)
+    return paths
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (0 where it is unavailable)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(
+    files_per_type: int = 10,
+    types=CORPUS_TYPES,
+    latency: float | str = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    token_latency: float = 0.0,
+    naming_convention: str = "snake_case",
+    extra_args: list[str] | None = None,
+    quiet: bool = True,
+) -> dict:
+    """
+    Run `cli.main` over a synthetic corpus against the stub server.
+
+    Returns:
+        Report dict with throughput, latency, memory and call statistics
+    """
+    with tempfile.TemporaryDirectory(prefix="onoma_bench_") as workdir:
+        corpus_dir = os.path.join(workdir, "corpus")
+        os.mkdir(corpus_dir)
+        files = generate_corpus(corpus_dir, files_per_type, types)
+
+        per_file = {}
+        named = set()
+        original_process_file = cli.process_file
+
+        def timed_process_file(file_path, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                final_name = original_process_file(file_path, *args, **kwargs)
+                if final_name:
+                    named.add(file_path)
+                return final_name
+            finally:
+                per_file[file_path] = time.perf_counter() - start
+
+        with StubServer(
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            rate_limit_rate=rate_limit_rate,
+            retry_after=0.1,
+            token_latency=token_latency,
+        ) as server:
+            config_path = os.path.join(workdir, "bench.toml")
+            with open(config_path, "w") as f:
+                toml.dump(
+                    {
+                        "default_provider": "openai",
+                        "openai_base_url": server.url,
+                        "openai_api_key": "bench",
+                        "llm_model": "stub-model",
+                        "naming_convention": naming_convention,
+                    },
+                    f,
+                )
+            argv = [os.path.join(corpus_dir, "*"), "--config", config_path, "--dry-run"]
+            argv.extend(extra_args or [])
+            cli.process_file = timed_process_file
+            devnull = open(os.devnull, "w")
+            stdout = sys.stdout
+            if quiet:
+                sys.stdout = devnull
+            start = time.perf_counter()
+            try:
+                exit_code = cli.main(argv)
+            finally:
+                elapsed = time.perf_counter() - start
+                sys.stdout = stdout
+                devnull.close()
+                cli.process_file = original_process_file
+            requests = server.request_count
+            errors = server.error_count + server.rate_limited_count
+
+    latencies = list(per_file.values())
+    by_type = {}
+    for corpus_type in types:
+        ext = _WRITERS[corpus_type][0]
+        type_latencies = [t for p, t in per_file.items() if p.endswith(ext)]
+        by_type[corpus_type] = {
+            "files": len(type_latencies),
+            "named": sum(1 for p in named if p.endswith(ext)),
+            "p50_s": percentile(type_latencies, 50),
+            "p95_s": percentile(type_latencies, 95),
+        }
+    return {
+        "exit_code": exit_code,
+        "files": len(files),
+        "processed": len(per_file),
+        "named": len(named),
+        "elapsed_s": elapsed,
+        "files_per_sec": len(per_file) / elapsed if elapsed else 0.0,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "mean_s": statistics.fmean(latencies) if latencies else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "llm_calls": requests,
+        "llm_errors": errors,
+        "calls_per_file": requests / len(per_file) if per_file else 0.0,
+        "by_type": by_type,
+        "settings": {
+            "files_per_type": files_per_type,
+            "types": list(types),
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+            "rate_limit_rate": rate_limit_rate,
+            "token_latency": token_latency,
+        },
+    }
+
+
+def format_report(report: dict) -> str:
+    """Render a benchmark report as a plain-text table."""
+    lines = [
+        f"Files:            {report['processed']}/{report['files']} "
+        f"({report['named']} named)",
+        f"Elapsed:          {report['elapsed_s']:.2f}s",
+        f"Throughput:       {report['files_per_sec']:.2f} files/sec",
+        f"Latency p50/p95:  {report['p50_s'] * 1000:.1f}ms / {report['p95_s'] * 1000:.1f}ms",
+        f"Peak RSS:         {report['peak_rss_mb']:.1f} MiB",
+        f"LLM calls:        {report['llm_calls']} ({report['llm_errors']} errors)",
+        f"Calls per file:   {report['calls_per_file']:.2f}",
+        "",
+        f"{'type':<8}{'files':>7}{'named':>7}{'p50 ms':>10}{'p95 ms':>10}",
+    ]
+    for corpus_type, stats in report["by_type"].items():
+        lines.append(
+            f"{corpus_type:<8}{stats['files']:>7}{stats['named']:>7}"
+            f"{stats['p50_s'] * 1000:>10.1f}{stats['p95_s'] * 1000:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="onomatool-bench",
+        description="Benchmark onomatool end to end against a local stub LLM server",
+    )
+    parser.add_argument(
+        "-n",
+        "--files-per-type",
+        type=int,
+        default=10,
+        help="Number of synthetic files per type (default: 10)",
+    )
+    parser.add_argument(
+        "-t",
+        "--types",
+        default=",".join(CORPUS_TYPES),
+        help=f"Comma-separated corpus types (default: {','.join(CORPUS_TYPES)})",
+    )
+    parser.add_argument(
+        "--latency",
+        default="0.05",
+        help=(
+            "Mean LLM latency in seconds, or a distribution such as "
+            "'lognormal:0.4,0.3' (default: 0.05)"
+        ),
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="LLM latency std deviation"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of LLM requests answered with HTTP 500",
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of LLM requests answered with HTTP 429 and Retry-After",
+    )
+    parser.add_argument(
+        "--token-latency",
+        type=float,
+        default=0.0,
+        help="LLM generation time per completion token in seconds",
+    )
+    parser.add_argument(
+        "--naming-convention", default="snake_case", help="Naming convention to use"
+    )
+    parser.add_argument("--json", metavar="FILE", help="Also write the report as JSON")
+    args = parser.parse_args(args)
+
+    types = [t.strip() for t in args.types.split(",") if t.strip()]
+    unknown = set(types) - set(CORPUS_TYPES)
+    if unknown:
+        parser.error(f"unknown corpus types: {', '.join(sorted(unknown))}")
+
+    try:
+        latency = float(args.latency)
+    except ValueError:
+        latency = args.latency
+    report = run_benchmark(
+        files_per_type=args.files_per_type,
+        types=types,
+        latency=latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        token_latency=args.token_latency,
+        naming_convention=args.naming_convention,
+    )
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["exit_code"] == 0 else 1
+
+
+def console_script():
+    """Entry point for console_scripts."""
+    sys.exit(main())
+
+
+if __name__ == "__main__":
+    console_script()
@@ -0,0 +1,290 @@
+"""
+Timeouts, per-file deadlines and run-wide limits.
+
+Every LLM call and external conversion (soffice, ImageMagick) gets a timeout
+from `call_timeout()`: the configured per-call timeout, shortened to whatever is
+left of the current file's deadline (`file_deadline` seconds covering
+extraction and all LLM calls for one file). Once the deadline has passed, new
+calls raise `DeadlineExceeded` and the run moves on to the next file.
+
+`--time-budget`, `--max-tokens-total` and `--max-cost` bound the whole run. The
+run loop asks `RunBudget.exhausted()` before starting each file; once a limit
+is reached no new file is started, queued work is finished, and a summary of
+done, failed and remaining files is written so that `--resume` can pick up
+where the run stopped:
+
+    onomatool 'inbox/**/*' --time-budget 3300 --summary run.json
+    onomatool 'inbox/**/*' --resume run.json
+"""
+
+import json
+import os
+import tempfile
+import time
+from collections.abc import Callable
+
+from onomatool.usage import LEDGER
+
+SUMMARY_VERSION = 1
+
+
+class DeadlineExceeded(RuntimeError):
+    """The current file ran past its deadline."""
+
+
+class FileDeadline:
+    """Deadline for the file being processed, shared by every call it makes."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.expires_at: float | None = None
+        self.file_path: str | None = None
+
+    def start(self, file_path: str, seconds: float | None) -> None:
+        """Start the deadline for a file (None or 0 means no deadline)."""
+        self.file_path = file_path
+        self.expires_at = self.clock() + seconds if seconds else None
+
+    def clear(self) -> None:
+        self.file_path = None
+        self.expires_at = None
+
+    def remaining(self) -> float | None:
+        """Seconds left, or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - self.clock()
+
+    def check(self) -> None:
+        """
+        Fail fast once the deadline has passed.
+
+        Raises:
+            DeadlineExceeded: If the deadline has passed
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"File deadline exceeded for {self.file_path}")
+
+    def timeout(self, default: float | None) -> float | None:
+        """
+        The timeout for a new call: `default`, capped by the time left.
+
+        Raises:
+            DeadlineExceeded: If the deadline has already passed
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return default or None
+        return min(default, remaining) if default else remaining
+
+
+DEADLINE = FileDeadline()
+
+
+def call_timeout(default: float | None) -> float | None:
+    """Timeout for an LLM call or subprocess under the current file deadline."""
+    return DEADLINE.timeout(default)
+
+
+class RunBudget:
+    """Run-wide limits on wall time, tokens and estimated cost."""
+
+    def __init__(
+        self,
+        time_budget: float | None = None,
+        max_tokens_total: int | None = None,
+        max_cost: float | None = None,
+        pricing: dict | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            time_budget: Seconds after which no new file is started
+            max_tokens_total: Prompt plus completion tokens for the whole run
+            max_cost: Estimated USD cost for the whole run
+            pricing: Price table for the cost estimate (see `usage.get_pricing`)
+            clock: Monotonic clock
+        """
+        self.time_budget = time_budget
+        self.max_tokens_total = max_tokens_total
+        self.max_cost = max_cost
+        self.pricing = pricing or {}
+        self.clock = clock
+        self.started = clock()
+        self.tokens = 0
+        self.cost = 0.0
+        self.stopped: str | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    def _update_usage(self) -> None:
+        # The ledger's running totals, not its per-call records
+        totals = LEDGER.totals(self.pricing)
+        self.tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+        self.cost = totals["cost"]
+
+    def exhausted(self) -> str | None:
+        """
+        Check the limits before starting new work.
+
+        Returns:
+            Why the run must stop, or None while every limit allows more work
+        """
+        if self.stopped is None:
+            self._update_usage()
+            if self.time_budget and self.elapsed >= self.time_budget:
+                self.stopped = f"time budget of {self.time_budget:g}s reached"
+            elif self.max_tokens_total and self.tokens >= self.max_tokens_total:
+                self.stopped = f"token limit of {self.max_tokens_total} reached"
+            elif self.max_cost and self.cost >= self.max_cost:
+                self.stopped = f"cost limit of ${self.max_cost:g} reached"
+        return self.stopped
+
+
+def _write_json_list(f, key: str, items) -> None:
+    """Write `"key": [...]` as part of a JSON object, one item per line."""
+    f.write(f"  {json.dumps(key)}: [")
+    for index, item in enumerate(items):
+        f.write(
+            ("," if index else "") + "\n    " + json.dumps(item, ensure_ascii=False)
+        )
+    f.write("\n  ]")
+
+
+class _SpillFile:
+    """Append-only list of JSON values kept in a temporary file, not in memory."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.count = 0
+        self._file = None
+
+    def append(self, value) -> None:
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(
+                mode="w+", encoding="utf-8", prefix=self.prefix
+            )
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(json.dumps(value, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def __iter__(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class RunSummary:
+    """
+    Files done, failed and not started in a run, for `--resume`.
+
+    Done and not-started files are streamed to temporary JSONL files rather
+    than kept in memory, and copied into the summary when it is written.
+    """
+
+    def __init__(self):
+        self.failed: list[dict] = []
+        self._done = _SpillFile("onoma_done_")
+        self._remaining = _SpillFile("onoma_remaining_")
+
+    @property
+    def done_count(self) -> int:
+        return self._done.count
+
+    @property
+    def remaining_count(self) -> int:
+        return self._remaining.count
+
+    def add_done(self, file_path: str, new_name: str | None) -> None:
+        """Record a finished file (new_name is None if it went to a plan)."""
+        self._done.append([file_path, new_name])
+
+    def add_failed(self, file_path: str, error: Exception) -> None:
+        self.failed.append({"path": file_path, "error": str(error)})
+
+    def add_remaining(self, file_path: str) -> None:
+        """Record a file that was not started."""
+        self._remaining.append(file_path)
+
+    def iter_done(self):
+        """Yield (file_path, new_name) for every done file, in order."""
+        yield from map(tuple, self._done)
+
+    def iter_remaining(self):
+        """Yield every file that was not started, in order."""
+        yield from self._remaining
+
+    def write(self, path: str, budget: RunBudget | None = None) -> None:
+        """Write the summary as JSON, streaming the done and remaining entries."""
+        header = {
+            "version": SUMMARY_VERSION,
+            "stopped": budget.stopped if budget else None,
+            "elapsed_s": budget.elapsed if budget else None,
+            "tokens": budget.tokens if budget else None,
+            "cost": budget.cost if budget else None,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("{\n")
+            for key, value in header.items():
+                f.write(f"  {json.dumps(key)}: {json.dumps(value)},\n")
+            done = (
+                {"path": file_path, "name": new_name}
+                for file_path, new_name in self.iter_done()
+            )
+            _write_json_list(f, "done", done)
+            f.write(",\n")
+            _write_json_list(f, "failed", self.failed)
+            f.write(",\n")
+            _write_json_list(f, "remaining", self.iter_remaining())
+            f.write("\n}\n")
+        os.replace(tmp_path, path)
+
+    def close(self) -> None:
+        self._done.close()
+        self._remaining.close()
+
+    def done_paths(self) -> set[str]:
+        """
+        Paths to skip when resuming: each finished file's original path and,
+        if it was renamed, its new path (so it is not named a second time).
+        """
+        paths = set()
+        for file_path, new_name in self.iter_done():
+            paths.add(file_path)
+            if new_name:
+                paths.add(os.path.join(os.path.dirname(file_path), new_name))
+        return paths
+
+    @classmethod
+    def load(cls, path: str) -> "RunSummary":
+        """
+        Load the finished files of an earlier run; failed and remaining files
+        are left out so the resumed run picks them up again.
+
+        Raises:
+            ValueError: If the file is not a run summary
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as err:
+            raise ValueError(f"{path}: invalid JSON: {err}") from err
+        if not isinstance(data, dict) or not isinstance(data.get("done"), list):
+            raise ValueError(f"{path}: not a run summary")
+        summary = cls()
+        for entry in data["done"]:
+            summary.add_done(entry["path"], entry.get("name"))
+        return summary
@@ -0,0 +1,200 @@
+"""
+Record and replay LLM traffic.
+
+With `--record DIR` every request sent by `get_suggestions` is normalized and
+stored with its response (suggestions or error), the time the call took and the
+reported token usage. With `--replay DIR` the same requests are answered from
+the cassette instead of the provider, either with their original timings or as
+fast as possible, so the non-LLM parts of the pipeline can be benchmarked and
+profiled on real corpora with exact responses.
+
+Requests are keyed by a SHA-256 of their normalized form: provider, model,
+naming convention, max tokens and the chat messages with inline image data
+replaced by the hash of the data. Each entry is one JSON file stored as
+`DIR/<key[:2]>/<key>.json`.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from onomatool.usage import LEDGER
+
+CASSETTE_VERSION = 1
+
+REPLAY_TIMINGS = ("original", "fast")
+
+
+def _normalize_part(part):
+    if isinstance(part, dict):
+        if part.get("type") == "image_url":
+            url = part["image_url"]
+            if isinstance(url, dict):
+                url = url.get("url", "")
+            digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+            return {"type": "image_url", "image_sha256": digest}
+        return {key: _normalize_part(value) for key, value in part.items()}
+    if isinstance(part, list):
+        return [_normalize_part(value) for value in part]
+    return part
+
+
+def normalize_request(request, max_tokens: int) -> dict:
+    """
+    Reduce an `LLMRequest` to the fields that determine its response.
+
+    Inline base64 images are replaced by their SHA-256 so cassettes stay small.
+    """
+    normalized = {
+        "provider": request.provider,
+        "model": request.model,
+        "naming_convention": request.naming_convention,
+        "max_tokens": max_tokens,
+        "messages": _normalize_part(request.messages),
+    }
+    if request.response_model is not None:
+        normalized["response_model"] = request.response_model.__name__
+    if request.first_only:
+        normalized["first_only"] = True
+    return normalized
+
+
+def request_key(normalized: dict) -> str:
+    """SHA-256 of the canonical JSON encoding of a normalized request."""
+    canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """A directory of recorded request/response entries."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def load(self, key: str) -> dict | None:
+        """Return the entry for a key, or None if it was never recorded."""
+        try:
+            with open(self.path_for(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, entry: dict) -> None:
+        """Write an entry atomically (concurrent runs may share a cassette)."""
+        path = self.path_for(entry["key"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        self.recorded += 1
+
+    def record(self, request, max_tokens: int, call):
+        """
+        Run `call()` and store its outcome.
+
+        Args:
+            request: The `LLMRequest` being sent
+            max_tokens: Completion token limit used for the call
+            call: Zero-argument function performing the live call
+
+        Returns:
+            The suggestions returned by `call()`; errors are recorded and re-raised
+        """
+        normalized = normalize_request(request, max_tokens)
+        start = time.perf_counter()
+        entry = {
+            "version": CASSETTE_VERSION,
+            "key": request_key(normalized),
+            "request": normalized,
+        }
+        try:
+            with LEDGER.capture() as calls:
+                suggestions = call()
+        except Exception as err:
+            entry["error"] = str(err)
+            raise
+        else:
+            if request.response_model is not None:
+                entry["suggestions"] = suggestions.model_dump()
+            else:
+                entry["suggestions"] = list(suggestions)
+            return suggestions
+        finally:
+            entry["elapsed_s"] = time.perf_counter() - start
+            entry["usage"] = [
+                {
+                    "model": record["model"],
+                    "prompt_tokens": record["prompt_tokens"],
+                    "completion_tokens": record["completion_tokens"],
+                    "cached_tokens": record["cached_tokens"],
+                }
+                for record in calls
+            ]
+            self.save(entry)
+
+    def replay(self, request, max_tokens: int, timing: str = "original"):
+        """
+        Answer a request from the cassette.
+
+        The recorded token usage is replayed into the usage ledger so cost
+        reports match the original run.
+
+        Args:
+            request: The `LLMRequest` to answer
+            max_tokens: Completion token limit the request would be sent with
+            timing: "original" to sleep for the recorded call time, "fast" not to
+
+        Returns:
+            The recorded suggestions (or parsed `response_model`)
+
+        Raises:
+            RuntimeError: If the request is not in the cassette or the recorded
+                call failed
+        """
+        normalized = normalize_request(request, max_tokens)
+        key = request_key(normalized)
+        entry = self.load(key)
+        if entry is None:
+            self.misses += 1
+            raise RuntimeError(
+                f"No cassette entry for request {key[:12]} in {self.directory}"
+            )
+        self.hits += 1
+        if timing == "original":
+            time.sleep(entry.get("elapsed_s", 0.0))
+        for usage in entry.get("usage", []):
+            LEDGER.record(
+                request.provider,
+                usage["model"],
+                request.kind,
+                usage["prompt_tokens"],
+                usage["completion_tokens"],
+                usage["cached_tokens"],
+                request.file_path,
+            )
+        if "error" in entry:
+            raise RuntimeError(entry["error"])
+        if request.response_model is not None:
+            return request.response_model.model_validate(entry["suggestions"])
+        return entry["suggestions"]
+
+
+_CASSETTES: dict[str, Cassette] = {}
+
+
+def get_cassette(directory: str) -> Cassette:
+    """Return the shared `Cassette` for a directory."""
+    directory = os.path.abspath(directory)
+    cassette = _CASSETTES.get(directory)
+    if cassette is None:
+        cassette = _CASSETTES[directory] = Cassette(directory)
+    return cassette
@@ -1,27 +1,425 @@
 import argparse
 import os
+import subprocess
 import sys
 import tempfile
 from pathlib import Path
 
 import toml
 
-from onomatool.config import DEFAULT_CONFIG, get_config
+from onomatool.batching import SuggestionBatcher
+from onomatool.budget import DEADLINE, DeadlineExceeded, RunBudget, RunSummary
+from onomatool.cassette import REPLAY_TIMINGS, get_cassette
+from onomatool.config import DEFAULTS, get_config
 from onomatool.conflict_resolver import resolve_conflict
-from onomatool.file_collector import collect_files
+from onomatool.distill import distill_for_config
+from onomatool.endpoints import active_pools
+from onomatool.file_collector import iter_files
 from onomatool.file_dispatcher import FileDispatcher
+from onomatool.image_hashes import get_image_cache
 from onomatool.llm_integration import get_suggestions
+from onomatool.local_namer import LocalNamer
+from onomatool.memory import MemoryGuard
+from onomatool.naming import RENDERABLE_CONVENTIONS, name_words, render_name
+from onomatool.near_duplicates import NearDuplicateNamer
+from onomatool.normalize import normalize_for_config
+from onomatool.plan import PlannedRenames, PlanWriter, apply_plan
+from onomatool.profiling import PROFILER, span
 from onomatool.renamer import rename_file
-from onomatool.utils.image_utils import convert_svg_to_png
+from onomatool.routing import is_hard_file
+from onomatool.usage import LEDGER, get_pricing
+from onomatool.watcher import watch_directory
+from onomatool.word_cache import get_word_cache
+
+DEFAULT_SUMMARY_PATH = "onoma-summary.json"
 
 # Add project root to sys.path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
+def build_final_prompt(image_suggestions: list[str], markdown: str) -> str:
+    """Build the prompt that merges per-page image suggestions with the markdown."""
+    guidance = "\n".join(image_suggestions)
+    return (
+        "You have previously suggested the following file names for each "
+        "page/slide/image of the file:\n"
+        f"{guidance}\n"
+        "Now, based on the full document content (markdown below) and the "
+        "above suggestions, generate 3 final file name suggestions that best "
+        "represent the entire file.\n"
+        f"MARKDOWN:\n{markdown}"
+    )
+
+
+def suggest_from_images(
+    images: list[str],
+    markdown: str,
+    md_file_path: str,
+    config: dict,
+    verbose_level: int = 0,
+    hard: bool = False,
+) -> list[str]:
+    """
+    Get suggestions for a file that has page/slide images plus markdown content.
+
+    Each image is named individually, then the markdown and the image suggestions
+    are combined into a final request. Falls back to the markdown suggestions and
+    finally to the flattened image suggestions. With `hard`, every request goes
+    to the most capable model tier.
+    """
+    all_image_suggestions = []
+    for img_path in images:
+        # Every image suggestion goes into the final prompt
+        img_suggestions = get_suggestions(
+            "",
+            verbose_level=verbose_level,
+            file_path=img_path,
+            config=config,
+            hard=hard,
+            first_only=False,
+        )
+        if img_suggestions:
+            all_image_suggestions.append(img_suggestions)
+    flat_image_suggestions = [s for sublist in all_image_suggestions for s in sublist]
+    md_suggestions = get_suggestions(
+        markdown,
+        verbose_level=verbose_level,
+        file_path=md_file_path,
+        config=config,
+        hard=hard,
+    )
+    final_suggestions = get_suggestions(
+        build_final_prompt(flat_image_suggestions, markdown),
+        verbose_level=verbose_level,
+        file_path=md_file_path,
+        config=config,
+        hard=hard,
+    )
+    return final_suggestions or md_suggestions or flat_image_suggestions
+
+
+def apply_suggestion(
+    file_path: str,
+    new_name: str,
+    dry_run: bool = False,
+    planned_renames: list | None = None,
+) -> str:
+    """
+    Rename a file to its suggested name (or record the plan in dry-run mode).
+
+    Returns:
+        The final file name after conflict resolution.
+    """
+    directory = os.path.dirname(file_path) or "."
+    _, ext = os.path.splitext(file_path)
+    base_new_name, _ = os.path.splitext(new_name)
+    new_name_with_ext = base_new_name + ext
+    existing_files = os.listdir(directory)
+    final_name = resolve_conflict(new_name_with_ext, existing_files)
+    if dry_run:
+        print(f"{os.path.basename(file_path)} --dry-run-> {final_name}")
+        if planned_renames is not None:
+            planned_renames.append((file_path, new_name))
+    else:
+        print(f"{os.path.basename(file_path)} --> {final_name}")
+        with span("rename"):
+            rename_file(file_path, new_name)
+    return final_name
+
+
+def finish_file(
+    file_path: str,
+    suggestions: list[str],
+    dry_run: bool = False,
+    planned_renames: list | None = None,
+    plan_writer: PlanWriter | None = None,
+    summary: RunSummary | None = None,
+) -> str | None:
+    """
+    Write a file's suggestions to the plan, or rename it to the first one.
+
+    With a `summary`, the file is recorded as done once it is renamed or
+    written to the plan.
+
+    Returns:
+        The final file name, or None if the suggestions went to the plan or
+        the file was not renamed.
+    """
+    if plan_writer is not None:
+        plan_writer.write(file_path, suggestions)
+        print(f"{os.path.basename(file_path)} --plan-> {suggestions[0]}")
+        final_name = None
+    else:
+        final_name = apply_suggestion(
+            file_path, suggestions[0], dry_run, planned_renames
+        )
+    if summary is not None and (final_name or plan_writer is not None):
+        summary.add_done(file_path, final_name)
+    return final_name
+
+
+def _make_tempdir(prefix: str, debug: bool):
+    """Create a tempdir; in debug mode it is never cleaned up."""
+    if debug:
+        # Create a regular temp directory that won't auto-cleanup
+        tempdir_path = tempfile.mkdtemp(prefix=prefix)
+        return type("TempDir", (), {"name": tempdir_path, "cleanup": lambda: None})()
+    return tempfile.TemporaryDirectory()
+
+
+def _report_debug_tempdir(file_path: str, result: dict) -> None:
+    """Print the debug artifacts a processor left in its tempdir."""
+    file_tempdir = result.get("tempdir")
+    if file_tempdir is None:
+        return
+    if "images" in result:
+        print(f"[DEBUG] Created tempdir for PDF/PPTX: {file_tempdir.name}")
+        for img_path in result["images"]:
+            print(f"[DEBUG] Created image: {img_path}")
+    else:
+        file_type = os.path.splitext(file_path)[1].upper().lstrip(".")
+        print(f"[DEBUG] Created tempdir for {file_type}: {file_tempdir.name}")
+    # Check if markdown file was created
+    markdown_path = os.path.join(file_tempdir.name, "extracted_content.md")
+    if os.path.exists(markdown_path):
+        print(f"[DEBUG] Created markdown: {markdown_path}")
+
+
+def process_file(
+    file_path: str,
+    dispatcher: FileDispatcher,
+    config: dict,
+    verbose_level: int = 0,
+    debug: bool = False,
+    dry_run: bool = False,
+    planned_renames: list | None = None,
+    plan_writer: PlanWriter | None = None,
+    batcher: SuggestionBatcher | None = None,
+    local_namer: LocalNamer | None = None,
+    near_duplicates: NearDuplicateNamer | None = None,
+    summary: RunSummary | None = None,
+) -> str | None:
+    """
+    Run a single file through extraction, the LLM and the renamer.
+
+    Extraction and every LLM call share the `file_deadline` from config; once
+    it passes, `DeadlineExceeded` is raised. With a `plan_writer`, the
+    suggestions are written to the plan file instead and nothing is renamed.
+    With a `batcher`, small text files are queued and named when the batch is
+    flushed (this call then returns None). With a `local_namer`, files it can
+    name confidently never reach the LLM. With `near_duplicates`, near-copies
+    of documents named earlier reuse their names or are named from their
+    differences only. With a `summary`, the file is recorded as done once it
+    is renamed (see `finish_file`).
+
+    Returns:
+        The final file name, or None if the file was skipped.
+    """
+    _, ext = os.path.splitext(file_path)
+    LEDGER.current_file = file_path
+    DEADLINE.start(file_path, config.get("file_deadline"))
+    try:
+        with span("file", ext=ext.lower()):
+            return _process_file(
+                file_path,
+                dispatcher,
+                config,
+                verbose_level,
+                debug,
+                dry_run,
+                planned_renames,
+                plan_writer,
+                batcher,
+                local_namer,
+                near_duplicates,
+                summary,
+            )
+    finally:
+        LEDGER.current_file = None
+        DEADLINE.clear()
+
+
+def _process_file(
+    file_path,
+    dispatcher,
+    config,
+    verbose_level,
+    debug,
+    dry_run,
+    planned_renames,
+    plan_writer,
+    batcher,
+    local_namer,
+    near_duplicates,
+    summary,
+):
+    print(f"Processing file: {file_path}")
+    _, ext = os.path.splitext(file_path)
+    is_svg = ext.lower() == ".svg"
+    tempdir = None
+    png_path = None
+    if is_svg:
+        tempdir = _make_tempdir("onoma_svg_", debug)
+        if debug:
+            print(f"[DEBUG] Created tempdir for SVG: {tempdir.name}")
+        try:
+            with span("svg_render"):
+                png_path = dispatcher.render_svg(file_path, tempdir.name)
+            if debug:
+                print(f"[DEBUG] Created PNG: {png_path}")
+        except Exception as e:
+            print(f"[SVG ERROR] Could not convert {file_path} to PNG: {e}")
+            tempdir.cleanup()
+            return None
+    result = dispatcher.process(file_path)
+    if not result:
+        if tempdir is not None:
+            tempdir.cleanup()
+        return None
+    result_tempdir = result.get("tempdir") if isinstance(result, dict) else None
+    try:
+        if debug and isinstance(result, dict):
+            _report_debug_tempdir(file_path, result)
+        markdown = result if isinstance(result, str) else result.get("markdown", "")
+        suggestions = None
+        if local_namer is not None:
+            suggestions = local_namer.try_name(file_path, markdown, verbose_level)
+        if not suggestions and near_duplicates is not None and markdown:
+            suggestions = near_duplicates.try_name(
+                file_path, markdown, config, verbose_level
+            )
+        llm_content = None
+        if not suggestions:
+            # The LLM gets normalized content, as a digest if it is long
+            llm_content = distill_for_config(
+                normalize_for_config(markdown, file_path, config), file_path, config
+            )
+            if verbose_level > 0 and len(llm_content) < len(markdown):
+                print(
+                    f"[DEBUG] Content reduced from {len(markdown)} to "
+                    f"{len(llm_content)} characters"
+                )
+        if suggestions:
+            # Named locally or from a near-duplicate
+            pass
+        elif is_svg and png_path:
+            # Always use PNG for all LLM input for SVGs
+            suggestions = suggest_from_images(
+                [png_path],
+                llm_content,
+                png_path,
+                config,
+                verbose_level,
+                is_hard_file(file_path, config),
+            )
+        elif isinstance(result, dict) and "images" in result:
+            images = result["images"]
+            md_file_path = images[0] if len(images) > 0 else file_path
+            suggestions = suggest_from_images(
+                images,
+                llm_content,
+                md_file_path,
+                config,
+                verbose_level,
+                is_hard_file(file_path, config, len(images)),
+            )
+        elif is_hard_file(file_path, config):
+            suggestions = get_suggestions(
+                llm_content,
+                verbose_level=verbose_level,
+                file_path=file_path,
+                config=config,
+                hard=True,
+            )
+        elif batcher is not None and batcher.add(file_path, llm_content):
+            # Named when the batch is flushed
+            return None
+        else:
+            suggestions = get_suggestions(
+                llm_content,
+                verbose_level=verbose_level,
+                file_path=file_path,
+                config=config,
+            )
+        if suggestions and near_duplicates is not None and markdown:
+            near_duplicates.remember(file_path, markdown, suggestions)
+        # Release the extracted content before renaming
+        result = markdown = llm_content = None
+        if not suggestions:
+            return None
+        return finish_file(
+            file_path, suggestions, dry_run, planned_renames, plan_writer, summary
+        )
+    finally:
+        # Clean up SVG tempdir if not in debug mode
+        if tempdir is not None:
+            if debug:
+                print(f"[DEBUG] Preserving SVG tempdir: {tempdir.name}")
+            else:
+                tempdir.cleanup()
+        # Clean up processor tempdir (PDF/PPTX pages, debug markdown)
+        if result_tempdir is not None:
+            if debug:
+                file_type = ext.upper().lstrip(".")
+                print(f"[DEBUG] Preserving {file_type} tempdir: {result_tempdir.name}")
+            else:
+                result_tempdir.cleanup()
+
+
+def run_watch(
+    directory: str,
+    dispatcher: FileDispatcher,
+    config: dict,
+    args,
+    verbose_level: int = 0,
+    local_namer: LocalNamer | None = None,
+    near_duplicates: NearDuplicateNamer | None = None,
+) -> None:
+    """Rename files as they land in a directory until interrupted."""
+    renamed_paths = set()
+
+    def handle_batch(paths: list[str]) -> None:
+        for file_path in paths:
+            if file_path in renamed_paths:
+                # Our own rename landing back in the watched directory
+                renamed_paths.discard(file_path)
+                continue
+            try:
+                final_name = process_file(
+                    file_path,
+                    dispatcher,
+                    config,
+                    verbose_level=verbose_level,
+                    debug=args.debug,
+                    dry_run=args.dry_run,
+                    local_namer=local_namer,
+                    near_duplicates=near_duplicates,
+                )
+            except Exception as e:
+                print(f"[WATCH ERROR] {file_path}: {e}")
+                continue
+            if final_name and not args.dry_run:
+                renamed_paths.add(
+                    os.path.join(os.path.dirname(file_path) or ".", final_name)
+                )
+
+    print(f"Watching {directory} for new files (Ctrl+C to stop)")
+    watch_directory(
+        directory,
+        handle_batch,
+        settle=args.settle,
+        use_inotify=False if args.poll else None,
+    )
+
+
 def main(args=None):
     try:
         if args is None:
             args = sys.argv[1:]
+        if args and args[0] == "apply":
+            return apply_main(args[1:])
+        if args and args[0] == "reformat":
+            return reformat_main(args[1:])
         parser = argparse.ArgumentParser(
             description="Onoma - AI-powered file renaming tool",
             epilog="Configuration is loaded from ~/.onomarc (TOML format)",
@@ -87,6 +485,174 @@ def main(args=None):
             "--config",
             help="Specify a configuration file to use",
         )
+        parser.add_argument(
+            "--plan-out",
+            metavar="FILE",
+            help=(
+                "Write all suggestions and source fingerprints to a JSONL plan file "
+                "instead of renaming; apply it later with 'onomatool apply FILE'"
+            ),
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Time each processing stage and print a summary table at the end",
+        )
+        parser.add_argument(
+            "--profile-trace",
+            metavar="FILE",
+            help="Write stage timings as a Chrome trace (JSON) file; implies --profile",
+        )
+        parser.add_argument(
+            "--usage-report",
+            metavar="FILE",
+            help=(
+                "Write token usage and estimated cost per call, file, extension "
+                "and model to a JSON file"
+            ),
+        )
+        parser.add_argument(
+            "--max-memory",
+            type=float,
+            metavar="MB",
+            help=(
+                "Release memory before starting new files while resident memory "
+                "is above this limit (MiB)"
+            ),
+        )
+        parser.add_argument(
+            "-w",
+            "--watch",
+            metavar="DIR",
+            help="Watch a directory and rename files as they are created or moved in",
+        )
+        parser.add_argument(
+            "--settle",
+            type=float,
+            default=2.0,
+            metavar="SECONDS",
+            help=(
+                "With --watch, how long a file must be quiescent before it is "
+                "processed (default: 2.0)"
+            ),
+        )
+        parser.add_argument(
+            "--poll",
+            action="store_true",
+            help="With --watch, use polling instead of inotify",
+        )
+        parser.add_argument(
+            "--batch-tokens",
+            type=int,
+            metavar="N",
+            help=(
+                "Name small text files several at a time in requests of up to N "
+                "content tokens (default: batch_tokens from config, 0 = off)"
+            ),
+        )
+        parser.add_argument(
+            "--local-naming",
+            action="store_true",
+            help=(
+                "Name files from their metadata and headings without the LLM when "
+                "confident enough (see local_naming in config)"
+            ),
+        )
+        parser.add_argument(
+            "--file-deadline",
+            type=float,
+            metavar="SECONDS",
+            help=(
+                "Give up on a file whose extraction and LLM calls take longer "
+                "than this (default: file_deadline from config, 0 = none)"
+            ),
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            metavar="SECONDS",
+            help="Start no new files once the run has taken this long",
+        )
+        parser.add_argument(
+            "--max-tokens-total",
+            type=int,
+            metavar="N",
+            help="Start no new files once the run has used this many tokens",
+        )
+        parser.add_argument(
+            "--max-cost",
+            type=float,
+            metavar="USD",
+            help="Start no new files once the estimated cost reaches this amount",
+        )
+        parser.add_argument(
+            "--summary",
+            metavar="FILE",
+            help=(
+                "Write done, failed and remaining files to a JSON summary "
+                f"(written to {DEFAULT_SUMMARY_PATH} when a limit stops the run)"
+            ),
+        )
+        parser.add_argument(
+            "--resume",
+            metavar="FILE",
+            help=(
+                "Skip the files a previous run's summary lists as done, and "
+                "update that summary (unless --summary is given)"
+            ),
+        )
+        parser.add_argument(
+            "--near-duplicates",
+            action="store_true",
+            help=(
+                "Reuse the names of near-identical documents named earlier, or "
+                "send only their differences (see near_duplicates in config)"
+            ),
+        )
+        parser.add_argument(
+            "--extraction-cache",
+            action="store_true",
+            help=(
+                "Reuse extracted markdown and page images from earlier runs "
+                "(see extraction_cache in config)"
+            ),
+        )
+        parser.add_argument(
+            "--word-cache",
+            action="store_true",
+            help=(
+                "Cache suggestions as convention-neutral words, so other naming "
+                "conventions are rendered locally (see word_cache in config)"
+            ),
+        )
+        parser.add_argument(
+            "--image-cache",
+            action="store_true",
+            help=(
+                "Reuse the suggestions of perceptually near-identical images "
+                "instead of calling the vision model again (see image_cache in config)"
+            ),
+        )
+        cassette_group = parser.add_mutually_exclusive_group()
+        cassette_group.add_argument(
+            "--record",
+            metavar="DIR",
+            help="Record every LLM request and response into a cassette directory",
+        )
+        cassette_group.add_argument(
+            "--replay",
+            metavar="DIR",
+            help="Answer LLM requests from a cassette recorded with --record",
+        )
+        parser.add_argument(
+            "--replay-speed",
+            choices=REPLAY_TIMINGS,
+            default="original",
+            help=(
+                "With --replay, sleep for each call's recorded duration "
+                "('original', default) or answer immediately ('fast')"
+            ),
+        )
         args = parser.parse_args(args)
 
         if args.save_config:
@@ -94,12 +660,18 @@ def main(args=None):
             print("Default configuration saved to ~/.onomarc")
             return 0
 
-        if not args.pattern:
+        if not args.pattern and not args.watch:
             parser.error("the following arguments are required: pattern")
 
         if args.interactive and not args.dry_run:
             parser.error("--interactive must be used with --dry-run")
 
+        if args.watch and args.interactive:
+            parser.error("--interactive cannot be used with --watch")
+
+        if args.plan_out and (args.interactive or args.watch):
+            parser.error("--plan-out cannot be used with --interactive or --watch")
+
         # Handle verbosity levels
         if args.very_verbose:
             verbose_level = 2  # Very verbose
@@ -108,295 +680,205 @@ def main(args=None):
         else:
             verbose_level = 0  # No verbose output
 
+        if args.profile or args.profile_trace:
+            PROFILER.reset()
+            PROFILER.enabled = True
+
         config = get_config(args.config)
-        files = collect_files(args.pattern)
+        if args.file_deadline is not None:
+            config = config.override(file_deadline=args.file_deadline)
+        if args.record:
+            config = config.override(record_dir=args.record)
+        elif args.replay:
+            if not os.path.isdir(args.replay):
+                parser.error(f"--replay cassette does not exist: {args.replay}")
+            config = config.override(
+                replay_dir=args.replay, replay_timing=args.replay_speed
+            )
+        if args.extraction_cache:
+            config = config.override(extraction_cache={"enabled": True})
+        if args.word_cache:
+            config = config.override(word_cache={"enabled": True})
+        if args.image_cache:
+            config = config.override(image_cache={"enabled": True})
+        if not (args.interactive or args.plan_out):
+            # Only the first suggestion is used, so responses can be cut short
+            config = config.override(first_suggestion_only=True)
         dispatcher = FileDispatcher(config, debug=args.debug)
+        LEDGER.reset()
+        # Per-call records only when something reports them
+        LEDGER.keep_records = bool(PROFILER.enabled or args.record or args.usage_report)
+        local_namer = None
+        if args.local_naming or (config.get("local_naming") or {}).get("enabled"):
+            local_namer = LocalNamer.from_config(config)
+        near_duplicates = None
+        if args.near_duplicates or (config.get("near_duplicates") or {}).get("enabled"):
+            near_duplicates = NearDuplicateNamer.from_config(config)
 
-        planned_renames = []
-
-        # List to hold tempdir references in debug mode to prevent garbage collection
-        debug_tempdirs = []
-
-        for file_path in files:
-            print(f"Processing file: {file_path}")
-            _, ext = os.path.splitext(file_path)
-            is_svg = ext.lower() == ".svg"
-            tempdir = None
-            png_path = None
-            if is_svg:
-                if args.debug:
-                    # Create a regular temp directory that won't auto-cleanup
-                    tempdir_path = tempfile.mkdtemp(prefix="onoma_svg_")
-                    tempdir = type(
-                        "TempDir", (), {"name": tempdir_path, "cleanup": lambda: None}
-                    )()
-                    print(f"[DEBUG] Created tempdir for SVG: {tempdir.name}")
-                else:
-                    tempdir = tempfile.TemporaryDirectory()
-                try:
-                    png_path = convert_svg_to_png(file_path, tempdir.name)
-                    if args.debug:
-                        print(f"[DEBUG] Created PNG: {png_path}")
-                except Exception as e:
-                    print(f"[SVG ERROR] Could not convert {file_path} to PNG: {e}")
-                    if tempdir is not None and not args.debug:
-                        tempdir.cleanup()
+        if args.watch:
+            if not os.path.isdir(args.watch):
+                parser.error(f"--watch directory does not exist: {args.watch}")
+            run_watch(
+                args.watch,
+                dispatcher,
+                config,
+                args,
+                verbose_level,
+                local_namer,
+                near_duplicates,
+            )
+            return 0
+
+        # Files are streamed from the glob and the dry-run plan spills to disk,
+        # so memory stays bounded regardless of the size of the tree
+        files = iter_files(args.pattern)
+        summary = RunSummary.load(args.resume) if args.resume else RunSummary()
+        skip_paths = summary.done_paths()
+        budget = RunBudget(
+            args.time_budget,
+            args.max_tokens_total,
+            args.max_cost,
+            get_pricing(config),
+        )
+        planned_renames = PlannedRenames()
+        memory_guard = MemoryGuard(args.max_memory)
+        memory_guard.add_relief(planned_renames.spill)
+        plan_writer = None
+        if args.plan_out:
+            plan_writer = PlanWriter(
+                args.plan_out, config.get("naming_convention", "snake_case")
+            )
+
+        batch_tokens = args.batch_tokens
+        if batch_tokens is None:
+            batch_tokens = config.get("batch_tokens", 0)
+        batcher = None
+        if batch_tokens and batch_tokens > 0:
+
+            def batch_failed(file_path: str, error: Exception) -> None:
+                print(f"[BATCH ERROR] {file_path}: {error}")
+                summary.add_failed(file_path, error)
+
+            batcher = SuggestionBatcher(
+                config,
+                batch_tokens,
+                lambda file_path, suggestions: finish_file(
+                    file_path,
+                    suggestions,
+                    args.dry_run,
+                    planned_renames,
+                    plan_writer,
+                    summary,
+                ),
+                verbose_level=verbose_level,
+                handle_failure=batch_failed,
+            )
+
+        try:
+            while True:
+                with span("glob"):
+                    file_path = next(files, None)
+                if file_path is None:
+                    break
+                if file_path in skip_paths:
                     continue
-            result = dispatcher.process(file_path)
-            if not result:
-                if tempdir is not None and not args.debug:
-                    tempdir.cleanup()
-                continue
-            try:
-                if is_svg and png_path:
-                    # Always use PNG for all LLM input for SVGs
-                    all_image_suggestions = []
-                    img_suggestions = get_suggestions(
-                        "",
-                        verbose_level=verbose_level,
-                        file_path=png_path,
-                        config=config,
-                    )
-                    if img_suggestions:
-                        all_image_suggestions.append(img_suggestions)
-                    flat_image_suggestions = [
-                        s for sublist in all_image_suggestions for s in sublist
-                    ]
-                    md_suggestions = get_suggestions(
-                        result
-                        if isinstance(result, str)
-                        else result.get("markdown", ""),
-                        verbose_level=verbose_level,
-                        file_path=png_path,
-                        config=config,
-                    )
-                    guidance = "\n".join(flat_image_suggestions)
-                    final_prompt = (
-                        "You have previously suggested the following file names for each "
-                        "page/slide/image of the file:\n"
-                        f"{guidance}\n"
-                        "Now, based on the full document content (markdown below) and the "
-                        "above suggestions, generate 3 final file name suggestions that best "
-                        "represent the entire file.\n"
-                        f"MARKDOWN:\n{result if isinstance(result, str) else result.get('markdown', '')}"
-                    )
-                    final_suggestions = get_suggestions(
-                        final_prompt,
+                if budget.exhausted():
+                    # Finish the queued batch below, but start nothing new
+                    summary.add_remaining(file_path)
+                    for path in files:
+                        if path not in skip_paths:
+                            summary.add_remaining(path)
+                    break
+                memory_guard.check()
+                try:
+                    process_file(
+                        file_path,
+                        dispatcher,
+                        config,
                         verbose_level=verbose_level,
-                        file_path=png_path,
-                        config=config,
-                    )
-                    suggestions = (
-                        final_suggestions or md_suggestions or flat_image_suggestions
+                        debug=args.debug,
+                        dry_run=args.dry_run,
+                        planned_renames=planned_renames,
+                        plan_writer=plan_writer,
+                        batcher=batcher,
+                        local_namer=local_namer,
+                        near_duplicates=near_duplicates,
+                        summary=summary,
                     )
-                    if suggestions:
-                        new_name = suggestions[0]
-                        directory = os.path.dirname(file_path) or "."
-                        base_new_name, _ = os.path.splitext(new_name)
-                        new_name_with_ext = base_new_name + ext
-                        existing_files = os.listdir(directory)
-                        final_name = resolve_conflict(new_name_with_ext, existing_files)
-                        if args.dry_run:
-                            print(
-                                f"{os.path.basename(file_path)} --dry-run-> {final_name}"
-                            )
-                            planned_renames.append((file_path, new_name))
-                        else:
-                            print(f"{os.path.basename(file_path)} --> {final_name}")
-                            rename_file(file_path, new_name)
-                else:
-                    # Non-SVG logic unchanged
-                    if (
-                        isinstance(result, dict)
-                        and "markdown" in result
-                        and "images" in result
-                    ):
-                        images = result["images"]
-                        pdf_tempdir = result.get("tempdir")
-                        if pdf_tempdir is not None and args.debug:
-                            debug_tempdirs.append(
-                                pdf_tempdir
-                            )  # Prevent GC in debug mode
-                            print(
-                                f"[DEBUG] Created tempdir for PDF/PPTX: {pdf_tempdir.name}"
-                            )
-                            for img_path in images:
-                                print(f"[DEBUG] Created image: {img_path}")
-                            # Check if markdown file was created
-                            markdown_path = os.path.join(
-                                pdf_tempdir.name, "extracted_content.md"
-                            )
-                            if os.path.exists(markdown_path):
-                                print(f"[DEBUG] Created markdown: {markdown_path}")
-                        all_image_suggestions = []
-                        for img_path in images:
-                            img_suggestions = get_suggestions(
-                                "",
-                                verbose_level=verbose_level,
-                                file_path=img_path,
-                                config=config,
-                            )
-                            if img_suggestions:
-                                all_image_suggestions.append(img_suggestions)
-                        flat_image_suggestions = [
-                            s for sublist in all_image_suggestions for s in sublist
-                        ]
-                        md_file_path = images[0] if len(images) > 0 else file_path
-                        md_suggestions = get_suggestions(
-                            result["markdown"],
-                            verbose_level=verbose_level,
-                            file_path=md_file_path,
-                            config=config,
-                        )
-                        guidance = "\n".join(flat_image_suggestions)
-                        final_prompt = (
-                            "You have previously suggested the following file names for each "
-                            "page/slide/image of the file:\n"
-                            f"{guidance}\n"
-                            "Now, based on the full document content (markdown below) and the "
-                            "above suggestions, generate 3 final file name suggestions that best "
-                            "represent the entire file.\n"
-                            f"MARKDOWN:\n{result['markdown']}"
-                        )
-                        final_suggestions = get_suggestions(
-                            final_prompt,
-                            verbose_level=verbose_level,
-                            file_path=md_file_path,
-                            config=config,
-                        )
-                        suggestions = (
-                            final_suggestions
-                            or md_suggestions
-                            or flat_image_suggestions
-                        )
-                        if suggestions:
-                            new_name = suggestions[0]
-                            directory = os.path.dirname(file_path) or "."
-                            _, ext = os.path.splitext(file_path)
-                            base_new_name, _ = os.path.splitext(new_name)
-                            new_name_with_ext = base_new_name + ext
-                            existing_files = os.listdir(directory)
-                            final_name = resolve_conflict(
-                                new_name_with_ext, existing_files
-                            )
-                            if args.dry_run:
-                                print(
-                                    f"{os.path.basename(file_path)} --dry-run-> {final_name}"
-                                )
-                                planned_renames.append((file_path, new_name))
-                            else:
-                                print(f"{os.path.basename(file_path)} --> {final_name}")
-                                rename_file(file_path, new_name)
-                    elif isinstance(result, dict) and "tempdir" in result:
-                        # Handle files with tempdir but no images (text files, Word docs, etc. in debug mode)
-                        file_tempdir = result.get("tempdir")
-                        if file_tempdir is not None and args.debug:
-                            debug_tempdirs.append(
-                                file_tempdir
-                            )  # Prevent GC in debug mode
-                            file_type = (
-                                os.path.splitext(file_path)[1].upper().lstrip(".")
-                            )
-                            print(
-                                f"[DEBUG] Created tempdir for {file_type}: {file_tempdir.name}"
-                            )
-                            # Check if markdown file was created
-                            markdown_path = os.path.join(
-                                file_tempdir.name, "extracted_content.md"
-                            )
-                            if os.path.exists(markdown_path):
-                                print(f"[DEBUG] Created markdown: {markdown_path}")
-
-                        content = result.get("markdown", "")
-                        suggestions = get_suggestions(
-                            content,
-                            verbose_level=verbose_level,
-                            file_path=file_path,
-                            config=config,
-                        )
-                        if suggestions:
-                            new_name = suggestions[0]
-                            directory = os.path.dirname(file_path) or "."
-                            _, ext = os.path.splitext(file_path)
-                            base_new_name, _ = os.path.splitext(new_name)
-                            new_name_with_ext = base_new_name + ext
-                            existing_files = os.listdir(directory)
-                            final_name = resolve_conflict(
-                                new_name_with_ext, existing_files
-                            )
-                            if args.dry_run:
-                                print(
-                                    f"{os.path.basename(file_path)} --dry-run-> {final_name}"
-                                )
-                                planned_renames.append((file_path, new_name))
-                            else:
-                                print(f"{os.path.basename(file_path)} --> {final_name}")
-                                rename_file(file_path, new_name)
-                    else:
-                        content = result
-                        suggestions = get_suggestions(
-                            content,
-                            verbose_level=verbose_level,
-                            file_path=file_path,
-                            config=config,
-                        )
-                        if suggestions:
-                            new_name = suggestions[0]  # Use first suggestion in Phase 1
-                            directory = os.path.dirname(file_path) or "."
-                            _, ext = os.path.splitext(file_path)
-                            base_new_name, _ = os.path.splitext(new_name)
-                            new_name_with_ext = base_new_name + ext
-                            existing_files = os.listdir(directory)
-                            final_name = resolve_conflict(
-                                new_name_with_ext, existing_files
-                            )
-                            if args.dry_run:
-                                print(
-                                    f"{os.path.basename(file_path)} --dry-run-> {final_name}"
-                                )
-                                planned_renames.append((file_path, new_name))
-                            else:
-                                print(f"{os.path.basename(file_path)} --> {final_name}")
-                                rename_file(file_path, new_name)
-            finally:
-                # Clean up SVG tempdir if not in debug mode
-                if tempdir is not None:
-                    if args.debug:
-                        print(f"[DEBUG] Preserving SVG tempdir: {tempdir.name}")
-                    else:
-                        tempdir.cleanup()
-
-                # Clean up PDF tempdir if not in debug mode (if it exists in this scope)
-                if "pdf_tempdir" in locals() and pdf_tempdir is not None:
-                    if args.debug:
-                        print(f"[DEBUG] Preserving PDF tempdir: {pdf_tempdir.name}")
-                    else:
-                        pdf_tempdir.cleanup()
-
-                # Clean up file tempdir if not in debug mode (if it exists in this scope)
-                if "file_tempdir" in locals() and file_tempdir is not None:
-                    if args.debug:
-                        file_type = os.path.splitext(file_path)[1].upper().lstrip(".")
-                        print(
-                            f"[DEBUG] Preserving {file_type} tempdir: {file_tempdir.name}"
-                        )
-                    else:
-                        file_tempdir.cleanup()
+                except (DeadlineExceeded, subprocess.TimeoutExpired) as e:
+                    print(f"[BUDGET] {e}, skipping")
+                    summary.add_failed(file_path, e)
+                    continue
+                except RuntimeError as e:
+                    # A failed LLM call skips the file, not the rest of the run
+                    print(f"[ERROR] {file_path}: {e}")
+                    summary.add_failed(file_path, e)
+                    continue
+            if batcher is not None:
+                batcher.flush()
+        finally:
+            if plan_writer is not None:
+                plan_writer.close()
+                print(f"Wrote {plan_writer.count} entries to plan {args.plan_out}")
 
         if args.dry_run and args.interactive and planned_renames:
             confirm = input("\nProceed with these renames? [y/N]: ").strip().lower()
             if confirm == "y":
                 for file_path, new_name in planned_renames:
-                    directory = os.path.dirname(file_path) or "."
-                    _, ext = os.path.splitext(file_path)
-                    base_new_name, _ = os.path.splitext(new_name)
-                    new_name_with_ext = base_new_name + ext
-                    existing_files = os.listdir(directory)
-                    final_name = resolve_conflict(new_name_with_ext, existing_files)
-                    print(f"{os.path.basename(file_path)} --> {final_name}")
-                    rename_file(file_path, new_name)
+                    apply_suggestion(file_path, new_name)
             else:
                 print("Aborted. No files were renamed.")
+        planned_renames.close()
+
+        if budget.stopped:
+            print(
+                f"[BUDGET] Stopped: {budget.stopped}; {summary.done_count} files "
+                f"done, {summary.remaining_count} not started"
+            )
+        summary_path = args.summary or args.resume
+        if summary_path is None and budget.stopped:
+            summary_path = DEFAULT_SUMMARY_PATH
+        if summary_path:
+            summary.write(summary_path, budget)
+            print(f"Wrote run summary to {summary_path}")
+        summary.close()
+
+        if local_namer is not None:
+            print(
+                f"Named {local_namer.named} files locally, "
+                f"{local_namer.escalated} escalated to the LLM"
+            )
+        if near_duplicates is not None:
+            print(
+                f"Near-duplicates: {near_duplicates.reused} names reused, "
+                f"{near_duplicates.diff_prompts} named from their differences"
+            )
+        extraction_cache = dispatcher.extraction_cache
+        if extraction_cache is not None:
+            print(
+                f"Extraction cache: {extraction_cache.hits} hits, "
+                f"{extraction_cache.misses} extracted"
+            )
+        word_cache = get_word_cache(config)
+        if word_cache is not None:
+            print(
+                f"Word cache: {word_cache.hits} rendered locally, "
+                f"{word_cache.misses} sent to the model"
+            )
+        image_cache = get_image_cache(config)
+        if image_cache is not None:
+            print(
+                f"Image cache: {image_cache.hits} images reused, "
+                f"{image_cache.misses} sent to the model"
+            )
+        if PROFILER.enabled:
+            report_profile(args.profile_trace)
+        report_usage(config, args.usage_report)
+        if args.record or args.replay:
+            report_cassette(args.record or args.replay)
+        for pool in active_pools():
+            print()
+            print(pool.format_summary())
     except KeyboardInterrupt:
         print("\nOperation cancelled by user (Ctrl+C). Exiting gracefully.")
         return 130
@@ -409,11 +891,131 @@ def main(args=None):
     return 0
 
 
+def report_profile(trace_path: str | None = None) -> None:
+    """Print the stage timing summary and optionally export a Chrome trace."""
+    print("\nProfile:")
+    print(PROFILER.format_summary())
+    if trace_path:
+        PROFILER.export_chrome_trace(trace_path)
+        print(f"Chrome trace written to {trace_path}")
+
+
+def report_usage(config: dict, report_path: str | None = None) -> None:
+    """Print the token usage summary and optionally write the JSON report."""
+    pricing = get_pricing(config)
+    if LEDGER.calls:
+        print()
+        print(LEDGER.format_summary(pricing))
+    if report_path:
+        LEDGER.write_report(report_path, pricing)
+        print(f"Usage report written to {report_path}")
+
+
+def report_cassette(directory: str) -> None:
+    """Print how many requests were recorded or replayed."""
+    cassette = get_cassette(directory)
+    if cassette.recorded:
+        print(f"[CASSETTE] Recorded {cassette.recorded} requests into {directory}")
+    if cassette.hits or cassette.misses:
+        print(
+            f"[CASSETTE] Replayed {cassette.hits} requests from {directory} "
+            f"({cassette.misses} not found)"
+        )
+
+
+def apply_main(args: list[str]) -> int:
+    """Entry point for 'onomatool apply PLAN': apply a saved plan without the LLM."""
+    parser = argparse.ArgumentParser(
+        prog="onomatool apply",
+        description="Apply a rename plan written with --plan-out",
+    )
+    parser.add_argument("plan", help="Plan file (JSONL) written with --plan-out")
+    parser.add_argument(
+        "-d",
+        "--dry-run",
+        action="store_true",
+        help="Show the renames the plan would perform without modifying files",
+    )
+    parser.add_argument(
+        "--no-hash",
+        action="store_true",
+        help=(
+            "Compare size and modification time instead of SHA-256 when checking "
+            "that files are unchanged (same host only)"
+        ),
+    )
+    args = parser.parse_args(args)
+    try:
+        stats = apply_plan(
+            args.plan, dry_run=args.dry_run, verify_hash=not args.no_hash
+        )
+    except (OSError, ValueError) as e:
+        print(f"An error occurred: {e}")
+        return 1
+    print(
+        f"Plan applied: {stats['renamed']} renamed, {stats['skipped']} changed, "
+        f"{stats['missing']} missing"
+    )
+    return 0
+
+
+def reformat_main(args: list[str]) -> int:
+    """
+    Entry point for 'onomatool reformat PATTERN --to CONVENTION': re-render
+    existing names in another naming convention locally, without the LLM.
+    """
+    parser = argparse.ArgumentParser(
+        prog="onomatool reformat",
+        description="Re-render file names in another naming convention (no LLM)",
+    )
+    parser.add_argument("pattern", help="Glob pattern to match files")
+    parser.add_argument(
+        "--to",
+        required=True,
+        choices=RENDERABLE_CONVENTIONS,
+        metavar="CONVENTION",
+        help=f"Target naming convention ({', '.join(RENDERABLE_CONVENTIONS)})",
+    )
+    parser.add_argument(
+        "-d",
+        "--dry-run",
+        action="store_true",
+        help="Show the renames without modifying files",
+    )
+    parser.add_argument("--config", help="Path to a config file (TOML)")
+    args = parser.parse_args(args)
+    config = get_config(args.config)
+    renamed = unchanged = 0
+    for file_path in sorted(iter_files(args.pattern)):
+        if not os.path.isfile(file_path):
+            continue
+        stem, ext = os.path.splitext(os.path.basename(file_path))
+        # Existing names are kept however short they are
+        new_name = render_name(
+            name_words(stem),
+            args.to,
+            max_words=config.get("max_filename_words", 15),
+        )
+        if new_name is None or new_name == stem:
+            unchanged += 1
+            continue
+        try:
+            # With the extension, a dot.notation name keeps its last word
+            apply_suggestion(file_path, new_name + ext, args.dry_run)
+        except OSError as e:
+            print(f"Error renaming {file_path}: {e}")
+            continue
+        renamed += 1
+    action = "would be renamed" if args.dry_run else "renamed"
+    print(f"Reformatted to {args.to}: {renamed} {action}, {unchanged} unchanged")
+    return 0
+
+
 def save_default_config():
     """Save default configuration to ~/.onomarc"""
     config_path = os.path.expanduser("~/.onomarc")
     # Ensure llm_model is in the main section and not in markitdown
-    config = DEFAULT_CONFIG.copy()
+    config = DEFAULTS.to_dict()
     if "markitdown" in config and "llm_model" in config["markitdown"]:
         del config["markitdown"]["llm_model"]
     config["llm_model"] = config.get("llm_model", "gpt-4o")
@@ -1,4 +1,6 @@
 import os
+from collections.abc import Mapping
+from types import MappingProxyType
 from typing import Any
 
 import toml
@@ -13,6 +15,8 @@ DEFAULT_CONFIG = {
     "azure_openai_deployment": "",
     "use_azure_openai": False,
     "google_api_key": "",
+    "google_base_url": "",
+    "google_model": "gemini-2.5-flash",
     "naming_convention": "snake_case",
     "llm_model": "gpt-4o",
     "min_filename_words": 5,
@@ -20,26 +24,221 @@ DEFAULT_CONFIG = {
     "system_prompt": "",
     "user_prompt": "",
     "image_prompt": "",
+    "batch_prompt": "",
+    "batch_tokens": 0,
+    "stream_suggestions": True,
+    "llm_timeout": 60.0,
+    "file_deadline": 0.0,
+    "openai_endpoints": [],
+    "endpoint_pool": {
+        "max_failures": 3,
+        "eject_seconds": 30.0,
+        "hedge": False,
+        "hedge_percentile": 95.0,
+    },
+    "model_tiers": [],
+    "hard_file_types": [],
+    "naming_conventions": {},
+    "local_naming": {
+        "enabled": False,
+        "min_confidence": 0.7,
+    },
+    "near_duplicates": {
+        "enabled": False,
+        "threshold": 0.7,
+        "reuse_threshold": 0.9,
+        "index_path": "",
+    },
+    "normalize_content": True,
+    "distill": {
+        "enabled": True,
+        "max_tokens": 2000,
+    },
+    "extraction_cache": {
+        "enabled": False,
+        "path": "~/.cache/onomatool/extractions",
+        "max_size_mb": 2048,
+    },
+    "word_cache": {
+        "enabled": False,
+        "path": "",
+    },
+    "image_cache": {
+        "enabled": False,
+        "algorithm": "phash",
+        "max_distance": 4,
+        "path": "",
+    },
+    "pricing": {},
     "markitdown": {
         "enable_plugins": False,
         "docintel_endpoint": "",
+        "subprocess_timeout": 300.0,
     },
 }
 
 
-def get_config(config_path: str | None = None) -> dict[str, Any]:
+class FrozenList(tuple):
+    """Read-only list setting; compares equal to the equivalent list."""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if isinstance(other, list):
+            other = tuple(other)
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = tuple.__hash__
+
+
+def _freeze(value):
+    """Deep-copy dicts and lists into read-only mappings and tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return FrozenList(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _merge(base: Mapping, overrides: Mapping) -> dict:
+    """Merge overrides into base; nested tables are merged key by key."""
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def validate_config(data: Mapping) -> None:
+    """
+    Check the types of known settings against DEFAULT_CONFIG.
+
+    Raises:
+        ValueError: If a setting has the wrong type or the word limits are invalid
+    """
+    errors = []
+    for key, default in DEFAULT_CONFIG.items():
+        value = data.get(key)
+        if value is None:
+            continue
+        if isinstance(default, bool) or isinstance(value, bool):
+            ok = isinstance(value, bool) == isinstance(default, bool)
+        elif isinstance(default, Mapping):
+            ok = isinstance(value, Mapping)
+        elif isinstance(default, list):
+            ok = isinstance(value, (list, tuple))
+        elif isinstance(default, float):
+            ok = isinstance(value, (int, float))
+        else:
+            ok = isinstance(value, type(default))
+        if not ok:
+            errors.append(f"{key} must be {type(default).__name__}")
+    min_words = data.get("min_filename_words", 5)
+    max_words = data.get("max_filename_words", 15)
+    if isinstance(min_words, int) and isinstance(max_words, int):
+        if not 1 <= min_words <= max_words:
+            errors.append("min_filename_words must be between 1 and max_filename_words")
+    if errors:
+        raise ValueError("Invalid configuration: " + "; ".join(errors))
+
+
+class Config(Mapping):
+    """
+    Immutable configuration with DEFAULT_CONFIG merged in.
+
+    Behaves like a read-only dict (nested tables are read-only too) and compares
+    equal to the equivalent plain dict. Use `override()` for per-call changes.
+    Values derived from the settings, such as prompt templates split for prefix
+    caching, are memoized on the object with `cached()`, so they are computed
+    once per config instead of once per request.
+    """
+
+    __slots__ = ("_data", "_memo")
+
+    def __init__(self, data: Mapping | None = None, merge_defaults: bool = True):
+        merged = _merge(DEFAULT_CONFIG, data or {}) if merge_defaults else data
+        validate_config(merged)
+        self._data = _freeze(merged)
+        self._memo = {}
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"Config({self.to_dict()!r})"
+
+    def override(self, **changes) -> "Config":
+        """Return a new Config with some settings replaced (nested tables merged)."""
+        return Config(_merge(self._data, changes), merge_defaults=False)
+
+    def cached(self, key, factory):
+        """Return the memoized value for key, computing it with factory() once."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = factory()
+            return value
+
+    def to_dict(self) -> dict[str, Any]:
+        """A mutable deep copy as plain dicts and lists (e.g., for toml.dump)."""
+        return _thaw(self._data)
+
+
+# Loaded configs keyed by (path, mtime_ns, size); see get_config
+_CONFIG_CACHE: dict[tuple, Config] = {}
+
+DEFAULTS = Config()
+
+
+def get_config(config_path: str | None = None) -> Config:
     """
     Load configuration from the given config_path or from ~/.onomarc if not specified.
-    Returns the config as a dict, or DEFAULT_CONFIG if loading fails.
+
+    Configs are loaded once and shared: the same file (unchanged on disk) always
+    returns the same frozen Config.
+
+    Returns:
+        The Config with defaults merged in, or the defaults if loading fails.
+
+    Raises:
+        ValueError: If the file loads but a setting is invalid
     """
     if config_path is None:
         config_path = os.path.expanduser("~/.onomarc")
     else:
         config_path = os.path.expanduser(config_path)
-    if os.path.exists(config_path):
+    if not os.path.exists(config_path):
+        return DEFAULTS
+    try:
+        st = os.stat(config_path)
+        key = (os.path.abspath(config_path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        return DEFAULTS
+    config = _CONFIG_CACHE.get(key)
+    if config is None:
         try:
             with open(config_path) as f:
-                return toml.load(f)
+                data = toml.load(f)
         except Exception:
-            pass
-    return DEFAULT_CONFIG
+            return DEFAULTS
+        config = _CONFIG_CACHE[key] = Config(data)
+    return config
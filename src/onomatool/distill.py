@@ -0,0 +1,261 @@
+"""
+Content distillation: a compact digest of long documents for the LLM.
+
+Long documents used to be sent as their first 120k characters, which is mostly
+body text with little naming signal. Content longer than `distill.max_tokens`
+(estimated at 4 characters per token) is replaced by a digest of the parts that
+name a document: title, front matter, metadata lines, the headings outline and
+the opening paragraphs. HTML contributes its `<title>`, meta tags and headings;
+codebases bundled for LLM ingestion contribute their file tree and README.
+Shorter content is sent unchanged.
+
+    [distill]
+    enabled = true
+    max_tokens = 2000
+"""
+
+import html
+import os
+import re
+
+from onomatool.batching import estimate_tokens
+
+MAX_OUTLINE_LINES = 60
+MAX_METADATA_LINES = 10
+MAX_TREE_LINES = 80
+OPENING_PARAGRAPHS = 3
+MAX_PARAGRAPH_CHARS = 600
+MAX_FRONT_MATTER_CHARS = 1_500
+MAX_README_CHARS = 3_000
+# Fewer file sections than this is a document with code in it, not a bundle
+MIN_BUNDLE_FILES = 3
+# Only the start of the content is scanned for HTML markers and metadata
+HEAD_CHARS = 2_000
+HTML_EXTENSIONS = {".html", ".htm", ".xhtml"}
+
+_FRONT_MATTER = re.compile(r"\A(?:---|\+\+\+)\s*\n(.*?)\n(?:---|\+\+\+)\s*\n", re.S)
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$", re.M)
+_METADATA = re.compile(
+    r"^\s*[*_]{0,2}([A-Z][\w ./-]{1,30}?)[*_]{0,2}\s*:\s*\S.{0,150}$"
+)
+_FENCE = re.compile(r"^\s*(```|~~~)")
+# Section headers of repomix, gitingest and hand-rolled bundles
+_FILE_HEADER = re.compile(
+    r"^(?:#{1,6}\s*(?:File:\s*)?|FILE:\s*|<file\s+path=\"|```)"
+    r"`?([\w.\-]+(?:/[\w.\-]+)*\.\w+|README|LICENSE|Makefile|Dockerfile)"
+    r"(?:`|\"\s*>)?\s*$",
+    re.M,
+)
+_TREE_START = re.compile(
+    r"^(?:#{1,6}\s*)?(?:directory[ _]structure|file[ _]tree|project structure)"
+    r"\s*:?\s*>?\s*$|^<directory_structure>\s*$",
+    re.M | re.I,
+)
+_TREE_END = re.compile(r"^\s*(?:```\s*$|</directory_structure>|#{1,6}\s|={3,})")
+
+_HTML_MARKER = re.compile(r"<!doctype\s+html|<html[\s>]", re.I)
+_HTML_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+_HTML_META = re.compile(r"<meta\s[^>]*>", re.I)
+_HTML_ATTR = re.compile(r"([\w:-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)')")
+_HTML_HEADING = re.compile(r"<h([1-3])[^>]*>(.*?)</h\1>", re.I | re.S)
+_HTML_PARAGRAPH = re.compile(r"<p[^>]*>(.*?)</p>", re.I | re.S)
+_HTML_TAG = re.compile(r"<[^>]+>")
+_HTML_SKIP = re.compile(r"<(script|style|noscript)[^>]*>.*?</\1>", re.I | re.S)
+_META_NAMES = {
+    "description",
+    "keywords",
+    "author",
+    "og:title",
+    "og:description",
+    "og:site_name",
+    "twitter:title",
+    "article:published_time",
+    "date",
+}
+
+
+def _clean_html(fragment: str) -> str:
+    return " ".join(html.unescape(_HTML_TAG.sub(" ", fragment)).split())
+
+
+def _html_sections(content: str) -> list[tuple[str, str]]:
+    content = _HTML_SKIP.sub(" ", content)
+    sections = []
+    title = _HTML_TITLE.search(content)
+    if title and _clean_html(title.group(1)):
+        sections.append(("Title", _clean_html(title.group(1))))
+    meta = []
+    for tag in _HTML_META.findall(content):
+        attrs = {
+            name.lower(): double or single
+            for name, double, single in _HTML_ATTR.findall(tag)
+        }
+        name = (attrs.get("name") or attrs.get("property") or "").lower()
+        if name in _META_NAMES and attrs.get("content", "").strip():
+            meta.append(f"{name}: {' '.join(attrs['content'].split())}")
+    if meta:
+        sections.append(("Metadata", "\n".join(meta[:MAX_METADATA_LINES])))
+    outline = [
+        "  " * (int(level) - 1) + _clean_html(text)
+        for level, text in _HTML_HEADING.findall(content)
+        if _clean_html(text)
+    ]
+    if outline:
+        sections.append(("Outline", "\n".join(outline[:MAX_OUTLINE_LINES])))
+    paragraphs = [
+        _clean_html(p)[:MAX_PARAGRAPH_CHARS]
+        for p in _HTML_PARAGRAPH.findall(content)
+        if _clean_html(p)
+    ]
+    if paragraphs:
+        sections.append(
+            ("Opening paragraphs", "\n\n".join(paragraphs[:OPENING_PARAGRAPHS]))
+        )
+    return sections
+
+
+def _file_tree(content: str, paths: list[str]) -> str:
+    start = _TREE_START.search(content)
+    if start:
+        lines = []
+        for line in content[start.end() :].lstrip("\n").splitlines():
+            if lines and _TREE_END.match(line):
+                break
+            if line.strip() and not _FENCE.match(line):
+                lines.append(line.rstrip())
+            if len(lines) >= MAX_TREE_LINES:
+                break
+        if lines:
+            return "\n".join(lines)
+    return "\n".join(dict.fromkeys(paths[:MAX_TREE_LINES]))
+
+
+def _bundle_sections(content: str, headers: list[re.Match]) -> list[tuple[str, str]]:
+    sections = []
+    intro = content[: headers[0].start()].strip()
+    if intro:
+        sections.append(("Bundle header", intro[:MAX_PARAGRAPH_CHARS]))
+    sections.append(("File tree", _file_tree(content, [m.group(1) for m in headers])))
+    for i, match in enumerate(headers):
+        if os.path.basename(match.group(1)).lower().startswith("readme"):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(content)
+            readme = content[match.end() : end].strip().strip("`").strip()
+            sections.append(("README", readme[:MAX_README_CHARS]))
+            break
+    return sections
+
+
+def _outside_fences(body: str) -> str:
+    """The text with fenced code blocks removed."""
+    lines = []
+    in_fence = False
+    for line in body.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _paragraphs(prose: str):
+    """Prose blocks: no headings, tables, lists, HTML or metadata lines."""
+    block: list[str] = []
+    for line in prose.splitlines() + [""]:
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("#", "|", "<", "- ", "* ", ">", "---")):
+            if block:
+                yield " ".join(block)
+                block = []
+            continue
+        if not block and _METADATA.match(line):
+            continue
+        block.append(stripped)
+
+
+def _markdown_sections(content: str) -> list[tuple[str, str]]:
+    sections = []
+    prose = content
+    front_matter = _FRONT_MATTER.match(content)
+    if front_matter:
+        sections.append(
+            ("Front matter", front_matter.group(1)[:MAX_FRONT_MATTER_CHARS])
+        )
+        prose = content[front_matter.end() :]
+    prose = _outside_fences(prose)
+    headings = _HEADING.findall(prose)
+    title = next((text for level, text in headings if level == "#"), None)
+    if title is None:
+        title = next((line.strip() for line in prose.splitlines() if line.strip()), "")
+    sections.append(("Title", title[:200]))
+    metadata = [
+        line.strip()
+        for line in prose[:HEAD_CHARS].splitlines()
+        if _METADATA.match(line)
+    ]
+    if metadata:
+        sections.append(("Metadata", "\n".join(metadata[:MAX_METADATA_LINES])))
+    paragraphs = []
+    for paragraph in _paragraphs(prose):
+        paragraphs.append(paragraph[:MAX_PARAGRAPH_CHARS])
+        if len(paragraphs) >= OPENING_PARAGRAPHS:
+            break
+    if paragraphs:
+        sections.append(("Opening paragraphs", "\n\n".join(paragraphs)))
+    # Last, so that a long outline is what the token budget cuts short
+    if len(headings) > 1:
+        outline = list(
+            dict.fromkeys("  " * (len(level) - 1) + text for level, text in headings)
+        )
+        sections.append(("Outline", "\n".join(outline[:MAX_OUTLINE_LINES])))
+    return sections
+
+
+def distill(content: str, file_path: str | None = None, max_tokens: int = 2000) -> str:
+    """
+    A digest of `content` within roughly `max_tokens`, or the content itself
+    if it already fits.
+
+    Args:
+        content: Extracted text or markdown of a file
+        file_path: The file's path (its extension helps detect HTML)
+        max_tokens: Token budget for the digest
+
+    Returns:
+        The digest, prefixed with a note on how it was made
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return content
+    ext = os.path.splitext(file_path or "")[1].lower()
+    headers = list(_FILE_HEADER.finditer(content))
+    if ext in HTML_EXTENSIONS or _HTML_MARKER.search(content[:HEAD_CHARS]):
+        kind, sections = "HTML page", _html_sections(content)
+    elif len(headers) >= MIN_BUNDLE_FILES:
+        kind, sections = "codebase bundle", _bundle_sections(content, headers)
+    else:
+        kind, sections = "document", _markdown_sections(content)
+    budget = max_tokens * 4
+    parts = [
+        f"[Digest of a {len(content):,}-character {kind}: title, metadata, "
+        "structure and opening text]"
+    ]
+    used = len(parts[0])
+    for label, text in sections:
+        if not text:
+            continue
+        part = f"{label}:\n{text}"
+        if used + len(part) + 2 > budget:
+            remaining = budget - used - 2
+            if remaining > len(label) + 50:
+                parts.append(part[:remaining])
+            break
+        parts.append(part)
+        used += len(part) + 2
+    return "\n\n".join(parts)
+
+
+def distill_for_config(content: str, file_path: str | None, config) -> str:
+    """`distill()` with the config's `distill` settings (content unchanged if disabled)."""
+    settings = config.get("distill") or {}
+    if not content or not settings.get("enabled", True):
+        return content
+    return distill(content, file_path, settings.get("max_tokens", 2000))
@@ -0,0 +1,262 @@
+"""
+Pool of OpenAI-compatible endpoints (vLLM, llama.cpp replicas).
+
+Configured in .onomarc instead of a single `openai_base_url`:
+
+    [[openai_endpoints]]
+    url = "http://gpu-a:8000/v1"
+    weight = 2
+
+    [[openai_endpoints]]
+    url = "http://gpu-b:8000/v1"
+
+    [endpoint_pool]
+    max_failures = 3      # consecutive failures before an endpoint is ejected
+    eject_seconds = 30.0  # how long an ejected endpoint is left alone
+    hedge = true          # duplicate slow calls to a second endpoint
+
+Each call goes to the healthy endpoint with the fewest outstanding requests
+relative to its weight. Connection errors, 5xx and 429 responses count as
+endpoint failures; an endpoint is ejected after `max_failures` in a row and
+re-admitted on trial once `eject_seconds` have passed. With hedging, a call
+still running after the pool's p95 latency is sent to a second endpoint as well
+and the first successful answer wins.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from onomatool.profiling import percentile
+
+# Latency samples needed before hedging starts
+HEDGE_MIN_SAMPLES = 20
+
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="onoma_hedge")
+
+
+def is_endpoint_error(err: BaseException) -> bool:
+    """Whether an error says the endpoint (not the request) is unhealthy."""
+    import openai
+
+    while err is not None:
+        if isinstance(err, openai.APIConnectionError):
+            return True
+        if isinstance(err, openai.APIStatusError):
+            return err.status_code >= 500 or err.status_code == 429
+        err = err.__cause__ or err.__context__
+    return False
+
+
+class Endpoint:
+    """One replica and its health and load counters."""
+
+    def __init__(self, url: str, weight: float = 1.0, api_key: str | None = None):
+        self.url = url
+        self.weight = weight
+        self.api_key = api_key
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.latencies: deque = deque(maxlen=200)
+
+
+class EndpointPool:
+    """
+    Weighted least-outstanding-requests pool with passive health checks.
+
+    Args:
+        endpoints: The endpoints, in configuration order
+        max_failures: Consecutive endpoint errors before ejection
+        eject_seconds: How long an ejected endpoint is skipped
+        hedge: Duplicate calls slower than the pool's p95 latency
+        hedge_percentile: Latency percentile that triggers a hedge
+        clock: Monotonic time source (for tests)
+    """
+
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        clock=time.monotonic,
+    ):
+        if not endpoints:
+            raise ValueError("An endpoint pool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.clock = clock
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def select(self, exclude=()) -> Endpoint | None:
+        """
+        Pick and reserve the endpoint for the next call.
+
+        Healthy endpoints are preferred; if every endpoint is ejected, the one
+        whose ejection ends first is used. Returns None only if all endpoints are
+        excluded.
+        """
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None
+            now = self.clock()
+            healthy = [e for e in candidates if e.ejected_until <= now]
+            if healthy:
+                endpoint = min(
+                    healthy, key=lambda e: (e.outstanding + 1) / max(e.weight, 1e-9)
+                )
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, error: BaseException | None, elapsed: float):
+        """Return a reserved endpoint and update its health."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.consecutive_failures = 0
+                endpoint.latencies.append(elapsed)
+                return
+            if not is_endpoint_error(error):
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.max_failures:
+                # A failed trial after re-admission ejects again straight away
+                endpoint.ejected_until = self.clock() + self.eject_seconds
+                endpoint.ejections += 1
+                print(
+                    f"[POOL] Ejecting {endpoint.url} for {self.eject_seconds:g}s "
+                    f"after {endpoint.consecutive_failures} failures"
+                )
+
+    def hedge_delay(self) -> float | None:
+        """Delay before hedging a call, or None while there are too few samples."""
+        with self._lock:
+            samples = [t for e in self.endpoints for t in e.latencies]
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(samples, self.hedge_percentile)
+
+    def _run(self, endpoint: Endpoint, call):
+        start = time.perf_counter()
+        try:
+            result = call(endpoint)
+        except BaseException as err:
+            self.release(endpoint, err, time.perf_counter() - start)
+            raise
+        self.release(endpoint, None, time.perf_counter() - start)
+        return result
+
+    def call(self, call):
+        """
+        Run `call(endpoint)` on the pool.
+
+        A call that fails with an endpoint error is retried once on another
+        endpoint. With hedging enabled, a call still running after the hedge
+        delay is duplicated to a second endpoint and the first success wins.
+        """
+        endpoint = self.select()
+        delay = self.hedge_delay() if self.hedge and len(self.endpoints) > 1 else None
+        if delay is None:
+            try:
+                return self._run(endpoint, call)
+            except Exception as err:
+                retry = (
+                    self.select(exclude={endpoint}) if is_endpoint_error(err) else None
+                )
+                if retry is None:
+                    raise
+                return self._run(retry, call)
+
+        primary = _HEDGE_EXECUTOR.submit(self._run, endpoint, call)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        second = self.select(exclude={endpoint})
+        if second is None:
+            return primary.result()
+        with self._lock:
+            self.hedged += 1
+        hedge = _HEDGE_EXECUTOR.submit(self._run, second, call)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def format_summary(self) -> str:
+        """Per-endpoint requests, failures and ejections, plus hedging counts."""
+        lines = [f"{'endpoint':<40}{'requests':>9}{'failures':>9}{'ejected':>8}"]
+        for e in self.endpoints:
+            lines.append(f"{e.url:<40}{e.requests:>9}{e.failures:>9}{e.ejections:>8}")
+        if self.hedge:
+            lines.append(
+                f"Hedged calls: {self.hedged} ({self.hedge_wins} won by hedge)"
+            )
+        return "\n".join(lines)
+
+
+# Pools shared by every config with the same endpoint settings
+_POOLS: dict[tuple, EndpointPool] = {}
+
+
+def get_endpoint_pool(config) -> EndpointPool | None:
+    """
+    The shared pool for a config's `openai_endpoints`, or None if not set.
+
+    Raises:
+        ValueError: If an endpoint has no url
+    """
+    specs = config.get("openai_endpoints") or ()
+    if not specs:
+        return None
+    settings = config.get("endpoint_pool") or {}
+    key = (
+        tuple(
+            (spec.get("url"), spec.get("weight", 1.0), spec.get("api_key"))
+            for spec in specs
+        ),
+        tuple(sorted(settings.items())),
+    )
+    pool = _POOLS.get(key)
+    if pool is None:
+        endpoints = []
+        for index, (url, weight, api_key) in enumerate(key[0]):
+            if not url:
+                raise ValueError(f"openai_endpoints[{index}] needs a 'url'")
+            endpoints.append(Endpoint(url, float(weight), api_key))
+        pool = _POOLS[key] = EndpointPool(
+            endpoints,
+            max_failures=settings.get("max_failures", 3),
+            eject_seconds=settings.get("eject_seconds", 30.0),
+            hedge=settings.get("hedge", False),
+            hedge_percentile=settings.get("hedge_percentile", 95.0),
+        )
+    return pool
+
+
+def active_pools() -> list[EndpointPool]:
+    """Pools that have served at least one request."""
+    return [pool for pool in _POOLS.values() if any(e.requests for e in pool.endpoints)]
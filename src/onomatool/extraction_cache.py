@@ -0,0 +1,203 @@
+"""
+Persistent cache of extraction results (`--extraction-cache`).
+
+Changing the prompt, model or naming convention does not change what
+MarkItDown, PyMuPDF, soffice/ImageMagick and cairosvg extract from a file, yet
+every run used to repeat that work. Each extraction result (markdown plus any
+page, slide or SVG images) is stored as one zip file keyed by a hash of the
+file's content and the settings that shape the output: the MarkItDown options
+and the rendering settings (DPI, density, maximum edge, quality). The cache is
+separate from LLM response cassettes and is bounded in size: once it grows
+past `max_size_mb`, the least recently used entries are evicted.
+
+    [extraction_cache]
+    enabled = true
+    path = "~/.cache/onomatool/extractions"
+    max_size_mb = 2048
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+from onomatool.profiling import span
+
+DEFAULT_CACHE_DIR = "~/.cache/onomatool/extractions"
+# Bump when a change to the processors changes their output
+CACHE_VERSION = 1
+ENTRY_SUFFIX = ".zip"
+# Eviction frees space down to this fraction of the limit
+EVICT_TO = 0.9
+_MARKDOWN_NAME = "markdown.md"
+_IMAGE_DIR = "images/"
+
+
+def file_digest(file_path: str) -> str:
+    """BLAKE2b digest of a file's content."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _debug_tempdir(prefix: str):
+    """A temp directory that `cleanup()` leaves in place (as in debug mode)."""
+    path = tempfile.mkdtemp(prefix=prefix)
+    return type("TempDir", (), {"name": path, "cleanup": lambda: None})()
+
+
+class ExtractionCache:
+    """Size-bounded directory of extraction results keyed by content and settings."""
+
+    def __init__(self, directory: str, max_bytes: int, debug: bool = False):
+        """
+        Args:
+            directory: Cache directory (created on first write)
+            max_bytes: Total size of the entries that triggers eviction
+            debug: Restored images go to temp directories kept after the run
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.debug = debug
+        self.hits = 0
+        self.misses = 0
+        self._size: int | None = None
+
+    @classmethod
+    def from_config(cls, config, debug: bool = False) -> "ExtractionCache | None":
+        """The cache for a config's `extraction_cache` table, or None if disabled."""
+        settings = config.get("extraction_cache") or {}
+        if not settings.get("enabled", False):
+            return None
+        directory = os.path.expanduser(settings.get("path") or DEFAULT_CACHE_DIR)
+        max_bytes = int(float(settings.get("max_size_mb", 2048)) * 1024 * 1024)
+        return cls(directory, max_bytes, debug=debug)
+
+    def key(self, file_path: str, settings: dict) -> str:
+        """Cache key of a file's content under the given processor settings."""
+        material = json.dumps(
+            {"version": CACHE_VERSION, "file": file_digest(file_path), **settings},
+            sort_keys=True,
+        )
+        return hashlib.blake2b(material.encode("utf-8"), digest_size=20).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.stat(path)
+                    except FileNotFoundError:
+                        continue
+
+    @property
+    def size(self) -> int:
+        """Total bytes of the cached entries (scanned once, then tracked)."""
+        if self._size is None:
+            self._size = sum(stat.st_size for _, stat in self._entries())
+        return self._size
+
+    def get(self, key: str, directory: str | None = None):
+        """
+        A cached extraction result, or None on a miss.
+
+        Args:
+            key: Key from `key()`
+            directory: Where to restore images (default: a new temp directory)
+
+        Returns:
+            The markdown string, or a dict with 'markdown' and 'images' when the
+            result had images. Images restored into a new temp directory come
+            with it as 'tempdir', for the caller to clean up as it would after
+            a fresh extraction.
+        """
+        path = self._entry_path(key)
+        try:
+            with span("extraction_cache_read"), zipfile.ZipFile(path) as archive:
+                markdown = archive.read(_MARKDOWN_NAME).decode("utf-8")
+                image_names = sorted(
+                    (n for n in archive.namelist() if n.startswith(_IMAGE_DIR)),
+                    key=lambda n: int(n[len(_IMAGE_DIR) :].split("_", 1)[0]),
+                )
+                if not image_names:
+                    result = markdown
+                else:
+                    result = {"markdown": markdown}
+                    if directory is None:
+                        tempdir = (
+                            _debug_tempdir("onoma_cached_")
+                            if self.debug
+                            else tempfile.TemporaryDirectory(prefix="onoma_cached_")
+                        )
+                        result["tempdir"] = tempdir
+                        directory = tempdir.name
+                    images = []
+                    for name in image_names:
+                        image_path = os.path.join(
+                            directory, name[len(_IMAGE_DIR) :].split("_", 1)[1]
+                        )
+                        with open(image_path, "wb") as f:
+                            f.write(archive.read(name))
+                        images.append(image_path)
+                    result["images"] = images
+        except (FileNotFoundError, KeyError, ValueError, zipfile.BadZipFile):
+            self.misses += 1
+            return None
+        # Entries are evicted least recently used first
+        os.utime(path)
+        self.hits += 1
+        return result
+
+    def put(self, key: str, markdown: str, images: list[str] | None = None) -> None:
+        """Store an extraction result, then evict old entries if over the limit."""
+        path = self._entry_path(key)
+        size = self.size
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with span("extraction_cache_write"):
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr(_MARKDOWN_NAME, markdown or "")
+                for index, image_path in enumerate(images or ()):
+                    # Page images are PNG/JPEG already; storing skips recompression
+                    archive.write(
+                        image_path,
+                        f"{_IMAGE_DIR}{index}_{os.path.basename(image_path)}",
+                        compress_type=zipfile.ZIP_STORED,
+                    )
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        self._size = size - replaced + os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache is well under its limit.
+
+        Returns:
+            Number of entries deleted
+        """
+        entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        target = self.max_bytes * EVICT_TO
+        deleted = 0
+        for path, stat in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= stat.st_size
+            deleted += 1
+        self._size = total
+        return deleted
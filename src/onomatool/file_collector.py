@@ -12,3 +12,19 @@ def collect_files(pattern: str) -> list[str]:
         List of file paths matching the pattern
     """
     return glob.glob(pattern, recursive=True)
+
+
+def iter_files(pattern: str):
+    """
+    Lazily yield files matching the given glob pattern.
+
+    Unlike collect_files, the full match list is never built; only one directory
+    listing is held at a time, so memory stays flat on very large trees.
+
+    Args:
+        pattern: Glob pattern to match files
+
+    Yields:
+        File paths matching the pattern
+    """
+    yield from glob.iglob(pattern, recursive=True)
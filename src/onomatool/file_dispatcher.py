@@ -1,5 +1,10 @@
-from .processors.markitdown_processor import MarkitdownProcessor
+import os
+
+from .extraction_cache import ExtractionCache
+from .processors.markitdown_processor import RENDER_SETTINGS, MarkitdownProcessor
 from .processors.text_processor import TextProcessor
+from .profiling import span
+from .utils.image_utils import SVG_MAX_SIDE, convert_svg_to_png
 
 
 class FileDispatcher:
@@ -41,6 +46,8 @@ class FileDispatcher:
         self.markitdown_processor = MarkitdownProcessor(
             self.config.get("markitdown", {}), debug=debug
         )
+        # Text files are cheaper to read again than to look up
+        self.extraction_cache = ExtractionCache.from_config(config, debug=debug)
 
     def get_processor(self, file_path: str) -> object:
         """Get appropriate processor for the given file"""
@@ -55,7 +62,60 @@ class FileDispatcher:
         # Use markitdown for all other supported formats
         return self.markitdown_processor
 
+    def _cache_key(self, file_path: str, settings: dict) -> str | None:
+        try:
+            return self.extraction_cache.key(file_path, settings)
+        except OSError:
+            return None
+
     def process(self, file_path: str):
         """Process a file using the appropriate processor"""
         processor = self.get_processor(file_path)
-        return processor.process(file_path)
+        key = None
+        if self.extraction_cache is not None and processor is self.markitdown_processor:
+            markitdown_config = self.config.get("markitdown") or {}
+            key = self._cache_key(
+                file_path,
+                {
+                    "processor": "markitdown",
+                    "ext": os.path.splitext(file_path)[1].lower(),
+                    "enable_plugins": markitdown_config.get("enable_plugins", False),
+                    "docintel_endpoint": markitdown_config.get("docintel_endpoint"),
+                    "render": RENDER_SETTINGS,
+                },
+            )
+            if key is not None:
+                cached = self.extraction_cache.get(key)
+                if cached is not None:
+                    return cached
+        with span("extract", processor=type(processor).__name__):
+            result = processor.process(file_path)
+        if key is not None and result:
+            if isinstance(result, str):
+                self.extraction_cache.put(key, result)
+            else:
+                self.extraction_cache.put(
+                    key, result.get("markdown", ""), result.get("images")
+                )
+        return result
+
+    def render_svg(self, file_path: str, tempdir: str) -> str:
+        """
+        Render an SVG to a PNG in tempdir (through the extraction cache).
+
+        Raises:
+            RuntimeError: If conversion fails or cairosvg is not installed
+        """
+        key = None
+        if self.extraction_cache is not None:
+            key = self._cache_key(
+                file_path, {"processor": "cairosvg", "max_side": SVG_MAX_SIDE}
+            )
+            if key is not None:
+                cached = self.extraction_cache.get(key, directory=tempdir)
+                if isinstance(cached, dict) and cached["images"]:
+                    return cached["images"][0]
+        png_path = convert_svg_to_png(file_path, tempdir)
+        if key is not None:
+            self.extraction_cache.put(key, "", [png_path])
+        return png_path
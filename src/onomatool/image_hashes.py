@@ -0,0 +1,268 @@
+"""
+Reuse of vision suggestions for near-identical images (`--image-cache`).
+
+Photo bursts, re-exported screenshots and resized copies look the same to the
+vision model but would each cost an image call. Every image sent to the model
+(image files, rendered PDF pages, SVG rasters) is reduced to a 64-bit
+perceptual hash: pHash (DCT of a 32x32 grayscale thumbnail) by default, or the
+cheaper dHash (gradient of a 9x8 thumbnail). Hashes of named images are kept in
+a BK-tree per naming convention, so images within `max_distance` bits are found
+without comparing against every stored hash, and their suggestions are reused.
+The cache lives for the run and can be persisted to a JSONL file with `path`:
+
+    [image_cache]
+    enabled = true
+    algorithm = "phash"
+    max_distance = 4
+    path = "~/.cache/onomatool/image_hashes.jsonl"
+"""
+
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from onomatool.profiling import span
+
+HASH_BITS = 64
+ALGORITHMS = ("phash", "dhash")
+
+_PHASH_SIZE = 32
+_PHASH_LOW = 8
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so that `m @ x @ m.T` is the 2-D DCT of `x`."""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(_PHASH_SIZE)
+
+
+def _grayscale(image: Image.Image, size: tuple[int, int]) -> np.ndarray:
+    if image.mode in ("RGBA", "LA", "P"):
+        # Flatten transparency onto white, as viewers (and the model) see it
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    image = image.convert("L").resize(size, Image.Resampling.LANCZOS)
+    return np.asarray(image, dtype=np.float64)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: whether each pixel is brighter than its neighbour."""
+    pixels = _grayscale(image, (9, 8))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image: Image.Image) -> int:
+    """64-bit perceptual hash: low DCT frequencies above their median."""
+    pixels = _grayscale(image, (_PHASH_SIZE, _PHASH_SIZE))
+    low = (_DCT @ pixels @ _DCT.T)[:_PHASH_LOW, :_PHASH_LOW].ravel()
+    # The DC term only encodes overall brightness
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def image_hash(image_path: str, algorithm: str = "phash") -> int | None:
+    """
+    Perceptual hash of an image file, or None if it cannot be read.
+
+    Raises:
+        ValueError: If the algorithm is unknown
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown image hash algorithm: {algorithm}")
+    try:
+        with span("image_hash"), Image.open(image_path) as image:
+            image.load()
+            return phash(image) if algorithm == "phash" else dhash(image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def hamming(first: int, second: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(first ^ second).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree of hashes under the Hamming distance."""
+
+    def __init__(self):
+        # Node: [hash, value, {distance: child node}]
+        self._root: list | None = None
+        self._size = 0
+
+    def add(self, key: int, value) -> None:
+        """Insert a hash; an identical hash replaces the stored value."""
+        if self._root is None:
+            self._root = [key, value, {}]
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            if distance == 0:
+                node[1] = value
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, value, {}]
+                self._size += 1
+                return
+            node = child
+
+    def search(self, key: int, max_distance: int) -> list[tuple[int, object]]:
+        """(distance, value) of every stored hash within `max_distance`, nearest first."""
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(key, node[0])
+            if distance <= max_distance:
+                found.append((distance, node[1]))
+            # Triangle inequality: only these subtrees can hold matches
+            for child_distance, child in node[2].items():
+                if abs(child_distance - distance) <= max_distance:
+                    stack.append(child)
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class ImageHashCache:
+    """Suggestions of named images, found again by perceptual hash."""
+
+    def __init__(
+        self,
+        max_distance: int = 4,
+        algorithm: str = "phash",
+        path: str | None = None,
+    ):
+        """
+        Args:
+            max_distance: Largest Hamming distance (of 64 bits) still reused
+            algorithm: "phash" or "dhash"
+            path: JSONL file to load from and append to (None keeps it in memory)
+
+        Raises:
+            ValueError: If the algorithm is unknown
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown image hash algorithm: {algorithm}")
+        self.max_distance = max_distance
+        self.algorithm = algorithm
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        # Naming convention -> BKTree of hash -> suggestions
+        self._trees: dict[str, BKTree] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _tree(self, naming_convention: str) -> BKTree:
+        tree = self._trees.get(naming_convention)
+        if tree is None:
+            tree = self._trees[naming_convention] = BKTree()
+        return tree
+
+    def load(self, path: str) -> None:
+        """Load hashes persisted by an earlier run (later lines win)."""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if record["algorithm"] != self.algorithm:
+                        continue
+                    key = int(record["hash"], 16)
+                    self._tree(record["naming_convention"]).add(
+                        key, list(record["suggestions"])
+                    )
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    continue
+
+    def hash(self, image_path: str) -> int | None:
+        return image_hash(image_path, self.algorithm)
+
+    def lookup(
+        self, key: int, naming_convention: str, min_suggestions: int = 1
+    ) -> list[str] | None:
+        """
+        Suggestions of the nearest stored image within `max_distance`.
+
+        Args:
+            key: Hash of the new image
+            naming_convention: Convention the suggestions must follow
+            min_suggestions: Skip entries with fewer suggestions (a cut-off
+                streamed response cannot serve a request for all three)
+        """
+        for _, suggestions in self._tree(naming_convention).search(
+            key, self.max_distance
+        ):
+            if len(suggestions) >= min_suggestions:
+                self.hits += 1
+                return list(suggestions)
+        self.misses += 1
+        return None
+
+    def add(self, key: int, naming_convention: str, suggestions: list[str]) -> None:
+        """Store an image's suggestions (and append them to the persisted cache)."""
+        if not suggestions:
+            return
+        self._tree(naming_convention).add(key, list(suggestions))
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            record = {
+                "hash": f"{key:016x}",
+                "algorithm": self.algorithm,
+                "naming_convention": naming_convention,
+                "suggestions": list(suggestions),
+            }
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def __len__(self) -> int:
+        return sum(len(tree) for tree in self._trees.values())
+
+
+_CACHES: dict[tuple, ImageHashCache] = {}
+
+
+def get_image_cache(config) -> ImageHashCache | None:
+    """
+    The shared cache for a config's `image_cache` table, or None if disabled.
+
+    Raises:
+        ValueError: If the algorithm is unknown
+    """
+    settings = config.get("image_cache") or {}
+    if not settings.get("enabled", False):
+        return None
+    path = settings.get("path") or None
+    if path:
+        path = os.path.abspath(os.path.expanduser(path))
+    key = (
+        path,
+        int(settings.get("max_distance", 4)),
+        settings.get("algorithm", "phash"),
+    )
+    cache = _CACHES.get(key)
+    if cache is None:
+        cache = _CACHES[key] = ImageHashCache(key[1], key[2], path)
+    return cache
@@ -2,15 +2,37 @@ import base64
 import json
 import mimetypes
 import os
+import time
 
 import tiktoken
+from pydantic import ValidationError
 
-from onomatool.config import get_config
+from onomatool.budget import DEADLINE, DeadlineExceeded, call_timeout
+from onomatool.cassette import get_cassette
+from onomatool.config import Config, get_config
+from onomatool.endpoints import get_endpoint_pool, is_endpoint_error
+from onomatool.image_hashes import get_image_cache
 from onomatool.models import (
-    generate_json_schema_from_model,
-    get_model_for_naming_convention,
+    NAMING_CONVENTION_MODELS,
+    get_batch_model_for_naming_convention,
+    get_naming_convention,
+    get_response_format,
+    get_unchecked_model,
+    register_config_conventions,
 )
-from onomatool.prompts import get_image_prompt, get_system_prompt, get_user_prompt
+from onomatool.naming import (
+    RENDERABLE_CONVENTIONS,
+    name_words,
+    render_for_config,
+    repair_name,
+    repair_names,
+)
+from onomatool.profiling import span
+from onomatool.prompts import format_batch_files, get_prompt_parts
+from onomatool.routing import is_generic_name, model_tiers
+from onomatool.streaming import SuggestionStreamParser
+from onomatool.usage import LEDGER
+from onomatool.word_cache import get_word_cache
 
 # Maximum tokens for LLM response - limits response to 100 tokens
 MAX_TOKENS = 100
@@ -18,14 +40,21 @@ MAX_TOKENS = 100
 # Maximum characters to send to LLM (approx 65,535 tokens)
 MAX_CONTENT_CHARS = 120_000
 
-# Maximum consecutive digits allowed in a single word - prevents extremely long number sequences
-MAX_CONSECUTIVE_DIGITS = 10
+
+# Backoff between retries under a file deadline (see _retry_until_deadline)
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# OpenAI clients keyed by their connection settings (see _get_cached_client)
+_CLIENT_CACHE: dict = {}
 
 
 def get_pydantic_model_and_schema(naming_convention: str) -> tuple:
     """
     Get the Pydantic model and JSON schema for a given naming convention.
 
+    Both come from the convention registry, so the schema is built only once.
+
     Args:
         naming_convention: The naming convention string (e.g., "snake_case")
 
@@ -33,14 +62,43 @@ def get_pydantic_model_and_schema(naming_convention: str) -> tuple:
         Tuple of (pydantic_model_class, json_schema_dict)
     """
     try:
-        model_class = get_model_for_naming_convention(naming_convention)
-        json_schema = generate_json_schema_from_model(model_class)
-        return model_class, json_schema
+        convention = get_naming_convention(naming_convention)
     except ValueError:
         # Fallback to snake_case if naming convention is not supported
-        model_class = get_model_for_naming_convention("snake_case")
-        json_schema = generate_json_schema_from_model(model_class)
-        return model_class, json_schema
+        convention = get_naming_convention("snake_case")
+    return convention.model, convention.response_format
+
+
+def _register_conventions(config) -> None:
+    """Register the config's custom naming conventions (once per Config)."""
+    if isinstance(config, Config):
+        config.cached("naming_conventions", lambda: register_config_conventions(config))
+    else:
+        register_config_conventions(config)
+
+
+def _get_cached_client(client_class, verify: bool | None = None, **kwargs):
+    """
+    Return a reusable OpenAI/AzureOpenAI client for the given settings.
+
+    Clients keep their HTTP connection pool alive between calls, so long runs and
+    watch mode do not pay connection setup for every request.
+
+    Args:
+        client_class: OpenAI or AzureOpenAI
+        verify: If not None, use a dedicated httpx client with this TLS setting
+        **kwargs: Keyword arguments for the client constructor
+    """
+    import httpx
+
+    key = (client_class.__name__, verify, tuple(sorted(kwargs.items())))
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        if verify is not None:
+            kwargs["http_client"] = httpx.Client(verify=verify)
+        client = client_class(**kwargs)
+        _CLIENT_CACHE[key] = client
+    return client
 
 
 def is_image_file(file_path: str) -> bool:
@@ -53,7 +111,7 @@ def is_image_file(file_path: str) -> bool:
 
 
 def encode_image_base64(image_path: str) -> str:
-    with open(image_path, "rb") as image_file:
+    with span("base64_encode"), open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 
@@ -62,15 +120,30 @@ def get_suggestions(
     verbose_level: int = 0,
     file_path: str | None = None,
     config: dict | None = None,
+    hard: bool = False,
+    first_only: bool | None = None,
 ) -> list[str]:
     """
     Query the configured LLM (OpenAI or Google) for filename suggestions using the appropriate JSON schema.
 
+    With `model_tiers` in config the cheapest tier is tried first (see
+    `onomatool.routing`). When only the first suggestion is needed, OpenAI
+    responses are streamed and cut off once it is complete (see
+    `onomatool.streaming`); fewer than three suggestions may then be returned.
+    Near-miss suggestions are repaired locally (see `repair_suggestions`).
+    With `word_cache` enabled, content named before in any built-in convention
+    is rendered from cached words without a call.
+    With `image_cache` enabled, images that are perceptually near-identical to
+    an already named one reuse its suggestions (see `onomatool.image_hashes`).
+
     Args:
         content: The file content to send to the LLM for analysis and suggestion.
         verbose_level: Verbosity level (0=none, 1=basic debug, 2=full debug).
         file_path: The path to the file being processed (used for image support).
         config: The configuration dictionary to use (if None, loads default config).
+        hard: Skip the cheap tiers and use the last (most capable) model tier.
+        first_only: Only the first suggestion will be used. None follows the
+            `first_suggestion_only` setting.
 
     Returns:
         List of filename suggestions (strings) as per the configured naming convention.
@@ -80,15 +153,11 @@ def get_suggestions(
     """
     if config is None:
         config = get_config()
+    _register_conventions(config)
     provider = config.get("default_provider", "openai")
     naming_convention = config.get("naming_convention", "snake_case")
     model = config.get("llm_model", "gpt-4o")
-    min_words = config.get("min_filename_words", 5)
-    max_words = config.get("max_filename_words", 15)
 
-    # Get Pydantic model and JSON schema for the naming convention
-    pydantic_model, json_schema = get_pydantic_model_and_schema(naming_convention)
-    system_prompt = get_system_prompt(config)
     # Limit text content to prevent exceeding LLM context limits
     truncated_content = content[:MAX_CONTENT_CHARS]
     if len(content) > MAX_CONTENT_CHARS and verbose_level > 0:
@@ -98,7 +167,11 @@ def get_suggestions(
 
     # Detect if this is an image file
     is_image = file_path and is_image_file(file_path)
-    image_message = None
+    call_kind = "image" if is_image else "text"
+    if first_only is None:
+        first_only = config.get("first_suggestion_only", False)
+    image_url = None
+    image_cache = image_key = None
     if is_image:
         ext = os.path.splitext(file_path)[1].lower()
         # Prevent sending raw SVGs directly to the LLM
@@ -106,6 +179,19 @@ def get_suggestions(
             raise RuntimeError(
                 "Raw SVG files must not be sent to the LLM. Convert to PNG first."
             )
+        image_cache = get_image_cache(config)
+        if image_cache is not None:
+            image_key = image_cache.hash(file_path)
+        if image_key is not None:
+            cached = image_cache.lookup(
+                image_key, naming_convention, min_suggestions=1 if first_only else 3
+            )
+            if cached is not None:
+                if verbose_level > 0:
+                    print(
+                        f"[DEBUG] Reusing suggestions of a near-identical image for {file_path}"
+                    )
+                return cached
         # If the file is a PNG generated from an SVG, enforce PNG MIME type
         if ext == ".png":
             mime = "image/png"
@@ -114,19 +200,13 @@ def get_suggestions(
             if not mime:
                 mime = "image/jpeg"
         base64_image = encode_image_base64(file_path)
-        image_message = {
-            "type": "input_image",
-            "image_url": f"data:{mime};base64,{base64_image}",
-        }
+        image_url = f"data:{mime};base64,{base64_image}"
 
-    if is_image:
-        user_prompt = get_image_prompt(naming_convention, config)
-    else:
-        user_prompt = get_user_prompt(naming_convention, truncated_content, config)
+    prefix, suffix = get_prompt_parts(naming_convention, config, call_kind)
+    user_content = "" if is_image else truncated_content + suffix
 
     # MOCK PROVIDER: Always return static suggestions for tests
     if provider == "mock":
-
         if naming_convention == "snake_case":
             return ["mock_file_one", "mock_file_two", "mock_file_three"]
         if naming_convention == "camelCase":
@@ -141,258 +221,915 @@ def get_suggestions(
             return ["Mock File One", "Mock File Two", "Mock File Three"]
         return ["mock_file_one", "mock_file_two", "mock_file_three"]
 
-    if provider == "openai":
+    word_cache = word_key = None
+    if naming_convention in RENDERABLE_CONVENTIONS:
+        word_cache = get_word_cache(config)
+    if word_cache is not None:
+        word_key = word_cache.key(
+            config, call_kind, "" if is_image else truncated_content, image_url, hard
+        )
+        cached = render_word_lists(
+            word_cache.get(word_key, min_suggestions=1 if first_only else 3),
+            config,
+            naming_convention,
+        )
+        if cached:
+            if verbose_level > 0:
+                print(f"[DEBUG] Rendered cached words as {naming_convention}")
+            return cached
+
+    request = LLMRequest(
+        provider=provider,
+        model=model,
+        naming_convention=naming_convention,
+        messages=build_messages(prefix, user_content, image_url),
+        kind=call_kind,
+        file_path=file_path,
+        first_only=first_only,
+    )
+    suggestions = call_with_tiers(request, config, verbose_level, hard)
+    if word_key is not None:
+        word_cache.put(word_key, [name_words(s) for s in suggestions])
+    if image_key is not None:
+        image_cache.add(image_key, naming_convention, suggestions)
+    return suggestions
+
+
+def render_word_lists(
+    word_lists: list[list[str]] | None, config, naming_convention: str
+) -> list[str] | None:
+    """Render convention-neutral word lists as names (None if none render)."""
+    rendered = [
+        render_for_config(words, config, naming_convention)
+        for words in word_lists or ()
+    ]
+    return list(dict.fromkeys(name for name in rendered if name)) or None
+
+
+def repair_suggestions(
+    suggestions: list[str], config, naming_convention: str, verbose_level: int = 0
+) -> list[str]:
+    """
+    Repair near-miss suggestions before they are validated.
+
+    Case, accents, separators, word counts (`min_filename_words`,
+    `max_filename_words`) and digit runs are fixed locally and duplicates
+    dropped (see `onomatool.naming.repair_names`), so a response that is only
+    slightly off-convention does not cost another request.
+
+    Returns:
+        The usable suggestions; empty only if none could be repaired.
+    """
+    if naming_convention not in NAMING_CONVENTION_MODELS:
+        naming_convention = "snake_case"
+    repaired, notes = repair_names(
+        list(suggestions),
+        naming_convention,
+        min_words=config.get("min_filename_words", 5),
+        max_words=config.get("max_filename_words", 15),
+    )
+    if verbose_level > 0:
+        for note in notes:
+            print(f"[DEBUG] Repaired suggestion: {note}")
+    return repaired
+
+
+def _escalation_reason(suggestions: list[str], convention_model) -> str | None:
+    """Why a tier's suggestions should go to the next tier, or None to accept."""
+    try:
+        if 0 < len(suggestions) < 3:
+            # A stream cut off after the first suggestion
+            for suggestion in suggestions:
+                convention_model.check_suggestion(suggestion)
+        else:
+            convention_model(suggestions=suggestions)
+    except (ValidationError, ValueError):
+        return "suggestions failed validation"
+    if is_generic_name(suggestions[0]):
+        return f"generic suggestion '{suggestions[0]}'"
+    return None
+
+
+def call_with_tiers(
+    request: "LLMRequest", config: dict, verbose_level: int = 0, hard: bool = False
+) -> list[str]:
+    """
+    Send a request to each model tier in turn until one gives good suggestions.
+
+    A tier's answer is rejected when the call fails, the suggestions fail the
+    naming-convention model or the first suggestion is generic. The last tier's
+    answer (or error) is always final.
+
+    Raises:
+        RuntimeError: If the last tier's call fails.
+    """
+    tiers = model_tiers(config)
+    if hard:
+        tiers = tiers[-1:]
+    convention_model = get_pydantic_model_and_schema(request.naming_convention)[0]
+    for index, (provider, model, tier_config) in enumerate(tiers):
+        tier_request = request.for_model(provider, model)
+        if index == len(tiers) - 1:
+            return call_llm(tier_request, tier_config, verbose_level)
         try:
-            import httpx
-            from openai import OpenAI
+            suggestions = call_llm(tier_request, tier_config, verbose_level)
+        except DeadlineExceeded:
+            raise
+        except RuntimeError as err:
+            reason = f"call failed: {err}"
+        else:
+            reason = _escalation_reason(suggestions, convention_model)
+            if reason is None:
+                return suggestions
+        if verbose_level > 0:
+            print(f"[DEBUG] Escalating from {model} to the next tier: {reason}")
 
-            # Check if we should use Azure OpenAI
-            use_azure = config.get("use_azure_openai", False)
 
-            if use_azure:
-                # Azure OpenAI configuration
-                azure_endpoint = config.get("azure_openai_endpoint") or os.environ.get(
-                    "AZURE_OPENAI_ENDPOINT"
-                )
-                azure_api_key = config.get("azure_openai_api_key") or os.environ.get(
-                    "AZURE_OPENAI_API_KEY"
-                )
-                azure_api_version = config.get("azure_openai_api_version", "2024-02-01")
-                azure_deployment = config.get(
-                    "azure_openai_deployment"
-                ) or os.environ.get("AZURE_OPENAI_DEPLOYMENT")
-
-                if not azure_endpoint:
-                    raise RuntimeError(
-                        "Azure OpenAI endpoint is required when use_azure_openai is True"
-                    )
-                if not azure_api_key:
-                    raise RuntimeError(
-                        "Azure OpenAI API key is required when use_azure_openai is True"
-                    )
-                if not azure_deployment:
-                    raise RuntimeError(
-                        "Azure OpenAI deployment name is required when use_azure_openai is True"
-                    )
+def get_batch_suggestions(
+    items: list[tuple[str, str]],
+    verbose_level: int = 0,
+    config: dict | None = None,
+    handle_failure=None,
+) -> dict[str, list[str]]:
+    """
+    Name several small text files with a single LLM request.
 
-                # For Azure, we override the model with the deployment name
-                model = azure_deployment
+    Each file gets a short id in the prompt and the response is parsed with the
+    batch model for the naming convention. Every item is then repaired on its
+    own (see `repair_suggestions`); files whose item is missing or unusable
+    (or all files, if the batch call fails) are retried with their own
+    `get_suggestions` call. The mock provider always names files one at a
+    time.
 
-                from openai import AzureOpenAI
+    Args:
+        items: (file_path, content) pairs
+        verbose_level: Verbosity level (0=none, 1=basic debug, 2=full debug).
+        config: The configuration dictionary to use (if None, loads default config).
+        handle_failure: Called with (file_path, error) for each file whose own
+            retry fails. Without it, the error is printed. Either way the file
+            is left out of the result and the other files keep their names.
 
-                client = AzureOpenAI(
-                    azure_endpoint=azure_endpoint,
-                    api_key=azure_api_key,
-                    api_version=azure_api_version,
-                )
+    Returns:
+        Dict mapping each named file path to its list of suggestions.
+    """
+    if config is None:
+        config = get_config()
+    _register_conventions(config)
+    naming_convention = config.get("naming_convention", "snake_case")
+    if naming_convention not in NAMING_CONVENTION_MODELS:
+        naming_convention = "snake_case"
+
+    results: dict[str, list[str]] = {}
+    word_cache = None
+    if naming_convention in RENDERABLE_CONVENTIONS:
+        word_cache = get_word_cache(config)
+    word_keys = {}
+    if word_cache is not None:
+        min_suggestions = 1 if config.get("first_suggestion_only", False) else 3
+        pending = []
+        for file_path, content in items:
+            key = word_keys[file_path] = word_cache.key(
+                config, "text", content[:MAX_CONTENT_CHARS]
+            )
+            cached = render_word_lists(
+                word_cache.get(key, min_suggestions), config, naming_convention
+            )
+            if cached:
+                results[file_path] = cached
             else:
-                # Standard OpenAI configuration
-                base_url = config.get("openai_base_url", "https://api.openai.com/v1")
-                api_key = config.get("openai_api_key") or os.environ.get(
-                    "OPENAI_API_KEY"
-                )
-                verify = True
-                if base_url.startswith(
-                    ("http://", "https://10.", "https://127.", "https://localhost")
-                ):
-                    verify = False
-                client = OpenAI(
-                    base_url=base_url,
-                    api_key=api_key,
-                    http_client=httpx.Client(verify=verify),
+                pending.append((file_path, content))
+        items = pending
+    # Batches go to the cheapest tier; failed items escalate on their own
+    provider, model, tier_config = model_tiers(config)[0]
+    if provider in ("openai", "google") and len(items) > 1:
+        ids = {str(i): file_path for i, (file_path, _) in enumerate(items, 1)}
+        prefix, suffix = get_prompt_parts(naming_convention, config, "batch")
+        files = format_batch_files(
+            [(str(i), content) for i, (_, content) in enumerate(items, 1)]
+        )
+        request = LLMRequest(
+            provider=provider,
+            model=model,
+            naming_convention=naming_convention,
+            messages=build_messages(prefix, files + suffix),
+            kind="batch",
+            response_model=get_batch_model_for_naming_convention(naming_convention),
+            max_tokens=MAX_TOKENS * len(items),
+        )
+        try:
+            batch = call_llm(request, tier_config, verbose_level)
+        except DeadlineExceeded:
+            raise
+        except RuntimeError as err:
+            if verbose_level > 0:
+                print(f"[DEBUG] Batch of {len(items)} files failed: {err}")
+            batch = None
+        for item in batch.files if batch is not None else []:
+            file_path = ids.get(item.id)
+            if file_path is None or file_path in results:
+                continue
+            suggestions = repair_suggestions(
+                item.suggestions, config, naming_convention, verbose_level
+            )
+            if not suggestions:
+                if verbose_level > 0:
+                    print(f"[DEBUG] Batch item {item.id} has no usable suggestions")
+                continue
+            results[file_path] = suggestions
+            if file_path in word_keys:
+                word_cache.put(
+                    word_keys[file_path], [name_words(n) for n in results[file_path]]
                 )
-            if is_image and image_message:
-                messages = [
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": user_prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": image_message["image_url"]},
-                            },
-                        ],
-                    },
-                ]
+
+    for file_path, content in items:
+        if file_path in results:
+            continue
+        if verbose_level > 0 and len(items) > 1 and provider != "mock":
+            print(f"[DEBUG] Retrying {file_path} on its own")
+        try:
+            results[file_path] = get_suggestions(
+                content, verbose_level=verbose_level, file_path=file_path, config=config
+            )
+        except Exception as err:
+            if handle_failure is None:
+                print(f"[ERROR] {file_path}: {err}")
             else:
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
-            if verbose_level > 0:
-                # Print basic configuration details for -v
-                if use_azure:
-                    print("[DEBUG] Using Azure OpenAI")
-                    print(f"[DEBUG] Azure endpoint: {azure_endpoint}")
-                    print(f"[DEBUG] Azure deployment: {azure_deployment}")
-                    print(f"[DEBUG] Azure API version: {azure_api_version}")
-                else:
-                    print("[DEBUG] Using OpenAI")
-                    print(f"[DEBUG] Base URL: {base_url}")
-                print(f"[DEBUG] Model: {model}")
-                print(f"[DEBUG] Pydantic Model: {pydantic_model.__name__}")
-
-                # Print detailed schema and configuration for -vv only
-                if verbose_level > 1:
-                    print(f"[DEBUG] JSON Schema: {json.dumps(json_schema, indent=2)}")
-                    print(f"[DEBUG] Max tokens: {MAX_TOKENS}")
-                    print(f"[DEBUG] Min filename words: {min_words}")
-                    print(f"[DEBUG] Max filename words: {max_words}")
-
-                def redact_message(msg, redact_text=True):
-                    if isinstance(msg, dict):
-                        msg = msg.copy()
-                        # Redact image_url base64 in all nested structures
-                        if msg.get("type") == "image_url":
-                            if (
-                                isinstance(msg["image_url"], dict)
-                                and "url" in msg["image_url"]
-                            ):
-                                msg["image_url"] = {"url": "[[base64_image]]"}
-                            elif isinstance(msg["image_url"], str):
-                                msg["image_url"] = "[[base64_image]]"
-                        # Optionally redact text content
-                        if redact_text and msg.get("type") == "text":
-                            msg["text"] = "[[file_content]]"
-                        # Recursively redact lists in 'content'
-                        if isinstance(msg.get("content"), list):
-                            msg["content"] = [
-                                redact_message(x, redact_text=redact_text)
-                                for x in msg["content"]
-                            ]
-                        return msg
-                    return msg
-
-                def redact_messages(messages, redact_text=True):
-                    if isinstance(messages, list):
-                        return [
-                            redact_message(m, redact_text=redact_text) for m in messages
-                        ]
-                    return messages
-
-                    # Show detailed request/response info only for -vv
-
-                if verbose_level > 1:
-                    redact_text = not is_image
-
-                    # Calculate character and token counts for the entire request
-                    total_chars = sum(
-                        len(str(msg.get("content", ""))) for msg in messages
-                    )
-                    if is_image:
-                        # For images, only count text content, not base64 image data
-                        total_chars = len(user_prompt)
-                    total_tokens = count_tokens_for_messages(messages, model)
+                handle_failure(file_path, err)
+    return results
+
+
+class LLMRequest:
+    """A fully built LLM request for one set of filename suggestions."""
+
+    __slots__ = (
+        "provider",
+        "model",
+        "naming_convention",
+        "messages",
+        "kind",
+        "file_path",
+        "response_model",
+        "max_tokens",
+        "first_only",
+    )
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        naming_convention: str,
+        messages: list[dict],
+        kind: str = "text",
+        file_path: str | None = None,
+        response_model=None,
+        max_tokens: int = MAX_TOKENS,
+        first_only: bool = False,
+    ):
+        self.provider = provider
+        self.model = model
+        self.naming_convention = naming_convention
+        self.messages = messages
+        self.kind = kind
+        self.file_path = file_path
+        # Pydantic model to parse the response into; if set, the parsed model is
+        # returned instead of the list of suggestions
+        self.response_model = response_model
+        self.max_tokens = max_tokens
+        # Only the first suggestion is used, so the response may be cut short
+        self.first_only = first_only
+
+    def for_model(self, provider: str, model: str) -> "LLMRequest":
+        """A copy of the request for another provider and model."""
+        return LLMRequest(
+            provider=provider,
+            model=model,
+            naming_convention=self.naming_convention,
+            messages=self.messages,
+            kind=self.kind,
+            file_path=self.file_path,
+            response_model=self.response_model,
+            max_tokens=self.max_tokens,
+            first_only=self.first_only,
+        )
 
-                    print(f"[DEBUG] Total characters in request: {total_chars}")
-                    print(f"[DEBUG] Estimated tokens: {total_tokens}")
+    @property
+    def prompt_text(self) -> str:
+        """All text of the request (used by providers without chat roles)."""
+        chunks = []
+        for message in self.messages:
+            content = message["content"]
+            if isinstance(content, str):
+                chunks.append(content)
+            else:
+                chunks.extend(p["text"] for p in content if p.get("type") == "text")
+        return "\n\n".join(chunk for chunk in chunks if chunk)
+
+    @property
+    def image_url(self) -> str | None:
+        """The data URL of the image part, if any."""
+        content = self.messages[-1]["content"]
+        if isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    return part["image_url"]["url"]
+        return None
+
+
+def build_messages(
+    prefix: str, user_content: str, image_url: str | None = None
+) -> list[dict]:
+    """
+    Build chat messages: the static prefix as the system message, then the
+    per-file content (text, or an image part) as the user message.
 
-                    redacted_messages = redact_messages(
-                        messages, redact_text=redact_text
-                    )
-                    print(
-                        f"[DEBUG] Messages: {json.dumps(redacted_messages, indent=2)}"
-                    )
+    Keeping everything file-specific after the prefix lets providers reuse their
+    prompt cache across files.
+    """
+    if image_url:
+        parts = [{"type": "image_url", "image_url": {"url": image_url}}]
+        if user_content:
+            parts.insert(0, {"type": "text", "text": user_content})
+        user = {"role": "user", "content": parts}
+    else:
+        user = {"role": "user", "content": user_content}
+    return [{"role": "system", "content": prefix}, user]
 
-                    if redact_text:
-                        print("[DEBUG] Text content redacted as [[file_content]]")
-                    else:
-                        print(
-                            "[DEBUG] Image content - text not redacted, base64 images redacted as [[base64_image]]"
-                        )
-            # Try to use structured output with Pydantic first
-            try:
-                response = client.beta.chat.completions.parse(
-                    model=model,
-                    messages=messages,
-                    response_format=pydantic_model,
-                    max_tokens=MAX_TOKENS,
-                )
-                parsed_result = response.choices[0].message.parsed
-                if parsed_result is None:
-                    raise RuntimeError("Structured output parsing failed")
 
-                if verbose_level > 0:
-                    print("[DEBUG] Used structured output with Pydantic model")
-                    print(f"[DEBUG] Response: suggestions={parsed_result.suggestions}")
+def call_llm(request: LLMRequest, config: dict, verbose_level: int = 0) -> list[str]:
+    """
+    Send a built request to its provider and return the suggestions.
 
-                return parsed_result.suggestions
+    With `replay_dir` set in config the response is served from that cassette;
+    with `record_dir` set the live call is recorded into it (see `cassette`).
 
-            except Exception as structured_error:
-                if verbose_level > 0:
-                    print(f"[DEBUG] Structured output failed: {structured_error}")
-                    print("[DEBUG] Falling back to JSON schema approach")
-
-                # Fallback to traditional JSON schema approach
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    response_format=json_schema,
-                    max_tokens=MAX_TOKENS,
-                )
-                result = json.loads(response.choices[0].message.content)
-                suggestions = result["suggestions"]
+    Raises:
+        RuntimeError: If the LLM call fails or the response does not match the schema.
+    """
+    DEADLINE.check()
+    replay_dir = config.get("replay_dir")
+    if replay_dir:
+        return get_cassette(replay_dir).replay(
+            request, request.max_tokens, config.get("replay_timing", "original")
+        )
+    record_dir = config.get("record_dir")
+    if record_dir:
+        return get_cassette(record_dir).record(
+            request,
+            request.max_tokens,
+            lambda: _call_provider(request, config, verbose_level),
+        )
+    return _call_provider(request, config, verbose_level)
 
-                if verbose_level > 0:
-                    print("[DEBUG] Used JSON Schema fallback")
-                    print(f"[DEBUG] Response: suggestions={suggestions}")
 
-                if verbose_level > 1:
-                    print(
-                        f"[DEBUG] Full response content: {response.choices[0].message.content}"
+def _call_provider(request: LLMRequest, config: dict, verbose_level: int) -> list[str]:
+    if request.provider == "openai":
+        pool = None
+        if not config.get("use_azure_openai", False):
+            pool = get_endpoint_pool(config)
+        try:
+            if pool is None:
+                return _retry_until_deadline(
+                    lambda: _call_openai(request, config, verbose_level),
+                    verbose_level,
+                )
+            return _retry_until_deadline(
+                lambda: pool.call(
+                    lambda endpoint: _call_openai(
+                        request, _endpoint_config(config, endpoint), verbose_level
                     )
-
-                if not (isinstance(suggestions, list) and len(suggestions) == 3):
-                    raise RuntimeError(
-                        "LLM did not return exactly 3 suggestions."
-                    ) from None
-                return suggestions
+                ),
+                verbose_level,
+            )
+        except DeadlineExceeded:
+            raise
         except Exception as err:
+            # A call cut short by the file deadline reports the deadline
+            DEADLINE.check()
             raise RuntimeError(f"OpenAI LLM call failed: {err}") from err
-    elif provider == "google":
+    elif request.provider == "google":
+        try:
+            return _call_google(request, config, verbose_level)
+        except DeadlineExceeded:
+            raise
+        except Exception as err:
+            DEADLINE.check()
+            raise RuntimeError(f"Google LLM call failed: {err}") from err
+    else:
+        raise RuntimeError(f"Unsupported provider: {request.provider}")
+
+
+def _retry_delay(err: BaseException, attempt: int) -> float:
+    """Seconds to wait before retrying: the server's Retry-After, or backoff."""
+    while err is not None:
+        response = getattr(err, "response", None)
+        if response is not None:
+            try:
+                return float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                break
+        err = err.__cause__ or err.__context__
+    return min(RETRY_BASE_DELAY * 2**attempt, RETRY_MAX_DELAY)
+
+
+def _retry_until_deadline(call, verbose_level: int = 0):
+    """
+    Run an OpenAI call, retrying rate limits, 5xx and connection errors until
+    the file deadline.
+
+    Under a deadline the client's own retries are off (they would not respect
+    it), so they are done here instead: a retry is made only if its backoff
+    ends before the deadline. Without a deadline the call runs once and the
+    client retries as usual.
+
+    Raises:
+        Exception: The last error, once it is not retryable or the deadline
+            leaves no time for another attempt
+    """
+    attempt = 0
+    while True:
         try:
-            import google.generativeai as genai
+            return call()
+        except DeadlineExceeded:
+            raise
+        except Exception as err:
+            remaining = DEADLINE.remaining()
+            if remaining is None or not is_endpoint_error(err):
+                raise
+            delay = _retry_delay(err, attempt)
+            if delay >= remaining:
+                raise
+            if verbose_level > 0:
+                print(f"[DEBUG] Retrying in {delay:g}s after: {err}")
+            time.sleep(delay)
+            attempt += 1
+
+
+def _endpoint_config(config, endpoint):
+    """The config for one endpoint of a pool (built once per Config)."""
+    settings = {"openai_base_url": endpoint.url}
+    if endpoint.api_key:
+        settings["openai_api_key"] = endpoint.api_key
+    if isinstance(config, Config):
+        return config.cached(
+            ("endpoint", endpoint.url, endpoint.api_key),
+            lambda: config.override(**settings),
+        )
+    return {**config, **settings}
+
+
+def redact_message(msg, redact_text=True):
+    if isinstance(msg, dict):
+        msg = msg.copy()
+        # Redact image_url base64 in all nested structures
+        if msg.get("type") == "image_url":
+            if isinstance(msg["image_url"], dict) and "url" in msg["image_url"]:
+                msg["image_url"] = {"url": "[[base64_image]]"}
+            elif isinstance(msg["image_url"], str):
+                msg["image_url"] = "[[base64_image]]"
+        # Optionally redact text content
+        if redact_text and msg.get("type") == "text":
+            msg["text"] = "[[file_content]]"
+        # Recursively redact lists in 'content'
+        if isinstance(msg.get("content"), list):
+            msg["content"] = [
+                redact_message(x, redact_text=redact_text) for x in msg["content"]
+            ]
+        return msg
+    return msg
+
+
+def redact_messages(messages, redact_text=True):
+    if isinstance(messages, list):
+        return [redact_message(m, redact_text=redact_text) for m in messages]
+    return messages
+
+
+def _debug_usage(usage: dict, verbose_level: int) -> None:
+    """Print the token usage of a call, including prompt cache hits."""
+    if verbose_level > 0:
+        print(
+            f"[DEBUG] Usage: {usage['prompt_tokens']} prompt tokens "
+            f"({usage['cached_tokens']} cached), "
+            f"{usage['completion_tokens']} completion tokens"
+        )
+
+
+def _call_openai(request: LLMRequest, config: dict, verbose_level: int) -> list[str]:
+    from openai import OpenAI
+
+    provider = request.provider
+    model = request.model
+    messages = request.messages
+    is_image = request.kind == "image"
+    call_kind = request.kind
+    file_path = request.file_path
+    min_words = config.get("min_filename_words", 5)
+    max_words = config.get("max_filename_words", 15)
+    llm_timeout = config.get("llm_timeout", 60.0)
+    # Get Pydantic model and JSON schema for the naming convention
+    if request.response_model is not None:
+        pydantic_model = request.response_model
+        json_schema = get_response_format(pydantic_model)
+    else:
+        pydantic_model, json_schema = get_pydantic_model_and_schema(
+            request.naming_convention
+        )
+        # Same schema; off-convention names are repaired instead of failing
+        pydantic_model = get_unchecked_model(pydantic_model.convention)
+
+    # Check if we should use Azure OpenAI
+    use_azure = config.get("use_azure_openai", False)
+
+    if use_azure:
+        # Azure OpenAI configuration
+        azure_endpoint = config.get("azure_openai_endpoint") or os.environ.get(
+            "AZURE_OPENAI_ENDPOINT"
+        )
+        azure_api_key = config.get("azure_openai_api_key") or os.environ.get(
+            "AZURE_OPENAI_API_KEY"
+        )
+        azure_api_version = config.get("azure_openai_api_version", "2024-02-01")
+        azure_deployment = config.get("azure_openai_deployment") or os.environ.get(
+            "AZURE_OPENAI_DEPLOYMENT"
+        )
 
-            genai.configure(
-                api_key=config.get("google_api_key") or os.environ.get("GOOGLE_API_KEY")
+        if not azure_endpoint:
+            raise RuntimeError(
+                "Azure OpenAI endpoint is required when use_azure_openai is True"
+            )
+        if not azure_api_key:
+            raise RuntimeError(
+                "Azure OpenAI API key is required when use_azure_openai is True"
             )
-            model_name = "gemini-pro"
-            model = genai.GenerativeModel(model_name)
+        if not azure_deployment:
+            raise RuntimeError(
+                "Azure OpenAI deployment name is required when use_azure_openai is True"
+            )
+
+        # For Azure, we override the model with the deployment name
+        model = azure_deployment
 
-            # Configure generation settings with max_output_tokens
-            generation_config = genai.types.GenerationConfig(
-                max_output_tokens=MAX_TOKENS
+        from openai import AzureOpenAI
+
+        client = _get_cached_client(
+            AzureOpenAI,
+            azure_endpoint=azure_endpoint,
+            api_key=azure_api_key,
+            api_version=azure_api_version,
+        )
+    else:
+        # Standard OpenAI configuration
+        base_url = config.get("openai_base_url", "https://api.openai.com/v1")
+        api_key = config.get("openai_api_key") or os.environ.get("OPENAI_API_KEY")
+        verify = True
+        if base_url.startswith(
+            ("http://", "https://10.", "https://127.", "https://localhost")
+        ):
+            verify = False
+        client = _get_cached_client(
+            OpenAI, base_url=base_url, api_key=api_key, verify=verify
+        )
+    if DEADLINE.remaining() is not None:
+        # The client's own retries would not respect the file deadline; calls
+        # are retried until the deadline instead (see _retry_until_deadline)
+        client = client.with_options(max_retries=0)
+    if verbose_level > 0:
+        # Print basic configuration details for -v
+        if use_azure:
+            print("[DEBUG] Using Azure OpenAI")
+            print(f"[DEBUG] Azure endpoint: {azure_endpoint}")
+            print(f"[DEBUG] Azure deployment: {azure_deployment}")
+            print(f"[DEBUG] Azure API version: {azure_api_version}")
+        else:
+            print("[DEBUG] Using OpenAI")
+            print(f"[DEBUG] Base URL: {base_url}")
+        print(f"[DEBUG] Model: {model}")
+        print(f"[DEBUG] Pydantic Model: {pydantic_model.__name__}")
+
+        # Print detailed schema and configuration for -vv only
+        if verbose_level > 1:
+            print(f"[DEBUG] JSON Schema: {json.dumps(json_schema, indent=2)}")
+            print(f"[DEBUG] Max tokens: {request.max_tokens}")
+            print(f"[DEBUG] Min filename words: {min_words}")
+            print(f"[DEBUG] Max filename words: {max_words}")
+
+        # Show detailed request/response info only for -vv
+        if verbose_level > 1:
+            redact_text = not is_image
+
+            # Calculate character and token counts for the entire request
+            total_chars = sum(len(str(msg.get("content", ""))) for msg in messages)
+            if is_image:
+                # For images, only count text content, not base64 image data
+                total_chars = len(request.prompt_text)
+            total_tokens = count_tokens_for_messages(messages, model)
+
+            print(f"[DEBUG] Total characters in request: {total_chars}")
+            print(f"[DEBUG] Estimated tokens: {total_tokens}")
+
+            redacted_messages = redact_messages(messages, redact_text=redact_text)
+            print(f"[DEBUG] Messages: {json.dumps(redacted_messages, indent=2)}")
+
+            if redact_text:
+                print("[DEBUG] Text content redacted as [[file_content]]")
+            else:
+                print(
+                    "[DEBUG] Image content - text not redacted, base64 images redacted as [[base64_image]]"
+                )
+    if (
+        request.first_only
+        and request.response_model is None
+        and config.get("stream_suggestions", True)
+    ):
+        try:
+            suggestions = repair_suggestions(
+                _stream_openai(
+                    client, request, model, json_schema, llm_timeout, verbose_level
+                ),
+                config,
+                request.naming_convention,
+                verbose_level,
             )
+            if not suggestions:
+                raise RuntimeError("No usable suggestion in the stream")
+            return suggestions
+        except DeadlineExceeded:
+            raise
+        except Exception as stream_error:
+            if verbose_level > 0:
+                print(f"[DEBUG] Streaming failed: {stream_error}")
+                print("[DEBUG] Falling back to a complete response")
 
-            if verbose_level > 1:
-                # Calculate character and token counts for Google request
-                total_chars = len(user_prompt)
-                total_tokens = count_text_tokens(
-                    user_prompt, "gpt-4o"
-                )  # Use gpt-4o encoding as approximation
-                print(f"[DEBUG] Total characters in request: {total_chars}")
-                print(f"[DEBUG] Estimated tokens: {total_tokens}")
-
-            response = model.generate_content(
-                user_prompt, generation_config=generation_config
+    # Try to use structured output with Pydantic first
+    try:
+        with span("llm", provider=provider, model=model, kind=call_kind):
+            response = client.beta.chat.completions.parse(
+                model=model,
+                messages=messages,
+                response_format=pydantic_model,
+                max_tokens=request.max_tokens,
+                timeout=call_timeout(llm_timeout),
             )
-            import re
+        usage = LEDGER.record_response(response, provider, model, call_kind, file_path)
+        _debug_usage(usage, verbose_level)
+        parsed_result = response.choices[0].message.parsed
+        if parsed_result is None:
+            raise RuntimeError("Structured output parsing failed")
+        if request.response_model is not None:
+            if verbose_level > 0:
+                print(f"[DEBUG] Response: {parsed_result!r}")
+            return parsed_result
 
-            suggestions = re.findall(r'"([a-zA-Z0-9_\-\. ]{1,128})"', response.text)
+        if verbose_level > 0:
+            print("[DEBUG] Used structured output with Pydantic model")
+            print(f"[DEBUG] Response: suggestions={parsed_result.suggestions}")
 
-            if verbose_level > 0:
-                print(f"[DEBUG] Response: suggestions={suggestions[:3]}")
+        suggestions = repair_suggestions(
+            parsed_result.suggestions, config, request.naming_convention, verbose_level
+        )
+        if not suggestions:
+            raise RuntimeError("No usable suggestions in the response")
+        return suggestions
+
+    except Exception as structured_error:
+        if verbose_level > 0:
+            print(f"[DEBUG] Structured output failed: {structured_error}")
+            print("[DEBUG] Falling back to JSON schema approach")
+
+        # Fallback to traditional JSON schema approach
+        with span("llm", provider=provider, model=model, kind=call_kind):
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                response_format=json_schema,
+                max_tokens=request.max_tokens,
+                timeout=call_timeout(llm_timeout),
+            )
+        usage = LEDGER.record_response(response, provider, model, call_kind, file_path)
+        _debug_usage(usage, verbose_level)
+        if request.response_model is not None:
+            return request.response_model.model_validate_json(
+                response.choices[0].message.content
+            )
+        result = json.loads(response.choices[0].message.content)
+        suggestions = result["suggestions"]
 
-            if verbose_level > 1:
-                print(f"[DEBUG] Full response text: {response.text}")
+        if verbose_level > 0:
+            print("[DEBUG] Used JSON Schema fallback")
+            print(f"[DEBUG] Response: suggestions={suggestions}")
 
-            if len(suggestions) < 3:
-                raise RuntimeError("Google LLM did not return enough suggestions.")
-            return suggestions[:3]
-        except Exception as err:
-            raise RuntimeError(f"Google LLM call failed: {err}") from err
+        if verbose_level > 1:
+            print(
+                f"[DEBUG] Full response content: {response.choices[0].message.content}"
+            )
+
+        if not (
+            isinstance(suggestions, list)
+            and all(isinstance(s, str) for s in suggestions)
+        ):
+            raise RuntimeError("LLM did not return a list of suggestions.") from None
+        # Repair and de-duplication decide whether 2 or 4 names are usable
+        suggestions = repair_suggestions(
+            suggestions,
+            config,
+            request.naming_convention,
+            verbose_level,
+        )
+        if not suggestions:
+            raise RuntimeError("LLM returned no usable suggestions.") from None
+        return suggestions
+
+
+def _stream_openai(
+    client,
+    request: LLMRequest,
+    model: str,
+    json_schema: dict,
+    llm_timeout: float,
+    verbose_level: int,
+) -> list[str]:
+    """
+    Stream a JSON-schema response and stop once the first suggestion is usable.
+
+    The stream is closed as soon as the first suggestion is complete and
+    matches (or can be repaired to) the naming convention. If it cannot, the
+    rest of the response is read so that tier escalation sees every
+    suggestion.
+
+    Returns:
+        The suggestions received before the stream was closed.
+
+    Raises:
+        RuntimeError: If the stream ends without a suggestion.
+    """
+    convention = get_pydantic_model_and_schema(request.naming_convention)[0].convention
+    parser = SuggestionStreamParser()
+    usage_chunk = None
+    content_chunks = 0
+    with span("llm", provider=request.provider, model=model, kind=request.kind):
+        stream = client.chat.completions.create(
+            model=model,
+            messages=request.messages,
+            response_format=json_schema,
+            max_tokens=request.max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=call_timeout(llm_timeout),
+        )
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                content_chunks += 1
+                parser.feed(chunk.choices[0].delta.content)
+                if parser.done or (
+                    parser.suggestions
+                    and repair_name(parser.suggestions[0], convention) is not None
+                ):
+                    break
+        finally:
+            # Closing the connection stops generation on the server
+            stream.close()
+    if usage_chunk is not None:
+        usage = LEDGER.record_response(
+            usage_chunk, request.provider, model, request.kind, request.file_path
+        )
     else:
-        raise RuntimeError(f"Unsupported provider: {provider}")
+        # A cancelled stream reports no usage; estimate it (~4 chars per token,
+        # roughly one token per content chunk)
+        usage = LEDGER.record(
+            request.provider,
+            model,
+            request.kind,
+            len(request.prompt_text) // 4 + 1,
+            content_chunks,
+            0,
+            request.file_path,
+        )
+    _debug_usage(usage, verbose_level)
+    if not parser.suggestions:
+        raise RuntimeError("Stream ended without a suggestion")
+    if verbose_level > 0:
+        state = "complete" if parser.done else "cancelled"
+        print(f"[DEBUG] Streamed response ({state}): suggestions={parser.suggestions}")
+    return parser.suggestions
+
+
+def _get_genai_client(api_key: str | None, base_url: str | None = None):
+    """
+    Return a reusable google-genai client for an API key (and base URL).
+
+    The client keeps its HTTP connection pool between calls, like the cached
+    OpenAI clients.
+    """
+    from google import genai
+    from google.genai import types
+
+    key = ("genai", api_key, base_url)
+    client = _CLIENT_CACHE.get(key)
+    if client is None:
+        http_options = types.HttpOptions(base_url=base_url) if base_url else None
+        client = genai.Client(api_key=api_key, http_options=http_options)
+        _CLIENT_CACHE[key] = client
+    return client
+
+
+def _google_contents(request: LLMRequest) -> list:
+    """The user turn of a request as google-genai parts (text and image)."""
+    from google.genai import types
+
+    parts = []
+    content = request.messages[-1]["content"]
+    if isinstance(content, str):
+        if content:
+            parts.append(types.Part.from_text(text=content))
+    else:
+        for part in content:
+            if part.get("type") == "text" and part["text"]:
+                parts.append(types.Part.from_text(text=part["text"]))
+            elif part.get("type") == "image_url":
+                header, data = part["image_url"]["url"].split(",", 1)
+                mime = header.removeprefix("data:").split(";", 1)[0]
+                parts.append(
+                    types.Part.from_bytes(
+                        data=base64.b64decode(data), mime_type=mime or "image/jpeg"
+                    )
+                )
+    return [types.Content(role="user", parts=parts)]
+
+
+def _call_google(request: LLMRequest, config: dict, verbose_level: int) -> list[str]:
+    from google.genai import types
+
+    model = request.model
+    client = _get_genai_client(
+        config.get("google_api_key") or os.environ.get("GOOGLE_API_KEY"),
+        config.get("google_base_url") or None,
+    )
+    if request.response_model is not None:
+        pydantic_model = request.response_model
+    else:
+        pydantic_model = get_unchecked_model(
+            get_pydantic_model_and_schema(request.naming_convention)[0].convention
+        )
+    system_prompt = request.messages[0]["content"]
+    timeout = call_timeout(config.get("llm_timeout", 60.0))
+    generation_config = types.GenerateContentConfig(
+        # The static prefix goes first so Gemini's implicit cache can reuse it
+        system_instruction=system_prompt,
+        response_mime_type="application/json",
+        response_schema=pydantic_model,
+        max_output_tokens=request.max_tokens,
+        http_options=types.HttpOptions(timeout=int(timeout * 1000))
+        if timeout
+        else None,
+    )
+
+    if verbose_level > 0:
+        print("[DEBUG] Using Google Gemini")
+        print(f"[DEBUG] Model: {model}")
+        print(f"[DEBUG] Pydantic Model: {pydantic_model.__name__}")
+    if verbose_level > 1:
+        # Calculate character and token counts for Google request
+        user_prompt = request.prompt_text
+        total_chars = len(user_prompt)
+        total_tokens = count_text_tokens(
+            user_prompt, "gpt-4o"
+        )  # Use gpt-4o encoding as approximation
+        print(f"[DEBUG] Total characters in request: {total_chars}")
+        print(f"[DEBUG] Estimated tokens: {total_tokens}")
+
+    with span("llm", provider=request.provider, model=model, kind=request.kind):
+        response = client.models.generate_content(
+            model=model,
+            contents=_google_contents(request),
+            config=generation_config,
+        )
+    usage = LEDGER.record_response(
+        response, request.provider, model, request.kind, request.file_path
+    )
+    _debug_usage(usage, verbose_level)
+
+    if verbose_level > 1:
+        print(f"[DEBUG] Full response text: {response.text}")
+
+    parsed_result = response.parsed
+    if parsed_result is None:
+        # Fall back to validating the raw JSON text
+        parsed_result = pydantic_model.model_validate_json(response.text or "")
+    if request.response_model is not None:
+        return parsed_result
+
+    if verbose_level > 0:
+        print(f"[DEBUG] Response: suggestions={parsed_result.suggestions}")
+    suggestions = repair_suggestions(
+        parsed_result.suggestions, config, request.naming_convention, verbose_level
+    )
+    if not suggestions:
+        raise RuntimeError("Gemini returned no usable suggestions")
+    return suggestions
 
 
 def count_tokens_for_messages(messages: list, model: str = "gpt-4o") -> int:
@@ -0,0 +1,278 @@
+"""
+Local naming tier: name files from their own metadata without an LLM.
+
+Candidate titles come from document metadata (PDF /Title, DOCX core
+properties, HTML <title>, email Subject) and the first heading of the
+extracted markdown. Keywords are ranked by TF-IDF over the markdown, with
+document frequencies accumulated over the files seen in the run. Each candidate
+gets a confidence score; the best one is rendered in the configured naming
+convention and used if it clears `local_naming.min_confidence`, otherwise the
+file is escalated to `get_suggestions`.
+"""
+
+import email.parser
+import html
+import math
+import os
+import re
+import zipfile
+from collections import Counter
+from xml.etree import ElementTree
+
+from onomatool.naming import MAX_CONSECUTIVE_DIGITS, render_name, split_words
+from onomatool.profiling import span
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Base confidence per candidate source
+SOURCE_CONFIDENCE = {
+    "pdf_title": 0.85,
+    "docx_title": 0.85,
+    "email_subject": 0.85,
+    "html_title": 0.8,
+    "markdown_heading": 0.75,
+    "keywords": 0.5,
+}
+
+# Confidence lost per keyword added to reach the minimum word count
+PADDING_PENALTY = 0.05
+# Confidence lost when a title had to be cut to the maximum word count
+TRUNCATION_PENALTY = 0.1
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because
+    been before being below between both but by can could did do does doing down
+    during each few for from further had has have having he her here hers him his
+    how i if in into is it its itself just me more most my no nor not now of off on
+    once only or other our ours out over own same she should so some such than that
+    the their theirs them then there these they this those through to too under
+    until up very was we were what when where which while who whom why will with
+    would you your yours
+    """.split()
+)
+
+# Metadata titles that say nothing about the content
+_JUNK_TITLE = re.compile(
+    r"^(untitled|document\d*|new document|presentation\d*|slide \d+|title|"
+    r"microsoft (word|powerpoint|excel) - .*|.*\.(docx?|pdf|pptx?|xlsx?|txt|md))$",
+    re.IGNORECASE,
+)
+_REPLY_PREFIX = re.compile(r"^\s*((re|fwd?|aw|wg)\s*:\s*)+", re.IGNORECASE)
+_ATX_HEADING = re.compile(r"^#\s+(.+?)\s*#*\s*$", re.MULTILINE)
+_SETEXT_HEADING = re.compile(r"^([^\n]+)\n=+[ \t]*$", re.MULTILINE)
+_HTML_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_KEYWORD = re.compile(r"[a-z][a-z0-9]{2,}")
+_LONG_NUMBER = re.compile(rf"\d{{{MAX_CONSECUTIVE_DIGITS + 1},}}")
+_DC_TITLE = "{http://purl.org/dc/elements/1.1/}title"
+
+# How much of the markdown is searched for a heading
+_HEADING_SCAN_CHARS = 4000
+
+
+def pdf_title(file_path: str) -> str | None:
+    if fitz is None:
+        return None
+    with fitz.open(file_path) as doc:
+        return (doc.metadata or {}).get("title")
+
+
+def docx_title(file_path: str) -> str | None:
+    with zipfile.ZipFile(file_path) as z:
+        try:
+            core = z.read("docProps/core.xml")
+        except KeyError:
+            return None
+    element = ElementTree.fromstring(core).find(_DC_TITLE)
+    return element.text if element is not None else None
+
+
+def html_title(file_path: str) -> str | None:
+    with open(file_path, encoding="utf-8", errors="replace") as f:
+        head = f.read(65536)
+    match = _HTML_TITLE.search(head)
+    return html.unescape(match.group(1)) if match else None
+
+
+def email_subject(file_path: str) -> str | None:
+    with open(file_path, "rb") as f:
+        headers = email.parser.BytesHeaderParser().parse(f)
+    subject = headers.get("Subject")
+    return _REPLY_PREFIX.sub("", str(subject)) if subject else None
+
+
+# Metadata extractors by extension: (source, extractor)
+METADATA_EXTRACTORS = {
+    ".pdf": ("pdf_title", pdf_title),
+    ".docx": ("docx_title", docx_title),
+    ".html": ("html_title", html_title),
+    ".htm": ("html_title", html_title),
+    ".eml": ("email_subject", email_subject),
+}
+
+
+def markdown_heading(markdown: str) -> str | None:
+    """The first level-1 heading (ATX or setext) near the top of the markdown."""
+    head = markdown[:_HEADING_SCAN_CHARS]
+    matches = [
+        m for m in (_ATX_HEADING.search(head), _SETEXT_HEADING.search(head)) if m
+    ]
+    if not matches:
+        return None
+    return min(matches, key=lambda m: m.start()).group(1)
+
+
+def usable_title_words(title: str | None) -> list[str]:
+    """Words of a title, or [] if the title is missing or boilerplate."""
+    if not title or _JUNK_TITLE.match(title.strip()):
+        return []
+    return [word for word in split_words(title) if not _LONG_NUMBER.search(word)]
+
+
+class LocalNamer:
+    """
+    Names files from their metadata and content, keeping run-wide TF-IDF state.
+
+    Args:
+        naming_convention: The naming convention to render names in
+        min_words: Titles shorter than this are padded with keywords
+        max_words: Titles longer than this are cut
+        min_confidence: Candidates below this are escalated to the LLM
+    """
+
+    def __init__(
+        self,
+        naming_convention: str = "snake_case",
+        min_words: int = 5,
+        max_words: int = 15,
+        min_confidence: float = 0.7,
+    ):
+        self.naming_convention = naming_convention
+        self.min_words = min_words
+        self.max_words = max_words
+        self.min_confidence = min_confidence
+        self.documents = 0
+        self.document_frequency: Counter = Counter()
+        self.named = 0
+        self.escalated = 0
+
+    @classmethod
+    def from_config(cls, config) -> "LocalNamer":
+        settings = config.get("local_naming") or {}
+        return cls(
+            naming_convention=config.get("naming_convention", "snake_case"),
+            min_words=config.get("min_filename_words", 5),
+            max_words=config.get("max_filename_words", 15),
+            min_confidence=settings.get("min_confidence", 0.7),
+        )
+
+    def keywords(self, markdown: str, limit: int = 10) -> list[str]:
+        """
+        Rank the markdown's words by TF-IDF and record its document frequencies.
+
+        Document frequencies cover the files seen so far in the run, so the
+        ranking sharpens as the run goes on.
+        """
+        counts = Counter(
+            word for word in _KEYWORD.findall(markdown.lower()) if word not in STOPWORDS
+        )
+        self.documents += 1
+        self.document_frequency.update(counts.keys())
+        if not counts:
+            return []
+        total = sum(counts.values())
+        scores = {
+            word: count
+            / total
+            * (math.log((1 + self.documents) / (1 + self.document_frequency[word])) + 1)
+            for word, count in counts.items()
+        }
+        return sorted(scores, key=lambda word: (-scores[word], word))[:limit]
+
+    def candidates(self, file_path: str, markdown: str) -> list[tuple[str, list[str]]]:
+        """(source, words) title candidates for a file, best source first."""
+        found = []
+        source, extractor = METADATA_EXTRACTORS.get(
+            os.path.splitext(file_path)[1].lower(), (None, None)
+        )
+        if extractor is not None:
+            try:
+                words = usable_title_words(extractor(file_path))
+            except Exception:
+                words = []
+            if words:
+                found.append((source, words))
+        words = usable_title_words(markdown_heading(markdown or ""))
+        if words:
+            found.append(("markdown_heading", words))
+        return found
+
+    def score(self, source: str, words: list[str], keywords: list[str]):
+        """Pad or cut title words; return (words, confidence)."""
+        confidence = SOURCE_CONFIDENCE[source]
+        words = list(dict.fromkeys(words))
+        if len(words) > self.max_words:
+            words = words[: self.max_words]
+            confidence -= TRUNCATION_PENALTY
+        for keyword in keywords:
+            if len(words) >= self.min_words:
+                break
+            if keyword not in words:
+                words.append(keyword)
+                confidence -= PADDING_PENALTY
+        return words, confidence
+
+    def suggest(self, file_path: str, markdown: str) -> tuple[list[str], float]:
+        """
+        Build local suggestions for a file.
+
+        Returns:
+            (suggestions, confidence) for the best candidate; suggestions is
+            empty if nothing could be rendered.
+        """
+        with span("local_naming"):
+            keywords = self.keywords(markdown or "")
+            scored = [
+                self.score(source, words, keywords)
+                for source, words in self.candidates(file_path, markdown)
+            ]
+            if keywords:
+                scored.append(self.score("keywords", [], keywords))
+            scored.sort(key=lambda item: -item[1])
+            suggestions = []
+            confidence = 0.0
+            for words, candidate_confidence in scored:
+                name = render_name(words, self.naming_convention)
+                if name and name not in suggestions:
+                    if not suggestions:
+                        confidence = candidate_confidence
+                    suggestions.append(name)
+            return suggestions[:3], confidence
+
+    def try_name(
+        self, file_path: str, markdown: str, verbose_level: int = 0
+    ) -> list[str] | None:
+        """
+        Return local suggestions if they are confident enough, else None.
+
+        Counts the file as named locally or escalated.
+        """
+        suggestions, confidence = self.suggest(file_path, markdown)
+        if suggestions and confidence >= self.min_confidence:
+            self.named += 1
+            if verbose_level > 0:
+                print(
+                    f"[DEBUG] Named locally: {suggestions[0]} "
+                    f"(confidence {confidence:.2f})"
+                )
+            return suggestions
+        self.escalated += 1
+        if verbose_level > 0:
+            print(
+                f"[DEBUG] Escalating to the LLM (local confidence {confidence:.2f} "
+                f"< {self.min_confidence:.2f})"
+            )
+        return None
@@ -0,0 +1,111 @@
+"""
+Memory guard for long runs (`--max-memory`).
+
+The run loop calls `MemoryGuard.check()` before starting each file. When the
+resident set size is above the limit, the guard runs the registered relief
+callbacks (e.g. spilling the dry-run plan to disk), collects garbage and returns
+freed heap to the OS. Waiting would not help: the run is sequential, so nothing
+else frees memory in the meantime. If relief does not bring RSS under the limit,
+the threshold is raised to the current RSS, so relief runs again only once
+memory grows further instead of on every file.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import os
+import sys
+from collections.abc import Callable
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss_mb() -> float:
+    """
+    Current resident set size in MiB.
+
+    Falls back to the peak RSS where /proc is unavailable, and to 0 where the
+    `resource` module is missing too (Windows), which leaves the guard idle.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _malloc_trim() -> None:
+    """Return freed heap pages to the OS on glibc; no-op elsewhere."""
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name:
+        return
+    try:
+        ctypes.CDLL(libc_name).malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryGuard:
+    """Release memory when RSS exceeds a limit."""
+
+    def __init__(
+        self,
+        limit_mb: float | None,
+        rss_func: Callable[[], float] = current_rss_mb,
+    ):
+        """
+        Args:
+            limit_mb: RSS limit in MiB (None or 0 disables the guard)
+            rss_func: Function returning the current RSS in MiB
+        """
+        self.limit_mb = limit_mb
+        # Raised to the RSS that relief could not bring down (see check)
+        self.threshold_mb = limit_mb
+        self.rss_func = rss_func
+        self.relief_callbacks: list[Callable[[], None]] = []
+        self.pressure_events = 0
+        self._warned = False
+
+    def add_relief(self, callback: Callable[[], None]) -> None:
+        """Register a callback that releases memory when the limit is hit."""
+        self.relief_callbacks.append(callback)
+
+    def check(self) -> bool:
+        """
+        Run relief once if RSS is above the threshold.
+
+        Returns:
+            True if memory is below the limit, False if it is still above it
+        """
+        if not self.limit_mb:
+            return True
+        rss = self.rss_func()
+        if rss <= self.limit_mb:
+            return True
+        if rss <= self.threshold_mb:
+            # Relief already failed at this level
+            return False
+        self.pressure_events += 1
+        for callback in self.relief_callbacks:
+            callback()
+        gc.collect()
+        _malloc_trim()
+        rss = self.rss_func()
+        if rss <= self.limit_mb:
+            return True
+        self.threshold_mb = rss
+        if not self._warned:
+            print(
+                f"[MEMORY] RSS {rss:.0f} MiB is above the "
+                f"--max-memory limit of {self.limit_mb:.0f} MiB; continuing"
+            )
+            self._warned = True
+        return False
@@ -4,9 +4,22 @@ Pydantic models for structured LLM responses.
 These models define the structure for filename suggestions returned by LLMs,
 ensuring type safety and validation. The models are used with OpenAI's
 structured output feature via client.beta.chat.completions.parse().
+
+Naming conventions live in a registry: each `NamingConvention` holds its model
+class, compiled pattern and (built once) OpenAI `response_format` payload.
+Custom conventions can be registered from the `[naming_conventions]` table in
+.onomarc:
+
+    [naming_conventions.SCREAMING_SNAKE_CASE]
+    pattern = "^[A-Z0-9]+(_[A-Z0-9]+)*$"
+    description = "Upper case words joined by underscores (e.g., MY_DOCUMENT)"
 """
 
-from pydantic import BaseModel, Field, field_validator
+import re
+from collections.abc import Mapping
+from typing import ClassVar
+
+from pydantic import BaseModel, Field, create_model, field_validator
 
 
 class FilenameSuggestions(BaseModel):
@@ -17,6 +30,10 @@ class FilenameSuggestions(BaseModel):
     with each suggestion being a valid filename string.
     """
 
+    # Compiled pattern every suggestion must match, set by convention subclasses
+    pattern: ClassVar[re.Pattern | None] = None
+    convention: ClassVar[str] = ""
+
     suggestions: list[str] = Field(
         ...,
         min_length=3,
@@ -32,145 +49,193 @@ class FilenameSuggestions(BaseModel):
             raise ValueError("Must provide exactly 3 suggestions")
 
         for suggestion in v:
-            if not isinstance(suggestion, str):
-                raise ValueError("Each suggestion must be a string")
-            if not suggestion.strip():
-                raise ValueError("Suggestions cannot be empty or whitespace-only")
-            if len(suggestion) > 128:
-                raise ValueError("Suggestions must be 128 characters or less")
+            cls.check_suggestion(suggestion)
 
         return v
 
+    @classmethod
+    def check_suggestion(cls, suggestion) -> None:
+        """
+        Validate a single suggestion.
+
+        Raises:
+            ValueError: If the suggestion is empty, too long or off-convention
+        """
+        if not isinstance(suggestion, str):
+            raise ValueError("Each suggestion must be a string")
+        if not suggestion.strip():
+            raise ValueError("Suggestions cannot be empty or whitespace-only")
+        if len(suggestion) > 128:
+            raise ValueError("Suggestions must be 128 characters or less")
+        if cls.pattern is not None and not cls.pattern.match(suggestion):
+            raise ValueError(f"'{suggestion}' is not valid {cls.convention} format")
+
 
 class SnakeCaseFilenameSuggestions(FilenameSuggestions):
     """Snake case filename suggestions (e.g., my_document_file)."""
 
-    @field_validator("suggestions")
-    @classmethod
-    def validate_snake_case(cls, v):
-        """Validate that suggestions follow snake_case pattern."""
-        v = super().validate_suggestions(v)
+    pattern = re.compile(r"^[a-z0-9]+(_[a-z0-9]+)*$")
+    convention = "snake_case"
 
-        import re
 
-        snake_case_pattern = re.compile(r"^[a-z0-9]+(_[a-z0-9]+)*$")
+class CamelCaseFilenameSuggestions(FilenameSuggestions):
+    """Camel case filename suggestions (e.g., myDocumentFile)."""
 
-        for suggestion in v:
-            if not snake_case_pattern.match(suggestion):
-                raise ValueError(f"'{suggestion}' is not valid snake_case format")
+    pattern = re.compile(r"^[a-z0-9]+([A-Z][a-z0-9]*)*$")
+    convention = "camelCase"
 
-        return v
 
+class KebabCaseFilenameSuggestions(FilenameSuggestions):
+    """Kebab case filename suggestions (e.g., my-document-file)."""
 
-class CamelCaseFilenameSuggestions(FilenameSuggestions):
-    """Camel case filename suggestions (e.g., myDocumentFile)."""
+    pattern = re.compile(r"^[a-z0-9]+(-[a-z0-9]+)*$")
+    convention = "kebab-case"
 
-    @field_validator("suggestions")
-    @classmethod
-    def validate_camel_case(cls, v):
-        """Validate that suggestions follow camelCase pattern."""
-        v = super().validate_suggestions(v)
 
-        import re
+class PascalCaseFilenameSuggestions(FilenameSuggestions):
+    """Pascal case filename suggestions (e.g., MyDocumentFile)."""
 
-        camel_case_pattern = re.compile(r"^[a-z0-9]+([A-Z][a-z0-9]*)*$")
+    pattern = re.compile(r"^[A-Z][a-z0-9]*([A-Z][a-z0-9]*)*$")
+    convention = "PascalCase"
 
-        for suggestion in v:
-            if not camel_case_pattern.match(suggestion):
-                raise ValueError(f"'{suggestion}' is not valid camelCase format")
 
-        return v
+class DotNotationFilenameSuggestions(FilenameSuggestions):
+    """Dot notation filename suggestions (e.g., my.document.file)."""
 
+    pattern = re.compile(r"^[a-z0-9]+(\.[a-z0-9]+)*$")
+    convention = "dot.notation"
 
-class KebabCaseFilenameSuggestions(FilenameSuggestions):
-    """Kebab case filename suggestions (e.g., my-document-file)."""
 
-    @field_validator("suggestions")
-    @classmethod
-    def validate_kebab_case(cls, v):
-        """Validate that suggestions follow kebab-case pattern."""
-        v = super().validate_suggestions(v)
+class NaturalLanguageFilenameSuggestions(FilenameSuggestions):
+    """Natural language filename suggestions (e.g., My Document File)."""
 
-        import re
+    pattern = re.compile(r"^[A-Za-z0-9]+( [A-Za-z0-9]+)*$")
+    convention = "natural language"
 
-        kebab_case_pattern = re.compile(r"^[a-z0-9]+(-[a-z0-9]+)*$")
 
-        for suggestion in v:
-            if not kebab_case_pattern.match(suggestion):
-                raise ValueError(f"'{suggestion}' is not valid kebab-case format")
+class NamingConvention:
+    """A registered naming convention and its cached validation artifacts."""
 
-        return v
+    def __init__(self, name: str, model: type[FilenameSuggestions]):
+        self.name = name
+        self.model = model
+        self.pattern = model.pattern
 
+    @property
+    def response_format(self) -> dict:
+        """The OpenAI `response_format` payload, built on first use."""
+        return get_response_format(self.model)
 
-class PascalCaseFilenameSuggestions(FilenameSuggestions):
-    """Pascal case filename suggestions (e.g., MyDocumentFile)."""
+    def matches(self, name: str) -> bool:
+        """Whether a single name follows the convention."""
+        return self.pattern is None or self.pattern.match(name) is not None
 
-    @field_validator("suggestions")
-    @classmethod
-    def validate_pascal_case(cls, v):
-        """Validate that suggestions follow PascalCase pattern."""
-        v = super().validate_suggestions(v)
 
-        import re
+# Registered conventions by name (see register_naming_convention)
+NAMING_CONVENTIONS: dict[str, NamingConvention] = {}
 
-        pascal_case_pattern = re.compile(r"^[A-Z][a-z0-9]*([A-Z][a-z0-9]*)*$")
+# Mapping of naming conventions to their corresponding Pydantic models
+NAMING_CONVENTION_MODELS: dict[str, type[FilenameSuggestions]] = {}
 
-        for suggestion in v:
-            if not pascal_case_pattern.match(suggestion):
-                raise ValueError(f"'{suggestion}' is not valid PascalCase format")
+# Batch models keyed by naming convention (see get_batch_model_for_naming_convention)
+_BATCH_MODELS: dict[str, type[BaseModel]] = {}
 
-        return v
+# Unchecked twins of the convention models (see get_unchecked_model)
+_UNCHECKED_MODELS: dict[str, type[BaseModel]] = {}
 
+# OpenAI response_format payloads keyed by model class
+_RESPONSE_FORMATS: dict[type[BaseModel], dict] = {}
 
-class DotNotationFilenameSuggestions(FilenameSuggestions):
-    """Dot notation filename suggestions (e.g., my.document.file)."""
 
-    @field_validator("suggestions")
-    @classmethod
-    def validate_dot_notation(cls, v):
-        """Validate that suggestions follow dot.notation pattern."""
-        v = super().validate_suggestions(v)
+def _register(name: str, model: type[FilenameSuggestions]) -> NamingConvention:
+    convention = NamingConvention(name, model)
+    NAMING_CONVENTIONS[name] = convention
+    NAMING_CONVENTION_MODELS[name] = model
+    _BATCH_MODELS.pop(name, None)
+    _UNCHECKED_MODELS.pop(name, None)
+    return convention
 
-        import re
 
-        dot_notation_pattern = re.compile(r"^[a-z0-9]+(\.[a-z0-9]+)*$")
+def register_naming_convention(
+    name: str, pattern: str, description: str | None = None
+) -> NamingConvention:
+    """
+    Register a custom naming convention validated by a regular expression.
 
-        for suggestion in v:
-            if not dot_notation_pattern.match(suggestion):
-                raise ValueError(f"'{suggestion}' is not valid dot.notation format")
+    Registering the same name with the same pattern again is a no-op, so this
+    can be called for every config load.
 
-        return v
+    Args:
+        name: The naming convention string used in config (e.g., "SCREAMING_SNAKE")
+        pattern: Regular expression every suggestion must match
+        description: Shown to the LLM as the schema description
+
+    Returns:
+        The registered NamingConvention
 
+    Raises:
+        ValueError: If the pattern is not a valid regular expression
+    """
+    existing = NAMING_CONVENTIONS.get(name)
+    if existing is not None and existing.pattern is not None:
+        if existing.pattern.pattern == pattern and (
+            description is None or existing.model.__doc__ == description
+        ):
+            return existing
+    try:
+        compiled = re.compile(pattern)
+    except re.error as err:
+        raise ValueError(
+            f"Invalid pattern for naming convention {name}: {err}"
+        ) from err
+    title = "".join(part.capitalize() for part in re.split(r"[^A-Za-z0-9]+", name))
+    model = create_model(
+        f"{title}FilenameSuggestions",
+        __base__=FilenameSuggestions,
+        __doc__=description or f"{name} filename suggestions.",
+    )
+    model.pattern = compiled
+    model.convention = name
+    return _register(name, model)
 
-class NaturalLanguageFilenameSuggestions(FilenameSuggestions):
-    """Natural language filename suggestions (e.g., My Document File)."""
 
-    @field_validator("suggestions")
-    @classmethod
-    def validate_natural_language(cls, v):
-        """Validate that suggestions follow natural language pattern."""
-        v = super().validate_suggestions(v)
+for _model in (
+    SnakeCaseFilenameSuggestions,
+    CamelCaseFilenameSuggestions,
+    KebabCaseFilenameSuggestions,
+    PascalCaseFilenameSuggestions,
+    DotNotationFilenameSuggestions,
+    NaturalLanguageFilenameSuggestions,
+):
+    _register(_model.convention, _model)
 
-        import re
 
-        natural_language_pattern = re.compile(r"^[A-Za-z0-9]+( [A-Za-z0-9]+)*$")
+def register_config_conventions(config: Mapping) -> None:
+    """
+    Register the custom conventions from a config's `naming_conventions` table.
 
-        for suggestion in v:
-            if not natural_language_pattern.match(suggestion):
-                raise ValueError(f"'{suggestion}' is not valid natural language format")
+    Raises:
+        ValueError: If an entry has no valid `pattern`
+    """
+    for name, spec in (config.get("naming_conventions") or {}).items():
+        if not isinstance(spec, Mapping) or not spec.get("pattern"):
+            raise ValueError(f"Naming convention {name} needs a 'pattern'")
+        register_naming_convention(name, spec["pattern"], spec.get("description"))
 
-        return v
 
+def get_naming_convention(naming_convention: str) -> NamingConvention:
+    """
+    Look up a registered naming convention.
 
-# Mapping of naming conventions to their corresponding Pydantic models
-NAMING_CONVENTION_MODELS = {
-    "snake_case": SnakeCaseFilenameSuggestions,
-    "camelCase": CamelCaseFilenameSuggestions,
-    "kebab-case": KebabCaseFilenameSuggestions,
-    "PascalCase": PascalCaseFilenameSuggestions,
-    "dot.notation": DotNotationFilenameSuggestions,
-    "natural language": NaturalLanguageFilenameSuggestions,
-}
+    Raises:
+        ValueError: If the naming convention is not supported
+    """
+    try:
+        return NAMING_CONVENTIONS[naming_convention]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported naming convention: {naming_convention}"
+        ) from None
 
 
 def get_model_for_naming_convention(
@@ -188,10 +253,92 @@ def get_model_for_naming_convention(
     Raises:
         ValueError: If the naming convention is not supported
     """
-    if naming_convention not in NAMING_CONVENTION_MODELS:
-        raise ValueError(f"Unsupported naming convention: {naming_convention}")
+    return get_naming_convention(naming_convention).model
+
+
+def get_unchecked_model(naming_convention: str) -> type[BaseModel]:
+    """
+    Get the convention model without its per-suggestion checks.
+
+    The JSON schema is the same as the convention model's, so the LLM sees the
+    same request, but off-convention suggestions parse instead of failing the
+    whole response. They are then repaired locally (see
+    `onomatool.naming.repair_names`) and checked on their own.
+
+    Args:
+        naming_convention: The naming convention string (e.g., "snake_case")
+
+    Returns:
+        A model with the convention model's name, docstring and `suggestions`
+        field
+
+    Raises:
+        ValueError: If the naming convention is not supported
+    """
+    model_class = _UNCHECKED_MODELS.get(naming_convention)
+    if model_class is None:
+        checked = get_model_for_naming_convention(naming_convention)
+        model_class = create_model(
+            checked.__name__,
+            __doc__=checked.__doc__,
+            suggestions=(list[str], FilenameSuggestions.model_fields["suggestions"]),
+        )
+        _UNCHECKED_MODELS[naming_convention] = model_class
+    return model_class
+
+
+class BatchFileSuggestions(BaseModel):
+    """Suggestions for one file of a batch request."""
+
+    id: str = Field(..., description="The id of the file the suggestions are for")
+    suggestions: list[str] = Field(
+        ..., description="Exactly 3 filename suggestions for this file"
+    )
+
+
+def get_batch_model_for_naming_convention(naming_convention: str) -> type[BaseModel]:
+    """
+    Get the Pydantic model for a batch response covering several files.
+
+    Items are deliberately not validated against the naming convention here: one
+    bad item must not fail the whole batch. Each item is validated on its own
+    with the convention model instead.
+
+    Args:
+        naming_convention: The naming convention string (e.g., "snake_case")
+
+    Returns:
+        A model with a `files` list of `BatchFileSuggestions`, named after the
+        convention model (e.g., BatchSnakeCaseFilenameSuggestions)
+
+    Raises:
+        ValueError: If the naming convention is not supported
+    """
+    model_class = _BATCH_MODELS.get(naming_convention)
+    if model_class is None:
+        item_model = get_model_for_naming_convention(naming_convention)
+        model_class = create_model(
+            f"Batch{item_model.__name__}",
+            files=(
+                list[BatchFileSuggestions],
+                Field(..., description="One entry per file, identified by its id"),
+            ),
+        )
+        _BATCH_MODELS[naming_convention] = model_class
+    return model_class
+
+
+def get_response_format(model_class: type[BaseModel]) -> dict:
+    """
+    Cached `generate_json_schema_from_model`; the schema is built once per model.
 
-    return NAMING_CONVENTION_MODELS[naming_convention]
+    The returned dict is shared and must not be modified.
+    """
+    response_format = _RESPONSE_FORMATS.get(model_class)
+    if response_format is None:
+        response_format = generate_json_schema_from_model(model_class)
+        _RESPONSE_FORMATS[model_class] = response_format
+    return response_format
 
 
 def generate_json_schema_from_model(model_class: type[BaseModel]) -> dict:
@@ -0,0 +1,233 @@
+"""
+Local rendering of words into filenames.
+
+Turns free text (titles, subjects, keywords) into lowercase ASCII words and
+joins them in a built-in naming convention, checking the result against the
+convention's compiled pattern from the registry in `onomatool.models`.
+
+Words are the convention-neutral form of a name: `name_words()` recovers them
+from a name in any built-in convention and `render_name()` renders them in
+another, so a name can be re-formatted without asking the LLM again. The
+same round trip repairs near-miss LLM output (`repair_names()`): a model that
+answers "Quarterly_Report 2024" for snake_case gets "quarterly_report_2024"
+instead of a second request.
+"""
+
+import re
+import unicodedata
+
+from onomatool.models import get_naming_convention
+
+# Maximum consecutive digits allowed in a single word - prevents extremely long number sequences
+MAX_CONSECUTIVE_DIGITS = 10
+MAX_NAME_CHARS = 128
+
+# Conventions join_words can render
+RENDERABLE_CONVENTIONS = (
+    "snake_case",
+    "kebab-case",
+    "dot.notation",
+    "camelCase",
+    "PascalCase",
+    "natural language",
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def ascii_fold(text: str) -> str:
+    """Strip accents and drop characters without an ASCII equivalent."""
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def split_words(text: str) -> list[str]:
+    """Split text into lowercase ASCII words (letters and digits)."""
+    return _WORD.findall(ascii_fold(text).lower())
+
+
+def join_words(words: list[str], naming_convention: str) -> str | None:
+    """Join lowercase words in a built-in naming convention (None if unknown)."""
+    if naming_convention == "snake_case":
+        return "_".join(words)
+    if naming_convention == "kebab-case":
+        return "-".join(words)
+    if naming_convention == "dot.notation":
+        return ".".join(words)
+    if naming_convention == "camelCase":
+        return words[0] + "".join(w.capitalize() for w in words[1:])
+    if naming_convention == "PascalCase":
+        return "".join(w.capitalize() for w in words)
+    if naming_convention == "natural language":
+        return " ".join(w.capitalize() for w in words)
+    return None
+
+
+def limit_words(
+    words: list[str],
+    max_words: int | None = None,
+    max_digits: int | None = MAX_CONSECUTIVE_DIGITS,
+) -> list[str]:
+    """
+    Fold words to lowercase ASCII and apply the word limits.
+
+    Args:
+        words: Words (or phrases) to fold
+        max_words: Keep at most this many words
+        max_digits: Cut longer runs of digits to this many
+
+    Returns:
+        The remaining lowercase words
+    """
+    words = [w for word in words for w in split_words(word)]
+    if max_digits is not None:
+        too_long = re.compile(rf"\d{{{max_digits + 1},}}")
+        words = [too_long.sub(lambda m: m.group()[:max_digits], w) for w in words]
+    return words[:max_words] if max_words else words
+
+
+def render_name(
+    words: list[str],
+    naming_convention: str,
+    min_words: int = 1,
+    max_words: int | None = None,
+    max_digits: int | None = MAX_CONSECUTIVE_DIGITS,
+) -> str | None:
+    """
+    Render words as a filename in the given naming convention.
+
+    Args:
+        words: Words to join; they are folded to lowercase ASCII first
+        naming_convention: The naming convention string (e.g., "snake_case")
+        min_words: Fewer remaining words render no name
+        max_words: Words past this many are cut off
+        max_digits: Longer runs of digits are cut to this many
+
+    Returns:
+        The name, or None if there are too few usable words, the convention
+        cannot be rendered locally (custom conventions) or the result does not
+        validate.
+    """
+    words = limit_words(words, max_words, max_digits)
+    if not words or len(words) < min_words:
+        return None
+    name = join_words(words, naming_convention)
+    if name is None or len(name) > MAX_NAME_CHARS:
+        return None
+    try:
+        convention = get_naming_convention(naming_convention)
+    except ValueError:
+        return None
+    return name if convention.matches(name) else None
+
+
+_CAMEL_HUMP = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def name_words(name: str) -> list[str]:
+    """Split a filename in any convention into lowercase words."""
+    return split_words(_CAMEL_HUMP.sub(" ", name))
+
+
+def render_for_config(words: list[str], config, naming_convention: str | None = None):
+    """`render_name()` with the config's convention and word limits."""
+    return render_name(
+        words,
+        naming_convention or config.get("naming_convention", "snake_case"),
+        min_words=config.get("min_filename_words", 5),
+        max_words=config.get("max_filename_words", 15),
+    )
+
+
+_SPACES = re.compile(r"\s+")
+
+
+def _within_limits(
+    name: str, naming_convention: str, max_words: int | None, max_digits: int | None
+) -> bool:
+    if len(name) > MAX_NAME_CHARS:
+        return False
+    if max_digits is not None and re.search(rf"\d{{{max_digits + 1},}}", name):
+        return False
+    if max_words and naming_convention in RENDERABLE_CONVENTIONS:
+        return len(name_words(name)) <= max_words
+    return True
+
+
+def repair_name(
+    name: str,
+    naming_convention: str,
+    max_words: int | None = None,
+    max_digits: int | None = MAX_CONSECUTIVE_DIGITS,
+) -> str | None:
+    """
+    Coerce a near-miss name into a naming convention.
+
+    Names that already match the convention and the limits are returned
+    unchanged. Other names in built-in conventions are re-rendered from their
+    words: case is folded, accents transliterated, separators collapsed, long
+    names cut and long digit runs shortened. Custom conventions only get
+    accents transliterated and whitespace collapsed.
+
+    Returns:
+        The repaired name, or None if nothing valid can be made of it
+    """
+    try:
+        convention = get_naming_convention(naming_convention)
+    except ValueError:
+        return None
+    if convention.matches(name) and _within_limits(
+        name, naming_convention, max_words, max_digits
+    ):
+        return name
+    if naming_convention in RENDERABLE_CONVENTIONS:
+        return render_name(
+            name_words(name),
+            naming_convention,
+            max_words=max_words,
+            max_digits=max_digits,
+        )
+    name = _SPACES.sub(" ", ascii_fold(name)).strip()
+    if not name or len(name) > MAX_NAME_CHARS or not convention.matches(name):
+        return None
+    return name
+
+
+def repair_names(
+    names: list[str],
+    naming_convention: str,
+    min_words: int = 1,
+    max_words: int | None = None,
+) -> tuple[list[str], list[str]]:
+    """
+    Repair LLM suggestions before they are validated.
+
+    Each name goes through `repair_name()`; unusable names and duplicates are
+    dropped. In built-in conventions, names with fewer than `min_words` words
+    are dropped too, unless that would leave none.
+
+    Returns:
+        The repaired names and a description of each repair (empty when every
+        name was already valid)
+    """
+    repaired: list[str] = []
+    short: list[str] = []
+    notes: list[str] = []
+    for name in names:
+        fixed = repair_name(name, naming_convention, max_words)
+        if fixed is None:
+            notes.append(f"dropped unusable {name!r}")
+            continue
+        if fixed != name:
+            notes.append(f"{name!r} -> {fixed!r}")
+        if fixed in repaired or fixed in short:
+            notes.append(f"dropped duplicate {fixed!r}")
+        elif (
+            naming_convention in RENDERABLE_CONVENTIONS
+            and len(name_words(fixed)) < min_words
+        ):
+            short.append(fixed)
+        else:
+            repaired.append(fixed)
+    if repaired and short:
+        notes.extend(f"dropped {name!r} (under {min_words} words)" for name in short)
+    return repaired or short, notes
@@ -0,0 +1,335 @@
+"""
+Near-duplicate reuse with MinHash/LSH (`--near-duplicates`).
+
+Template-heavy corpora (v1/v2/final drafts, monthly reports) contain many
+documents that differ in a few lines. Each named document's markdown is reduced
+to a MinHash signature over word shingles and indexed with LSH bands, so a new
+document is compared only against the few documents sharing a band with it.
+
+When the estimated similarity to an already named document is at least
+`reuse_threshold`, that document's suggestions are reused, with dates, versions
+and numbers swapped for the ones found in the new document. Between `threshold`
+and `reuse_threshold`, the LLM gets a much smaller prompt: the earlier name and
+only the lines that differ. The index lives for the run and can be persisted
+to a JSONL file with `index_path`:
+
+    [near_duplicates]
+    enabled = true
+    threshold = 0.7
+    reuse_threshold = 0.9
+    index_path = "~/.cache/onomatool/near_duplicates.jsonl"
+"""
+
+import json
+import os
+import random
+import re
+import zlib
+from collections import Counter
+
+from onomatool.llm_integration import get_suggestions
+from onomatool.naming import name_words, render_name, split_words
+
+NUM_PERM = 64
+SHINGLE_WORDS = 5
+# Shorter documents are too small for a meaningful similarity
+MIN_WORDS = 40
+# Only the start of very long documents is shingled
+MAX_SHINGLE_CHARS = 50_000
+MAX_DIFF_CHARS = 2_000
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_rng = random.Random(0x6F6E6F6D61)
+_PERMUTATIONS = tuple(
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)
+)
+
+_MONTHS = (
+    "january february march april may june july august september october "
+    "november december jan feb mar apr jun jul aug sep sept oct nov dec"
+).split()
+_YEAR = re.compile(r"(19|20)\d\d")
+_QUARTER = re.compile(r"q[1-4]")
+_VERSION = re.compile(r"(v|rev)\d+")
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set[int]:
+    """CRC32 hashes of the overlapping `size`-word shingles of a text."""
+    words = split_words(text[:MAX_SHINGLE_CHARS])
+    return {
+        zlib.crc32(" ".join(words[i : i + size]).encode("ascii"))
+        for i in range(max(len(words) - size + 1, 1))
+        if words
+    }
+
+
+def minhash(hashes: set[int]) -> tuple[int, ...]:
+    """The MinHash signature of a set of shingle hashes."""
+    if not hashes:
+        return ()
+    return tuple(
+        min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(first: tuple[int, ...], second: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(x == y for x, y in zip(first, second, strict=True)) / len(first)
+
+
+def choose_bands(threshold: float, num_perm: int = NUM_PERM) -> int:
+    """
+    Number of LSH bands whose candidate threshold (1/b)^(1/r) is the highest
+    one not above `threshold`, so that matches above it are rarely missed.
+    """
+    best = num_perm
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = bands
+    return best
+
+
+def _line_key(line: str) -> int:
+    return zlib.crc32(" ".join(line.split()).lower().encode("utf-8"))
+
+
+def line_hashes(markdown: str) -> set[int]:
+    """Hashes of the non-blank lines of a document, whitespace-normalized."""
+    return {_line_key(line) for line in markdown.splitlines() if line.strip()}
+
+
+def differing_lines(markdown: str, known_lines: set[int]) -> str:
+    """The lines of a document that do not occur in another (truncated)."""
+    lines = [
+        line.strip()
+        for line in markdown.splitlines()
+        if line.strip() and _line_key(line) not in known_lines
+    ]
+    return "\n".join(lines)[:MAX_DIFF_CHARS]
+
+
+def _token_class(word: str) -> str | None:
+    if word in _MONTHS:
+        return "month"
+    if _YEAR.fullmatch(word):
+        return "year"
+    if _QUARTER.fullmatch(word):
+        return "quarter"
+    if _VERSION.fullmatch(word):
+        return "version"
+    if word in ("draft", "final"):
+        return "stage"
+    if word.isdigit():
+        return "number"
+    return None
+
+
+def adapt_suggestion(suggestion: str, markdown: str, naming_convention: str) -> str:
+    """
+    Swap the dates, quarters, versions, draft/final markers and numbers in a
+    reused name that the new document does not contain for the most frequent
+    ones it does contain.
+    """
+    document_words = split_words(markdown[:MAX_SHINGLE_CHARS])
+    present = set(document_words)
+    by_class: dict[str, Counter] = {}
+    for word in document_words:
+        token_class = _token_class(word)
+        if token_class:
+            by_class.setdefault(token_class, Counter())[word] += 1
+    words = name_words(suggestion)
+    changed = False
+    for i, word in enumerate(words):
+        token_class = _token_class(word)
+        if token_class is None or word in present:
+            continue
+        for replacement, _ in (by_class.get(token_class) or Counter()).most_common():
+            if replacement not in words:
+                words[i] = replacement
+                changed = True
+                break
+    if not changed:
+        return suggestion
+    return render_name(words, naming_convention) or suggestion
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of named documents, bucketed by LSH band."""
+
+    def __init__(self, threshold: float = 0.7, path: str | None = None):
+        self.threshold = threshold
+        self.bands = choose_bands(threshold)
+        self.rows = NUM_PERM // self.bands
+        self.path = path
+        # file path -> {"suggestions", "signature", "lines"}
+        self.entries: dict[str, dict] = {}
+        self._buckets: dict[tuple, set[str]] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _band_keys(self, signature: tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows : (band + 1) * self.rows]
+
+    def _insert(self, file_path: str, entry: dict) -> None:
+        self.entries[file_path] = entry
+        for key in self._band_keys(entry["signature"]):
+            self._buckets.setdefault(key, set()).add(file_path)
+
+    def load(self, path: str) -> None:
+        """Load entries persisted by an earlier run (later lines win)."""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    signature = tuple(record["signature"])
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                if len(signature) != NUM_PERM:
+                    continue
+                self._insert(
+                    record["path"],
+                    {
+                        "suggestions": record["suggestions"],
+                        "signature": signature,
+                        "lines": set(record.get("lines", ())),
+                    },
+                )
+
+    def add(
+        self,
+        file_path: str,
+        signature: tuple[int, ...],
+        lines: set[int],
+        suggestions: list[str],
+    ) -> None:
+        """Index a named document (and append it to the persisted index)."""
+        if not signature:
+            return
+        entry = {"suggestions": suggestions, "signature": signature, "lines": lines}
+        self._insert(file_path, entry)
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            record = {
+                "path": file_path,
+                "suggestions": suggestions,
+                "signature": signature,
+                "lines": sorted(lines),
+            }
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def best_match(
+        self, signature: tuple[int, ...], exclude: str | None = None
+    ) -> tuple[str, float] | None:
+        """The most similar indexed document at or above the threshold."""
+        if not signature:
+            return None
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(exclude)
+        best = None
+        for file_path in candidates:
+            score = similarity(signature, self.entries[file_path]["signature"])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (file_path, score)
+        return best
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class NearDuplicateNamer:
+    """Name documents from their near-duplicates in a `NearDuplicateIndex`."""
+
+    def __init__(
+        self,
+        index: NearDuplicateIndex,
+        naming_convention: str = "snake_case",
+        reuse_threshold: float = 0.9,
+    ):
+        self.index = index
+        self.naming_convention = naming_convention
+        self.reuse_threshold = reuse_threshold
+        self.reused = 0
+        self.diff_prompts = 0
+        # (file path, signature, line hashes) of the last document looked up
+        self._last = None
+
+    @classmethod
+    def from_config(cls, config) -> "NearDuplicateNamer":
+        settings = config.get("near_duplicates") or {}
+        index_path = settings.get("index_path") or None
+        if index_path:
+            index_path = os.path.expanduser(index_path)
+        return cls(
+            NearDuplicateIndex(settings.get("threshold", 0.7), index_path),
+            naming_convention=config.get("naming_convention", "snake_case"),
+            reuse_threshold=settings.get("reuse_threshold", 0.9),
+        )
+
+    def _fingerprint(self, file_path: str, markdown: str):
+        if self._last is None or self._last[0] != file_path:
+            if len(split_words(markdown[:MAX_SHINGLE_CHARS])) < MIN_WORDS:
+                signature = ()
+            else:
+                signature = minhash(shingles(markdown))
+            self._last = (file_path, signature, line_hashes(markdown))
+        return self._last[1], self._last[2]
+
+    def try_name(
+        self, file_path: str, markdown: str, config, verbose_level: int = 0
+    ) -> list[str] | None:
+        """
+        Suggestions for a near-duplicate of an indexed document, or None.
+
+        Raises:
+            RuntimeError: If the differences-only LLM call fails
+        """
+        signature, _ = self._fingerprint(file_path, markdown)
+        match = self.index.best_match(signature, exclude=file_path)
+        if match is None:
+            return None
+        match_path, score = match
+        entry = self.index.entries[match_path]
+        differences = differing_lines(markdown, entry["lines"])
+        if score >= self.reuse_threshold or not differences:
+            self.reused += 1
+            if verbose_level > 0:
+                print(
+                    f"[DEBUG] Reusing the name of {match_path} "
+                    f"({score:.0%} similar) for {file_path}"
+                )
+            return [
+                adapt_suggestion(s, markdown, self.naming_convention)
+                for s in entry["suggestions"]
+            ]
+        self.diff_prompts += 1
+        if verbose_level > 0:
+            print(
+                f"[DEBUG] {file_path} is {score:.0%} similar to {match_path}; "
+                f"sending {len(differences)} characters of differences"
+            )
+        content = (
+            f"This document is a near-duplicate ({score:.0%} similar) of one "
+            f"named '{entry['suggestions'][0]}'. Only the lines that differ are "
+            "shown below. Suggest names in the same style, changing only what "
+            f"the differences require.\n\n{differences}"
+        )
+        return get_suggestions(
+            content, verbose_level=verbose_level, file_path=file_path, config=config
+        )
+
+    def remember(self, file_path: str, markdown: str, suggestions: list[str]) -> None:
+        """Index a named document for the files that follow."""
+        signature, lines = self._fingerprint(file_path, markdown)
+        self.index.add(file_path, signature, lines, list(suggestions))
@@ -0,0 +1,139 @@
+"""
+Normalization of extracted content before it is distilled or truncated.
+
+MarkItDown output carries a lot that costs tokens without helping to name a
+file: data-URI images, long tracking URLs, tables with thousands of rows, runs
+of whitespace, page numbers, and headers and footers repeated on every page.
+`normalize_content()` removes or abbreviates these with precompiled regular
+expressions, so more of the real content fits into `MAX_CONTENT_CHARS` and the
+digest budget. Disable it with `normalize_content = false`.
+"""
+
+import os
+import re
+from collections import Counter
+
+MAX_URL_CHARS = 60
+MAX_TABLE_ROWS = 5
+# A line is boilerplate once it appears this often (e.g., on every page)
+MIN_REPEATS = 3
+MAX_BOILERPLATE_CHARS = 120
+# Source code and data files repeat lines legitimately
+NO_DEDUPE_EXTENSIONS = {
+    ".py",
+    ".js",
+    ".css",
+    ".json",
+    ".yaml",
+    ".yml",
+    ".toml",
+    ".ini",
+    ".cfg",
+    ".csv",
+    ".xml",
+    ".log",
+}
+
+_DATA_IMAGE = re.compile(r"!\[([^\]\n]*)\]\(data:[^)\s]*\)")
+_DATA_URI = re.compile(r"data:([\w.+-]+/[\w.+-]+)?(?:;[\w=.-]+)*,[A-Za-z0-9+/=%]{40,}")
+_URL = re.compile(r"\b(https?://)([^/\s)\]>\"']+)(/[^\s)\]>\"']*)")
+# Tables with more rows than the header, separator and MAX_TABLE_ROWS
+_TABLE = re.compile(rf"(?:^[ \t]*\|.*\|[ \t]*(?:\n|\Z)){{{MAX_TABLE_ROWS + 3},}}", re.M)
+_INNER_SPACES = re.compile(r"(?<=\S)[ \t]{2,}")
+_TRAILING_SPACES = re.compile(r"[ \t]+$", re.M)
+_BLANK_LINES = re.compile(r"\n[ \t]*\n(?:[ \t]*\n)+")
+# "Page 3", "p. 3 of 12", "3 / 12" and "- 3 -"; bare numbers up to 3 digits
+# only, so that a year on its own line survives
+_PAGE_NUMBER = re.compile(
+    r"^[ \t]*(?:(?:page|p\.|pg\.?)[ \t]*\d{1,4}(?:[ \t]*(?:of|/)[ \t]*\d{1,4})?"
+    r"|\d{1,4}[ \t]*(?:of|/)[ \t]*\d{1,4}"
+    r"|[-–—]?[ \t]*\d{1,3}[ \t]*[-–—]?)[ \t]*$\n?",
+    re.M | re.I,
+)
+_FORM_FEED = re.compile(r"[\f\v]+")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_WORD = re.compile(r"[^\W\d_]{2,}")
+
+
+def _abbreviate_url(match: re.Match) -> str:
+    scheme, host, path = match.groups()
+    if len(match.group(0)) <= MAX_URL_CHARS:
+        return match.group(0)
+    first_segment = path.split("/", 2)[1].split("?")[0][:30] if path != "/" else ""
+    return f"{scheme}{host}/{first_segment}…" if first_segment else f"{scheme}{host}/…"
+
+
+def _shorten_table(match: re.Match) -> str:
+    rows = match.group(0).rstrip("\n").split("\n")
+    # Header, separator and the first rows
+    kept = rows[: MAX_TABLE_ROWS + 2]
+    return "\n".join(kept) + f"\n| … {len(rows) - len(kept)} more rows |\n"
+
+
+def _drop_repeated_lines(text: str) -> str:
+    """Keep only the first occurrence of short lines repeated on many pages."""
+    lines = text.split("\n")
+    keys = []
+    in_fence = False
+    for line in lines:
+        key = None
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif (
+            not in_fence
+            and len(line) <= MAX_BOILERPLATE_CHARS
+            and not line.lstrip().startswith("|")
+            and len(_WORD.findall(line)) >= 2
+        ):
+            key = " ".join(line.split()).lower()
+        keys.append(key)
+    counts = Counter(key for key in keys if key is not None)
+    repeated = {key for key, count in counts.items() if count >= MIN_REPEATS}
+    if not repeated:
+        return text
+    seen = set()
+    kept = []
+    for line, key in zip(lines, keys, strict=True):
+        if key in repeated:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def normalize_content(text: str, file_path: str | None = None) -> str:
+    """
+    Strip or abbreviate constructs that carry no naming signal.
+
+    Args:
+        text: Extracted text or markdown of a file
+        file_path: The file's path (code and data files keep repeated lines)
+
+    Returns:
+        The normalized text
+    """
+    if not text:
+        return text
+    text = _FORM_FEED.sub("\n", text)
+    text = _DATA_IMAGE.sub(
+        lambda m: f"[image: {m.group(1)}]" if m.group(1) else "[image]", text
+    )
+    text = _DATA_URI.sub(lambda m: f"data:{m.group(1) or ''},…", text)
+    text = _URL.sub(_abbreviate_url, text)
+    text = _TABLE.sub(_shorten_table, text)
+    ext = os.path.splitext(file_path or "")[1].lower()
+    if ext not in NO_DEDUPE_EXTENSIONS:
+        text = _PAGE_NUMBER.sub("", text)
+        text = _drop_repeated_lines(text)
+    text = _INNER_SPACES.sub(" ", text)
+    text = _TRAILING_SPACES.sub("", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return text.strip()
+
+
+def normalize_for_config(text: str, file_path: str | None, config) -> str:
+    """`normalize_content()` unless `normalize_content` is disabled in config."""
+    if not config.get("normalize_content", True):
+        return text
+    return normalize_content(text, file_path)
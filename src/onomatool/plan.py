@@ -0,0 +1,242 @@
+"""
+Persisted rename plans for two-phase runs.
+
+`onomatool PATTERN --plan-out plan.jsonl` writes one JSON record per file with
+all suggestions and a fingerprint of the source file. `onomatool apply
+plan.jsonl` later applies the plan without any LLM calls: it verifies each
+fingerprint, resolves name conflicts per directory in bulk and renames.
+
+Paths are stored as they were collected, so a plan made from a relative glob can
+be applied on another host from the same tree root.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import defaultdict
+
+from onomatool.conflict_resolver import resolve_conflict
+
+PLAN_VERSION = 1
+
+
+def file_fingerprint(file_path: str, with_hash: bool = True) -> dict:
+    """
+    Fingerprint a file by size, modification time and (optionally) SHA-256.
+
+    Args:
+        file_path: Path to the file
+        with_hash: Include the SHA-256 of the file content
+
+    Returns:
+        Dict with "size", "mtime_ns" and optionally "sha256"
+    """
+    st = os.stat(file_path)
+    fingerprint = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+class PlanWriter:
+    """Append plan records to a JSONL file as files are processed."""
+
+    def __init__(self, plan_path: str, naming_convention: str | None = None):
+        self.plan_path = plan_path
+        self.naming_convention = naming_convention
+        self.count = 0
+        self._file = open(plan_path, "w", encoding="utf-8")
+
+    def write(self, file_path: str, suggestions: list[str]) -> None:
+        """Write the record for one file."""
+        record = {
+            "version": PLAN_VERSION,
+            "path": file_path,
+            "suggestions": list(suggestions),
+            "choice": 0,
+            "fingerprint": file_fingerprint(file_path),
+        }
+        if self.naming_convention:
+            record["naming_convention"] = self.naming_convention
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PlannedRename:
+    """Compact record of a dry-run rename; directories are interned and shared."""
+
+    __slots__ = ("directory", "basename", "new_name")
+
+    def __init__(self, file_path: str, new_name: str):
+        directory, self.basename = os.path.split(file_path)
+        self.directory = sys.intern(directory)
+        self.new_name = new_name
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, self.basename)
+
+
+class PlannedRenames:
+    """
+    Dry-run plan that keeps at most `max_in_memory` records in memory.
+
+    Behaves like the list of (file_path, new_name) tuples used by the CLI:
+    `append()` a tuple and iterate over tuples. Older records are spilled to a
+    temporary JSONL file and streamed back on iteration.
+    """
+
+    def __init__(self, max_in_memory: int = 10_000):
+        self.max_in_memory = max_in_memory
+        self._records: list[PlannedRename] = []
+        self._spill = None
+        self._spilled = 0
+
+    def append(self, item: tuple[str, str]) -> None:
+        file_path, new_name = item
+        self._records.append(PlannedRename(file_path, new_name))
+        if len(self._records) >= self.max_in_memory:
+            self.spill()
+
+    def spill(self) -> None:
+        """Move the in-memory records to the spill file."""
+        if not self._records:
+            return
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(
+                mode="w+", encoding="utf-8", prefix="onoma_plan_"
+            )
+        self._spill.seek(0, os.SEEK_END)
+        for record in self._records:
+            self._spill.write(json.dumps([record.path, record.new_name]) + "\n")
+        self._spilled += len(self._records)
+        self._records = []
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._records)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self):
+        if self._spill is not None:
+            self._spill.flush()
+            self._spill.seek(0)
+            for line in self._spill:
+                file_path, new_name = json.loads(line)
+                yield file_path, new_name
+        for record in list(self._records):
+            yield record.path, record.new_name
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+def read_plan(plan_path: str):
+    """
+    Yield plan records from a JSONL plan file.
+
+    Raises:
+        ValueError: If a line is not a valid plan record
+    """
+    with open(plan_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as err:
+                raise ValueError(f"{plan_path}:{line_no}: invalid JSON: {err}") from err
+            if "path" not in record or not record.get("suggestions"):
+                raise ValueError(f"{plan_path}:{line_no}: missing path or suggestions")
+            yield record
+
+
+def fingerprint_matches(file_path: str, expected: dict, verify_hash: bool = True):
+    """
+    Check a file against a recorded fingerprint.
+
+    The size must always match. With `verify_hash` the SHA-256 must match too;
+    otherwise the modification time is compared instead (cheap, same host only).
+    """
+    if not expected:
+        return True
+    actual = file_fingerprint(file_path, with_hash=False)
+    if actual["size"] != expected.get("size"):
+        return False
+    if verify_hash and "sha256" in expected:
+        return file_fingerprint(file_path)["sha256"] == expected["sha256"]
+    return actual["mtime_ns"] == expected.get("mtime_ns")
+
+
+def apply_plan(plan_path: str, dry_run: bool = False, verify_hash: bool = True):
+    """
+    Apply a plan file: verify fingerprints, resolve conflicts and rename.
+
+    Each directory is listed once; conflicts between plan entries and existing
+    files are resolved against that in-memory listing.
+
+    Returns:
+        Dict with counts for "renamed", "skipped" and "missing"
+    """
+    by_directory = defaultdict(list)
+    for record in read_plan(plan_path):
+        directory = os.path.dirname(record["path"]) or "."
+        by_directory[directory].append(record)
+
+    stats = {"renamed": 0, "skipped": 0, "missing": 0}
+    for directory, records in by_directory.items():
+        try:
+            existing = set(os.listdir(directory))
+        except FileNotFoundError:
+            print(f"[PLAN] Directory not found, skipping: {directory}")
+            stats["missing"] += len(records)
+            continue
+        for record in records:
+            file_path = record["path"]
+            basename = os.path.basename(file_path)
+            if basename not in existing:
+                print(f"[PLAN] File not found, skipping: {file_path}")
+                stats["missing"] += 1
+                continue
+            if not fingerprint_matches(
+                file_path, record.get("fingerprint"), verify_hash
+            ):
+                print(f"[PLAN] File changed since planning, skipping: {file_path}")
+                stats["skipped"] += 1
+                continue
+            suggestions = record["suggestions"]
+            choice = record.get("choice", 0)
+            if not isinstance(choice, int) or not 0 <= choice < len(suggestions):
+                choice = 0
+            base_new_name, _ = os.path.splitext(suggestions[choice])
+            _, ext = os.path.splitext(file_path)
+            existing.discard(basename)
+            final_name = resolve_conflict(base_new_name + ext, existing)
+            existing.add(final_name)
+            if dry_run:
+                print(f"{basename} --dry-run-> {final_name}")
+            else:
+                print(f"{basename} --> {final_name}")
+                shutil.move(file_path, os.path.join(directory, final_name))
+            stats["renamed"] += 1
+    return stats
@@ -7,6 +7,9 @@ from typing import Any
 import chardet
 from markitdown import MarkItDown
 
+from onomatool.budget import DeadlineExceeded, call_timeout
+from onomatool.profiling import span
+
 try:
     import fitz  # PyMuPDF
 except ImportError:
@@ -27,6 +30,18 @@ try:
 except ImportError:
     requests = None
 
+# Rendering settings for page and slide images
+PDF_DPI = 72
+SLIDE_DENSITY = 150
+SLIDE_MAX_HEIGHT = 1024
+SLIDE_JPEG_QUALITY = 80
+RENDER_SETTINGS = {
+    "pdf_dpi": PDF_DPI,
+    "slide_density": SLIDE_DENSITY,
+    "slide_max_height": SLIDE_MAX_HEIGHT,
+    "slide_jpeg_quality": SLIDE_JPEG_QUALITY,
+}
+
 
 class MarkitdownProcessor:
     """Unified processor for multiple formats using markitdown library with UTF-8 encoding support"""
@@ -65,7 +80,8 @@ class MarkitdownProcessor:
                 if not raw_data:
                     return "utf-8"
 
-                result = chardet.detect(raw_data)
+                with span("encoding_detection"):
+                    result = chardet.detect(raw_data)
                 encoding = result.get("encoding", "utf-8")
                 confidence = result.get("confidence", 0)
 
@@ -201,6 +217,8 @@ class MarkitdownProcessor:
         For PDFs, also generate images for each page.
         For PPTX, generate images for each slide. For SVG, render to PNG.
         Returns a dict with 'markdown', 'images', and 'tempdir' (if images are generated).
+        Raises DeadlineExceeded or subprocess.TimeoutExpired if a PPTX conversion
+        runs out of time; other failures return None.
         """
         utf8_file_path = None
         try:
@@ -211,7 +229,8 @@ class MarkitdownProcessor:
             # Try to process with MarkItDown
             result = None
             try:
-                result = self.md.convert(utf8_file_path)
+                with span("markitdown", ext=ext):
+                    result = self.md.convert(utf8_file_path)
             except Exception as conversion_error:
                 # Check if this is a Unicode-related error and if it's a text file
                 error_str = str(conversion_error)
@@ -279,12 +298,15 @@ class MarkitdownProcessor:
                 doc = fitz.open(
                     file_path
                 )  # Use original file for binary PDF processing
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    pix = page.get_pixmap()
-                    img_path = os.path.join(tempdir.name, f"page_{page_num + 1}.png")
-                    pix.save(img_path)
-                    images.append(img_path)
+                with span("pdf_rasterize", pages=len(doc)):
+                    for page_num in range(len(doc)):
+                        page = doc.load_page(page_num)
+                        pix = page.get_pixmap(dpi=PDF_DPI)
+                        img_path = os.path.join(
+                            tempdir.name, f"page_{page_num + 1}.png"
+                        )
+                        pix.save(img_path)
+                        images.append(img_path)
 
                 # Save markdown content to file in debug mode
                 if self.debug:
@@ -311,6 +333,9 @@ class MarkitdownProcessor:
                     # Step 1: Convert PPTX to PDF (use original file for binary processing)
                     basename = os.path.splitext(os.path.basename(file_path))[0]
                     pdf_path = os.path.join(tempdir.name, f"{basename}.pdf")
+                    # A timed-out conversion raises, so the run records the file
+                    # as failed instead of naming it without its slides
+                    subprocess_timeout = self.config.get("subprocess_timeout", 300.0)
                     soffice_cmd = [
                         "soffice",
                         "--headless",
@@ -320,9 +345,13 @@ class MarkitdownProcessor:
                         "--outdir",
                         tempdir.name,
                     ]
-                    soffice_result = subprocess.run(
-                        soffice_cmd, capture_output=True, text=True
-                    )
+                    with span("soffice"):
+                        soffice_result = subprocess.run(
+                            soffice_cmd,
+                            capture_output=True,
+                            text=True,
+                            timeout=call_timeout(subprocess_timeout),
+                        )
                     if soffice_result.returncode != 0 or not os.path.exists(pdf_path):
                         return None
                     # Step 2: Convert PDF to JPEGs
@@ -330,17 +359,21 @@ class MarkitdownProcessor:
                     convert_cmd = [
                         "convert",
                         "-adaptive-resize",
-                        "x1024",
+                        f"x{SLIDE_MAX_HEIGHT}",
                         "-density",
-                        "150",
+                        str(SLIDE_DENSITY),
                         pdf_path,
                         "-quality",
-                        "80",
+                        str(SLIDE_JPEG_QUALITY),
                         output_pattern,
                     ]
-                    convert_result = subprocess.run(
-                        convert_cmd, capture_output=True, text=True
-                    )
+                    with span("imagemagick"):
+                        convert_result = subprocess.run(
+                            convert_cmd,
+                            capture_output=True,
+                            text=True,
+                            timeout=call_timeout(subprocess_timeout),
+                        )
                     if convert_result.returncode != 0:
                         return None
                     # Step 3: Collect images
@@ -364,6 +397,8 @@ class MarkitdownProcessor:
                         "images": images,
                         "tempdir": tempdir,
                     }
+                except (DeadlineExceeded, subprocess.TimeoutExpired):
+                    raise
                 except Exception:
                     return None
             elif ext == ".svg":
@@ -399,6 +434,8 @@ class MarkitdownProcessor:
                     }
                 return result.text_content
 
+        except (DeadlineExceeded, subprocess.TimeoutExpired):
+            raise
         except UnicodeDecodeError:
             return None
         except Exception:
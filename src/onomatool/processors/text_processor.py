@@ -4,6 +4,8 @@ from pathlib import Path
 
 import chardet
 
+from onomatool.profiling import span
+
 
 class TextProcessor:
     """Processor for text files (.txt, .md, .note, etc.)"""
@@ -24,7 +26,8 @@ class TextProcessor:
         with open(file_path, "rb") as file:
             raw_data = file.read()
 
-        result = chardet.detect(raw_data)
+        with span("encoding_detection"):
+            result = chardet.detect(raw_data)
         encoding = result["encoding"]
         confidence = result["confidence"]
 
@@ -0,0 +1,169 @@
+"""
+Lightweight per-stage timing for `--profile`.
+
+Stages are wrapped in `span("stage", **tags)`. While profiling is disabled (the
+default) `span` returns a shared no-op context manager, so instrumented code pays
+only a function call. When enabled, every span is recorded with its start time,
+duration, thread and tags; the records can be summarized as a table or exported
+in Chrome trace format (chrome://tracing, Perfetto, speedscope).
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the LLM latency histogram buckets
+LLM_HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class _NullSpan:
+    """No-op span returned while profiling is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "tags", "start")
+
+    def __init__(self, profiler, name: str, tags: dict):
+        self.profiler = profiler
+        self.name = name
+        self.tags = tags
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self.start
+        if exc_type is not None:
+            self.tags["error"] = exc_type.__name__
+        self.profiler.records.append(
+            (self.name, self.start, duration, threading.get_ident(), self.tags)
+        )
+        return False
+
+
+class Profiler:
+    """Collects span records for one run."""
+
+    def __init__(self):
+        self.enabled = False
+        # (name, start_ns, duration_ns, thread_id, tags)
+        self.records: list[tuple] = []
+
+    def span(self, name: str, **tags):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, tags)
+
+    def reset(self) -> None:
+        self.records = []
+
+    def stage_stats(self) -> dict[str, dict]:
+        """Per-stage count, total, p50, p95 and max (seconds)."""
+        durations: dict[str, list[float]] = {}
+        for name, _, duration, _, _ in self.records:
+            durations.setdefault(name, []).append(duration / 1e9)
+        return {
+            name: {
+                "count": len(values),
+                "total": sum(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+            for name, values in durations.items()
+        }
+
+    def llm_histograms(self) -> dict[str, list[int]]:
+        """LLM latency bucket counts keyed by "provider/model"."""
+        histograms: dict[str, list[int]] = {}
+        for name, _, duration, _, tags in self.records:
+            if name != "llm":
+                continue
+            key = f"{tags.get('provider', '?')}/{tags.get('model', '?')}"
+            counts = histograms.setdefault(key, [0] * (len(LLM_HISTOGRAM_BUCKETS) + 1))
+            seconds = duration / 1e9
+            for i, bound in enumerate(LLM_HISTOGRAM_BUCKETS):
+                if seconds < bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return histograms
+
+    def format_summary(self) -> str:
+        """Render the stage table and LLM latency histograms as text."""
+        stats = self.stage_stats()
+        lines = [
+            f"{'stage':<22}{'count':>7}{'total s':>10}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'max ms':>10}"
+        ]
+        for name, s in sorted(stats.items(), key=lambda item: -item[1]["total"]):
+            lines.append(
+                f"{name:<22}{s['count']:>7}{s['total']:>10.3f}{s['p50'] * 1000:>10.1f}"
+                f"{s['p95'] * 1000:>10.1f}{s['max'] * 1000:>10.1f}"
+            )
+        histograms = self.llm_histograms()
+        if histograms:
+            labels = [f"<{b:g}s" for b in LLM_HISTOGRAM_BUCKETS]
+            labels.append(f">={LLM_HISTOGRAM_BUCKETS[-1]:g}s")
+            for key, counts in sorted(histograms.items()):
+                lines.append("")
+                lines.append(f"LLM latency {key}")
+                peak = max(counts) or 1
+                for label, count in zip(labels, counts, strict=True):
+                    bar = "#" * round(30 * count / peak)
+                    lines.append(f"  {label:>7} {count:>6} {bar}".rstrip())
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Write the records as a Chrome trace (JSON Trace Event Format)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": "onoma",
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": tid,
+                "args": {k: str(v) for k, v in tags.items()},
+            }
+            for name, start, duration, tid, tags in self.records
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+PROFILER = Profiler()
+
+
+def span(name: str, **tags):
+    """Time a stage on the global profiler (no-op while profiling is disabled)."""
+    if not PROFILER.enabled:
+        return _NULL_SPAN
+    return _Span(PROFILER, name, tags)
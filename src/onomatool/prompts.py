@@ -3,7 +3,7 @@ Prompt templates for OnomaTool LLM integration.
 These can be overridden via the .onomarc config file.
 """
 
-from onomatool.config import get_config
+from onomatool.config import Config, get_config
 
 
 def get_system_prompt(config=None) -> str:
@@ -26,6 +26,70 @@ def get_image_prompt(naming_convention: str, config=None) -> str:
     return template.format(naming_convention=naming_convention)
 
 
+# Per-request placeholder of each prompt kind; everything before it is static
+_CONTENT_PLACEHOLDERS = {"text": "{content}", "image": None, "batch": "{files}"}
+
+
+def _prompt_template(kind: str, config) -> str:
+    if kind == "image":
+        return config.get("image_prompt") or DEFAULT_IMAGE_PROMPT
+    if kind == "batch":
+        return config.get("batch_prompt") or DEFAULT_BATCH_PROMPT
+    return config.get("user_prompt") or DEFAULT_USER_PROMPT
+
+
+def get_prompt_parts(naming_convention: str, config=None, kind: str = "text"):
+    """
+    Split the prompt for a request kind into a static prefix and a suffix.
+
+    The prefix is the system prompt followed by the template's instructions up
+    to its content placeholder, with the naming convention filled in. It holds
+    nothing file-specific, so every request of a kind starts with the same
+    bytes and provider prefix caching applies. The suffix is the template text
+    after the placeholder and goes after the per-file content.
+
+    Args:
+        naming_convention: The naming convention string (e.g., "snake_case")
+        config: The configuration dictionary (if None, loads default config)
+        kind: "text", "image" or "batch"
+
+    Returns:
+        Tuple of (prefix, suffix)
+    """
+    if config is None:
+        config = get_config()
+    if isinstance(config, Config):
+        # Split and formatted once per config, not once per request
+        return config.cached(
+            ("prompt_parts", kind, naming_convention),
+            lambda: _build_prompt_parts(naming_convention, config, kind),
+        )
+    return _build_prompt_parts(naming_convention, config, kind)
+
+
+def _build_prompt_parts(naming_convention: str, config, kind: str):
+    template = _prompt_template(kind, config)
+    placeholder = _CONTENT_PLACEHOLDERS[kind]
+    instructions, suffix = template, ""
+    if placeholder and placeholder in template:
+        instructions, _, suffix = template.partition(placeholder)
+    parts = [
+        get_system_prompt(config),
+        instructions.format(naming_convention=naming_convention).strip(),
+    ]
+    if "{naming_convention}" not in template:
+        parts.append(f"Naming convention: {naming_convention}")
+    prefix = "\n\n".join(part for part in parts if part)
+    return prefix, suffix.format(naming_convention=naming_convention)
+
+
+def format_batch_files(files: list[tuple[str, str]]) -> str:
+    """Wrap (id, content) pairs in id tags for a batch request."""
+    return "\n".join(
+        f'<file id="{file_id}">\n{content}\n</file>' for file_id, content in files
+    )
+
+
 DEFAULT_SYSTEM_PROMPT = (
     "You are a file naming suggestion assistant who avoids using numbers in file names."
 )
@@ -87,3 +151,17 @@ DEFAULT_IMAGE_PROMPT = (
     "naming convention, generate 3 appropriate file name suggestions that capture both the visual content and "
     "any identifiable context."
 )
+
+DEFAULT_BATCH_PROMPT = (
+    "You are an expert file naming assistant. Your task is to suggest 3 file names for EACH "
+    "of the files below, following the {naming_convention} naming convention. Every file is "
+    'wrapped in <file id="..."> tags. Return one entry per file with its id and exactly 3 '
+    "suggestions, as specified in the JSON schema. Name each file only from its own content; "
+    "consider the who, what, when, where, why, and how of the content and its purpose. A good "
+    "file name should be concise, descriptive, easy to understand and be between five and ten "
+    "words in length.\n\n"
+    "IMPORTANT: DO NOT INCLUDE Numbers in the file name UNLESS absolutely critical to identify "
+    "the content. When including numbers (dates, times, IDs), keep digit sequences reasonable, "
+    "such as '20250101' or 'v123'.\n\n"
+    "FILES:\n{files}"
+)
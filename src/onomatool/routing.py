@@ -0,0 +1,105 @@
+"""
+Tiered model routing.
+
+`.onomarc` can list models from cheapest to most capable:
+
+    [[model_tiers]]
+    model = "qwen2.5:7b-instruct"
+    openai_base_url = "http://localhost:11434/v1"
+
+    [[model_tiers]]
+    model = "gpt-4o"
+
+Each tier may override any top-level setting (provider, base URL, API key,
+Azure settings). `get_suggestions` starts at the first tier and escalates to the
+next one when the call fails, the suggestions do not validate against the naming
+convention, or they are generic ("document_file_one"). Files whose extension is
+listed in `hard_file_types`, and documents rendered to several page images,
+start at the last tier.
+"""
+
+import os
+
+from onomatool.config import Config
+from onomatool.naming import name_words
+
+# Words that carry no information about a file's content
+GENERIC_WORDS = frozenset(
+    """
+    a an and the of for file files document documents doc docs text content data
+    image images picture photo untitled new copy final draft misc miscellaneous
+    unknown untitled page pages scan scanned item items untitled sample example
+    test temp tmp one two three four five first second third version v
+    """.split()
+)
+
+# A name needs at least this many non-generic words to count as specific
+MIN_SPECIFIC_WORDS = 2
+
+
+def is_generic_name(name: str) -> bool:
+    """Whether a suggested name says nothing specific about the content."""
+    specific = [
+        word
+        for word in name_words(name)
+        if word not in GENERIC_WORDS and not word.isdigit()
+    ]
+    return len(specific) < MIN_SPECIFIC_WORDS
+
+
+def _build_tiers(config) -> list[tuple[str, str, object]]:
+    tiers = []
+    for index, tier in enumerate(config.get("model_tiers") or ()):
+        if not hasattr(tier, "get") or not tier.get("model"):
+            raise ValueError(f"model_tiers[{index}] needs a 'model'")
+        settings = {key: value for key, value in tier.items() if key != "model"}
+        settings["llm_model"] = tier["model"]
+        if isinstance(config, Config):
+            tier_config = config.override(**settings)
+        else:
+            tier_config = {**config, **settings}
+        tiers.append(
+            (
+                tier_config.get("default_provider", "openai"),
+                tier["model"],
+                tier_config,
+            )
+        )
+    if not tiers:
+        provider = config.get("default_provider", "openai")
+        if provider == "google":
+            model = config.get("google_model", "gemini-2.5-flash")
+        else:
+            model = config.get("llm_model", "gpt-4o")
+        tiers.append((provider, model, config))
+    return tiers
+
+
+def model_tiers(config) -> list[tuple[str, str, object]]:
+    """
+    The (provider, model, tier_config) tiers for a config, cheapest first.
+
+    Without `model_tiers` there is a single tier from `default_provider` and
+    `llm_model` (`google_model` for the google provider). Tier configs are built once per Config.
+
+    Raises:
+        ValueError: If a tier has no model
+    """
+    if isinstance(config, Config):
+        return config.cached("model_tiers", lambda: _build_tiers(config))
+    return _build_tiers(config)
+
+
+def is_hard_file(file_path: str | None, config, page_images: int = 0) -> bool:
+    """
+    Whether a file should skip the cheap tiers.
+
+    True for extensions listed in `hard_file_types` and for documents rendered to
+    more than one page image (multi-page vision).
+    """
+    if page_images > 1:
+        return True
+    if not file_path:
+        return False
+    hard_types = {ext.lower() for ext in config.get("hard_file_types") or ()}
+    return os.path.splitext(file_path)[1].lower() in hard_types
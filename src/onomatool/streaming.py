@@ -0,0 +1,64 @@
+"""
+Incremental parsing of streamed suggestion responses.
+
+A run that is not interactive and writes no plan only ever uses the first
+suggestion. With `stream_suggestions` enabled such requests are streamed and
+the JSON is parsed as tokens arrive; as soon as the first suggestion is
+complete and follows the naming convention the stream is closed, so the server
+stops generating tokens nobody will read.
+"""
+
+import json
+import re
+
+_SUGGESTIONS_KEY = re.compile(r'"suggestions"\s*:\s*\[')
+_WHITESPACE = " \t\r\n,"
+
+
+class SuggestionStreamParser:
+    """
+    Extract the strings of the `suggestions` array from partial JSON.
+
+    Feed the response text in arbitrary pieces; each completed suggestion is
+    returned by the `feed()` call that completed it.
+    """
+
+    def __init__(self):
+        self.suggestions: list[str] = []
+        self.done = False
+        self._buffer = ""
+        # Position just after the array's "[" once the key has been seen
+        self._pos: int | None = None
+
+    def feed(self, text: str) -> list[str]:
+        """Add response text and return the suggestions it completed."""
+        if self.done or not text:
+            return []
+        self._buffer += text
+        if self._pos is None:
+            match = _SUGGESTIONS_KEY.search(self._buffer)
+            if match is None:
+                return []
+            self._pos = match.end()
+        completed = []
+        buffer = self._buffer
+        while True:
+            pos = self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self.done = True
+                break
+            if buffer[pos] != '"':
+                raise ValueError(f"Unexpected {buffer[pos]!r} in suggestions array")
+            try:
+                suggestion, end = json.decoder.scanstring(buffer, pos + 1)
+            except json.JSONDecodeError:
+                # The string is not complete yet
+                break
+            completed.append(suggestion)
+            self._pos = end
+        self.suggestions.extend(completed)
+        return completed
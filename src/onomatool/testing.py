@@ -0,0 +1,631 @@
+"""
+Local OpenAI-compatible stub server for benchmarks and load tests.
+
+The server runs on localhost. It implements `POST /v1/chat/completions` and
+`GET /v1/models`, plus Gemini's `POST /v1beta/models/MODEL:generateContent`
+(pass `server.root_url` as `google_base_url`). It answers with deterministic
+filename suggestions in whichever naming convention the request's JSON schema
+asks for, per file id for batch schemas. Both
+`client.beta.chat.completions.parse()` and plain JSON-schema requests work,
+with text or image content parts. It can simulate:
+
+- latency: a fixed delay, a named distribution ("lognormal:0.4,0.3") or a
+  scripted sequence of delays
+- faults: random or scripted HTTP 429 (with `Retry-After`) and 5xx responses
+- token usage, including `cached_tokens` from a simulated prefix cache
+- generation time: `token_latency` seconds per completion token, streamed as
+  server-sent events for `stream=True` requests (closed streams are counted in
+  `cancelled_streams`)
+
+    with StubServer(latency="lognormal:0.2,0.5", rate_limit_rate=0.05) as server:
+        config = config.override(openai_base_url=server.url)
+
+It can also run standalone for CI jobs: `python -m onomatool.testing --port 8000`.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from onomatool.naming import join_words
+
+# Vocabulary used to build deterministic suggestions from the request hash
+STUB_WORDS = (
+    "annual",
+    "project",
+    "meeting",
+    "budget",
+    "summary",
+    "invoice",
+    "research",
+    "draft",
+    "design",
+    "review",
+    "client",
+    "report",
+    "photo",
+    "diagram",
+    "notes",
+    "proposal",
+    "schedule",
+    "contract",
+    "analysis",
+    "archive",
+)
+
+# Pydantic model titles (see onomatool.models) mapped to naming conventions
+_SCHEMA_CONVENTIONS = {
+    "SnakeCaseFilenameSuggestions": "snake_case",
+    "CamelCaseFilenameSuggestions": "camelCase",
+    "KebabCaseFilenameSuggestions": "kebab-case",
+    "PascalCaseFilenameSuggestions": "PascalCase",
+    "DotNotationFilenameSuggestions": "dot.notation",
+    "NaturalLanguageFilenameSuggestions": "natural language",
+}
+
+
+def render_stub_name(words: list[str], naming_convention: str) -> str:
+    """Join lowercase words in the given naming convention."""
+    return join_words(words, naming_convention) or "_".join(words)
+
+
+# File ids in batch prompts (see onomatool.prompts.format_batch_files)
+_BATCH_FILE_ID = re.compile(r'<file id="([^"]+)">')
+
+
+def _response_schema(request_body: dict) -> dict:
+    response_format = request_body.get("response_format") or {}
+    return response_format.get("json_schema") or {}
+
+
+def stub_suggestions(
+    request_body: dict, count: int = 3, words_per_name: int = 5, salt: str = ""
+) -> list[str]:
+    """Build deterministic suggestions for a chat completion request body."""
+    naming_convention = "snake_case"
+    json_schema = _response_schema(request_body)
+    for key in (json_schema.get("schema", {}).get("title"), json_schema.get("name")):
+        key = (key or "").removeprefix("Batch")
+        if key in _SCHEMA_CONVENTIONS:
+            naming_convention = _SCHEMA_CONVENTIONS[key]
+            break
+    seed = hashlib.sha256(
+        json.dumps(request_body.get("messages", []), sort_keys=True).encode("utf-8")
+        + salt.encode("utf-8")
+    ).digest()
+    suggestions = []
+    for i in range(count):
+        words = [
+            STUB_WORDS[seed[(i * words_per_name + j) % len(seed)] % len(STUB_WORDS)]
+            for j in range(words_per_name)
+        ]
+        words.append(("one", "two", "three", "four", "five")[i % 5])
+        suggestions.append(render_stub_name(words, naming_convention))
+    return suggestions
+
+
+def stub_content(request_body: dict) -> dict:
+    """Build the response JSON object: suggestions, or per-file items for batches."""
+    schema = _response_schema(request_body).get("schema", {})
+    if "files" not in schema.get("properties", {}):
+        return {"suggestions": stub_suggestions(request_body)}
+    text, _ = message_text(request_body.get("messages", []))
+    return {
+        "files": [
+            {"id": file_id, "suggestions": stub_suggestions(request_body, salt=file_id)}
+            for file_id in _BATCH_FILE_ID.findall(text)
+        ]
+    }
+
+
+def message_text(messages: list) -> tuple[str, int]:
+    """Concatenate the text of all messages and count image parts."""
+    chunks = []
+    images = 0
+    for message in messages:
+        chunks.append(f"<{message.get('role', '')}>")
+        content = message.get("content", "")
+        if isinstance(content, str):
+            chunks.append(content)
+            continue
+        for part in content or []:
+            if part.get("type") == "text":
+                chunks.append(part.get("text", ""))
+            elif part.get("type") in ("image_url", "input_image"):
+                images += 1
+    return "".join(chunks), images
+
+
+def estimate_prompt_tokens(messages: list) -> int:
+    """Rough prompt token estimate (4 characters per token, 85 per image)."""
+    text, images = message_text(messages)
+    return len(text) // 4 + images * 85
+
+
+def make_latency_sampler(
+    latency: float | str | Sequence[float] | Callable[[random.Random], float],
+    jitter: float = 0.0,
+) -> Callable[[random.Random], float]:
+    """
+    Build a function returning one response delay (seconds) per call.
+
+    Args:
+        latency: One of
+            - a number: mean delay, with gaussian `jitter` as std deviation
+            - "fixed:D", "uniform:LO,HI", "normal:MEAN,STD",
+              "lognormal:MEDIAN,SIGMA" or "exponential:MEAN"
+            - a sequence of delays, replayed in order and cycled
+            - a callable taking a random.Random and returning a delay
+        jitter: Std deviation used with a numeric latency
+    """
+    if callable(latency):
+        return latency
+    if isinstance(latency, (int, float)):
+        if not jitter:
+            return lambda rng: float(latency)
+        return lambda rng: rng.gauss(latency, jitter)
+    if isinstance(latency, str):
+        kind, _, params = latency.partition(":")
+        values = [float(v) for v in params.split(",") if v.strip()]
+        kind = kind.strip().lower()
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if kind == "normal" and len(values) == 2:
+            return lambda rng: rng.gauss(values[0], values[1])
+        if kind == "lognormal" and len(values) == 2:
+            return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+        if kind == "exponential" and len(values) == 1:
+            return lambda rng: rng.expovariate(1 / values[0]) if values[0] else 0.0
+        raise ValueError(f"Unsupported latency distribution: {latency}")
+    delays = list(latency)
+    if not delays:
+        raise ValueError("Scripted latency sequence is empty")
+    counter = itertools.count()
+    return lambda rng: delays[next(counter) % len(delays)]
+
+
+class PrefixCache:
+    """
+    Simulate provider-side prompt caching.
+
+    Prompts are split into blocks of `block_tokens`; a request is credited with
+    the longest block-aligned prefix seen in an earlier request, provided it is at
+    least `min_tokens` long (OpenAI caches prefixes of 1024+ tokens in 128-token
+    increments).
+    """
+
+    def __init__(self, min_tokens: int = 1024, block_tokens: int = 128):
+        self.min_tokens = min_tokens
+        self.block_chars = block_tokens * 4
+        self._seen: set[bytes] = set()
+        self._lock = threading.Lock()
+
+    def lookup_and_store(self, text: str) -> int:
+        """Return cached tokens for this prompt text and remember its prefixes."""
+        digest = hashlib.sha256()
+        cached_chars = 0
+        prefixes = []
+        for start in range(0, len(text) - self.block_chars + 1, self.block_chars):
+            digest.update(text[start : start + self.block_chars].encode("utf-8"))
+            prefixes.append(digest.copy().digest())
+        with self._lock:
+            for i, prefix in enumerate(prefixes):
+                if prefix not in self._seen:
+                    break
+                cached_chars = (i + 1) * self.block_chars
+            self._seen.update(prefixes)
+        cached_tokens = cached_chars // 4
+        return cached_tokens if cached_tokens >= self.min_tokens else 0
+
+
+_GEMINI_PATH = re.compile(r"/models/([^/:]+):generateContent")
+
+
+def gemini_to_chat(body: dict, model: str) -> dict:
+    """
+    Translate a Gemini generateContent body into a chat completion body, so
+    both APIs share the stub's suggestion logic.
+    """
+
+    def parts_to_content(parts: list) -> list[dict]:
+        content = []
+        for part in parts:
+            if "text" in part:
+                content.append({"type": "text", "text": part["text"]})
+            elif "inlineData" in part:
+                data = part["inlineData"]
+                url = f"data:{data.get('mimeType')};base64,{data.get('data')}"
+                content.append({"type": "image_url", "image_url": {"url": url}})
+        return content
+
+    messages = []
+    system = body.get("systemInstruction")
+    if system:
+        text = "".join(part.get("text", "") for part in system["parts"])
+        messages.append({"role": "system", "content": text})
+    for turn in body.get("contents", []):
+        messages.append(
+            {
+                "role": turn.get("role", "user"),
+                "content": parts_to_content(turn["parts"]),
+            }
+        )
+    generation = body.get("generationConfig", {})
+    schema = generation.get("responseSchema") or generation.get("responseJsonSchema")
+    return {
+        "model": model,
+        "messages": messages,
+        "max_tokens": generation.get("maxOutputTokens"),
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": (schema or {}).get("title"),
+                "schema": schema or {},
+            },
+        },
+    }
+
+
+def chat_to_gemini(completion: dict) -> dict:
+    """Translate a chat completion payload into a Gemini response."""
+    usage = completion["usage"]
+    return {
+        "candidates": [
+            {
+                "content": {
+                    "role": "model",
+                    "parts": [{"text": completion["choices"][0]["message"]["content"]}],
+                },
+                "finishReason": "STOP",
+                "index": 0,
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": usage["prompt_tokens"],
+            "candidatesTokenCount": usage["completion_tokens"],
+            "cachedContentTokenCount": usage["prompt_tokens_details"]["cached_tokens"],
+            "totalTokenCount": usage["total_tokens"],
+        },
+        "modelVersion": completion["model"],
+    }
+
+
+def stream_chunks(completion: dict, include_usage: bool = False):
+    """
+    Split a chat completion into streaming chunks of about one token each.
+
+    The usage chunk (with empty `choices`) comes last, as in the OpenAI API.
+    """
+    content = completion["choices"][0]["message"]["content"]
+    base = {
+        "id": completion["id"],
+        "object": "chat.completion.chunk",
+        "created": completion["created"],
+        "model": completion["model"],
+    }
+    for start in range(0, len(content), 4):
+        yield base | {
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"content": content[start : start + 4]},
+                    "finish_reason": None,
+                }
+            ]
+        }
+    yield base | {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if include_usage:
+        yield base | {"choices": [], "usage": completion["usage"]}
+
+
+class StubServer:
+    """Threaded OpenAI-compatible stub server on 127.0.0.1."""
+
+    def __init__(
+        self,
+        latency: float | str | Sequence[float] | Callable = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        faults: Sequence[int] | None = None,
+        error_status: int = 500,
+        prefix_cache: bool = True,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int | None = None,
+        keep_requests: int = 100,
+        token_latency: float = 0.0,
+    ):
+        """
+        Args:
+            latency: Response delay model (see make_latency_sampler)
+            jitter: Std deviation of the delay when latency is a number
+            error_rate: Probability (0-1) of answering with `error_status`
+            rate_limit_rate: Probability (0-1) of answering with HTTP 429
+            retry_after: Seconds sent in the `Retry-After` header of 429/503
+            faults: Scripted status codes for the first requests, in order
+                (200 means a normal answer); random faults apply afterwards
+            error_status: Status code used for random errors (500, 502, 503...)
+            prefix_cache: Report `cached_tokens` from a simulated prefix cache
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            seed: Seed for the latency/error random generator
+            keep_requests: Number of recent request bodies kept in `requests`
+            token_latency: Generation time per completion token in seconds
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.error_status = error_status
+        self.token_latency = token_latency
+        self._sample_latency = make_latency_sampler(latency, jitter)
+        self._faults = deque(faults or ())
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.prefix_cache = PrefixCache() if prefix_cache else None
+        self.request_count = 0
+        self.error_count = 0
+        self.rate_limited_count = 0
+        self.image_part_count = 0
+        self.cancelled_streams = 0
+        self.status_counts: dict[int, int] = {}
+        self.requests: deque = deque(maxlen=keep_requests)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def root_url(self) -> str:
+        """Base URL to use as `google_base_url`."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as `openai_base_url`."""
+        return f"{self.root_url}/v1"
+
+    def _next_delay_and_status(self) -> tuple[float, int]:
+        with self._lock:
+            self.request_count += 1
+            delay = self._sample_latency(self._random)
+            if self._faults:
+                status = self._faults.popleft()
+            elif self._random.random() < self.rate_limit_rate:
+                status = 429
+            elif self._random.random() < self.error_rate:
+                status = self.error_status
+            else:
+                status = 200
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status == 429:
+                self.rate_limited_count += 1
+            elif status >= 400:
+                self.error_count += 1
+        return max(delay, 0.0), status
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(
+                self, status: int, payload: dict, headers: dict | None = None
+            ) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(
+                        200,
+                        {
+                            "object": "list",
+                            "data": [{"id": "stub-model", "object": "model"}],
+                        },
+                    )
+                    return
+                self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request_body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "invalid JSON"}})
+                    return
+                gemini = _GEMINI_PATH.search(self.path)
+                if gemini:
+                    request_body = gemini_to_chat(request_body, gemini.group(1))
+                elif not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                server.requests.append(request_body)
+                delay, status = server._next_delay_and_status()
+                time.sleep(delay)
+                if status == 429:
+                    self._send_json(
+                        429,
+                        {
+                            "error": {
+                                "message": "Rate limit reached (injected)",
+                                "type": "rate_limit_exceeded",
+                            }
+                        },
+                        {"Retry-After": f"{server.retry_after:g}"},
+                    )
+                    return
+                if status >= 400:
+                    headers = {}
+                    if status == 503:
+                        headers["Retry-After"] = f"{server.retry_after:g}"
+                    self._send_json(
+                        status,
+                        {"error": {"message": "injected error", "type": "stub"}},
+                        headers,
+                    )
+                    return
+                completion = server.completion(request_body)
+                if gemini:
+                    self._send_json(200, chat_to_gemini(completion))
+                    return
+                if request_body.get("stream"):
+                    self._send_stream(completion, request_body)
+                    return
+                time.sleep(
+                    completion["usage"]["completion_tokens"] * server.token_latency
+                )
+                self._send_json(200, completion)
+
+            def _send_stream(self, completion: dict, request_body: dict) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for chunk in stream_chunks(
+                        completion,
+                        (request_body.get("stream_options") or {}).get(
+                            "include_usage", False
+                        ),
+                    ):
+                        if chunk["choices"]:
+                            time.sleep(server.token_latency)
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.cancelled_streams += 1
+
+        return Handler
+
+    def completion(self, request_body: dict) -> dict:
+        """Build the chat completion payload for a request body."""
+        messages = request_body.get("messages", [])
+        content = json.dumps(stub_content(request_body))
+        text, images = message_text(messages)
+        with self._lock:
+            self.image_part_count += images
+        prompt_tokens = len(text) // 4 + images * 85
+        cached_tokens = (
+            self.prefix_cache.lookup_and_store(text) if self.prefix_cache else 0
+        )
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-stub-{self.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request_body.get("model", "stub-model"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": content,
+                        "refusal": None,
+                    },
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="onoma-stub-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(args=None) -> int:
+    """Run the stub server in the foreground until interrupted."""
+    parser = argparse.ArgumentParser(
+        prog="python -m onomatool.testing",
+        description="Local OpenAI-compatible stub server for load testing",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--latency",
+        default="0",
+        help="Delay in seconds or a distribution such as 'lognormal:0.4,0.3'",
+    )
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(args)
+    try:
+        latency = float(args.latency)
+    except ValueError:
+        latency = args.latency
+    server = StubServer(
+        latency=latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        host=args.host,
+        port=args.port,
+        seed=args.seed,
+    )
+    print(f"Stub server listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,288 @@
+"""
+Token and cost accounting for LLM calls.
+
+Every provider response's usage data is recorded in the global `LEDGER` with the
+file it was made for, the call kind (text or image), provider and model. The
+ledger keeps running totals per extension, kind and model (and, when per-call
+records are kept, per file), and estimates cost from a price table (USD per
+million tokens) that can be extended or overridden with the `[pricing]` table
+in .onomarc:
+
+    [pricing."gpt-4o"]
+    input = 2.50
+    cached_input = 1.25
+    output = 10.00
+"""
+
+import json
+import os
+from contextlib import contextmanager
+
+# USD per 1M tokens; models are matched by longest prefix
+DEFAULT_PRICING = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gemini-2.0-flash": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gemini-2.5-flash": {"input": 0.30, "cached_input": 0.075, "output": 2.50},
+    "gemini-2.5-pro": {"input": 1.25, "cached_input": 0.31, "output": 10.00},
+}
+
+_COUNTERS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens")
+
+
+def get_pricing(config: dict | None = None) -> dict:
+    """Merge the default price table with the `pricing` table from config."""
+    pricing = {model: dict(prices) for model, prices in DEFAULT_PRICING.items()}
+    for model, prices in ((config or {}).get("pricing") or {}).items():
+        pricing.setdefault(model, {}).update(prices)
+    return pricing
+
+
+def price_for_model(model: str, pricing: dict) -> dict | None:
+    """Find the price entry for a model by exact match, then longest prefix."""
+    if model in pricing:
+        return pricing[model]
+    matches = [name for name in pricing if model.startswith(name)]
+    if not matches:
+        return None
+    return pricing[max(matches, key=len)]
+
+
+def estimate_cost(
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    cached_tokens: int,
+    pricing: dict,
+) -> float | None:
+    """Estimated USD cost of one call, or None if the model has no price."""
+    prices = price_for_model(model, pricing)
+    if prices is None:
+        return None
+    input_price = prices.get("input", 0.0)
+    cached_price = prices.get("cached_input", input_price)
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (
+        uncached * input_price
+        + cached_tokens * cached_price
+        + completion_tokens * prices.get("output", 0.0)
+    ) / 1_000_000
+
+
+def usage_from_response(response) -> tuple[int, int, int]:
+    """
+    Extract (prompt, completion, cached) token counts from a provider response.
+
+    Handles OpenAI chat completions (`usage.prompt_tokens_details.cached_tokens`)
+    and Gemini responses (`usage_metadata`). Missing fields count as zero.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        return (
+            getattr(usage, "prompt_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0,
+            getattr(details, "cached_tokens", 0) or 0,
+        )
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata is not None:
+        return (
+            getattr(metadata, "prompt_token_count", 0) or 0,
+            getattr(metadata, "candidates_token_count", 0) or 0,
+            getattr(metadata, "cached_content_token_count", 0) or 0,
+        )
+    return 0, 0, 0
+
+
+class UsageLedger:
+    """
+    Records token usage for every LLM call in a run.
+
+    Running totals per extension, call kind and model are kept for the whole
+    run. Per-call records, needed for the per-file breakdown and the call list
+    of the usage report, are kept only when `keep_records` is set (when
+    profiling, recording or writing a usage report).
+    """
+
+    def __init__(self, keep_records: bool = False):
+        self.keep_records = keep_records
+        self.records: list[dict] = []
+        # Counters keyed by (ext, kind, model)
+        self._groups: dict[tuple[str, str, str], dict] = {}
+        self._captures: list[list[dict]] = []
+        # Source file being processed; page images and rendered PNGs are
+        # attributed to it rather than to their temporary paths
+        self.current_file: str | None = None
+
+    def reset(self) -> None:
+        self.records = []
+        self._groups = {}
+        self.current_file = None
+
+    @property
+    def calls(self) -> int:
+        """Number of calls recorded since the last reset."""
+        return sum(group["calls"] for group in self._groups.values())
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        kind: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_tokens: int = 0,
+        file_path: str | None = None,
+    ) -> dict:
+        """Record one call and return the record."""
+        source = self.current_file or file_path or ""
+        record = {
+            "file": source,
+            "ext": os.path.splitext(source)[1].lower(),
+            "kind": kind,
+            "provider": provider,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+        }
+        group = self._groups.get((record["ext"], kind, model))
+        if group is None:
+            group = self._groups[(record["ext"], kind, model)] = dict.fromkeys(
+                _COUNTERS, 0
+            )
+        group["calls"] += 1
+        for counter in _COUNTERS[1:]:
+            group[counter] += record[counter]
+        if self.keep_records:
+            self.records.append(record)
+        for captured in self._captures:
+            captured.append(record)
+        return record
+
+    @contextmanager
+    def capture(self):
+        """Collect the records of the calls made inside the block."""
+        captured: list[dict] = []
+        self._captures.append(captured)
+        try:
+            yield captured
+        finally:
+            self._captures.remove(captured)
+
+    def record_response(
+        self, response, provider: str, model: str, kind: str, file_path=None
+    ) -> dict:
+        """Record the usage reported on a provider response."""
+        prompt, completion, cached = usage_from_response(response)
+        return self.record(provider, model, kind, prompt, completion, cached, file_path)
+
+    def _grouped(self, key: str):
+        """(group name, model, counters) for the running totals or the records."""
+        if key == "file":
+            # Only per-call records know the file
+            for record in self.records:
+                yield record["file"], record["model"], record | {"calls": 1}
+            return
+        index = ("ext", "kind", "model").index(key)
+        for group_key, counters in self._groups.items():
+            yield group_key[index], group_key[2], counters
+
+    def aggregate(self, key: str, pricing: dict | None = None) -> dict[str, dict]:
+        """
+        Sum the counters (and estimated cost) grouped by "ext", "kind",
+        "model" or (with `keep_records`) "file".
+        """
+        groups: dict[str, dict] = {}
+        for name, model, counters in self._grouped(key):
+            group = groups.setdefault(
+                name or "(none)", dict.fromkeys(_COUNTERS, 0) | {"cost": 0.0}
+            )
+            for counter in _COUNTERS:
+                group[counter] += counters[counter]
+            if pricing is not None:
+                group["cost"] += self.counters_cost(model, counters, pricing) or 0.0
+        return groups
+
+    def totals(self, pricing: dict | None = None) -> dict:
+        """Run totals, including the cache hit rate and estimated cost."""
+        totals = dict.fromkeys(_COUNTERS, 0) | {"cost": 0.0, "unpriced_calls": 0}
+        for (_, _, model), counters in self._groups.items():
+            for counter in _COUNTERS:
+                totals[counter] += counters[counter]
+            if pricing is not None:
+                cost = self.counters_cost(model, counters, pricing)
+                if cost is None:
+                    totals["unpriced_calls"] += counters["calls"]
+                else:
+                    totals["cost"] += cost
+        prompt = totals["prompt_tokens"]
+        totals["cache_hit_rate"] = totals["cached_tokens"] / prompt if prompt else 0.0
+        return totals
+
+    @staticmethod
+    def counters_cost(model: str, counters: dict, pricing: dict) -> float | None:
+        """Estimated cost of a record or of summed counters for one model."""
+        return estimate_cost(
+            model,
+            counters["prompt_tokens"],
+            counters["completion_tokens"],
+            counters["cached_tokens"],
+            pricing,
+        )
+
+    @classmethod
+    def record_cost(cls, record: dict, pricing: dict) -> float | None:
+        return cls.counters_cost(record["model"], record, pricing)
+
+    def format_summary(self, pricing: dict) -> str:
+        """Render run totals and a per-extension breakdown as text."""
+        totals = self.totals(pricing)
+        lines = [
+            f"Token usage: {totals['calls']} calls, "
+            f"{totals['prompt_tokens']} prompt ({totals['cached_tokens']} cached, "
+            f"{totals['cache_hit_rate']:.0%}), "
+            f"{totals['completion_tokens']} completion, "
+            f"est. cost ${totals['cost']:.4f}"
+        ]
+        if totals["unpriced_calls"]:
+            lines[0] += f" ({totals['unpriced_calls']} calls without a price)"
+        by_ext = self.aggregate("ext", pricing)
+        if len(by_ext) > 1 or totals["calls"] > 1:
+            lines.append(
+                f"{'ext':<10}{'calls':>7}{'prompt':>10}{'cached':>10}"
+                f"{'output':>9}{'cost $':>10}"
+            )
+            for ext, group in sorted(by_ext.items(), key=lambda item: -item[1]["cost"]):
+                lines.append(
+                    f"{ext:<10}{group['calls']:>7}{group['prompt_tokens']:>10}"
+                    f"{group['cached_tokens']:>10}{group['completion_tokens']:>9}"
+                    f"{group['cost']:>10.4f}"
+                )
+        return "\n".join(lines)
+
+    def write_report(self, path: str, pricing: dict) -> None:
+        """
+        Write per-extension/model/kind aggregates as JSON, plus the calls and
+        per-file aggregates when `keep_records` is set.
+        """
+        report = {
+            "totals": self.totals(pricing),
+            "by_extension": self.aggregate("ext", pricing),
+            "by_model": self.aggregate("model", pricing),
+            "by_kind": self.aggregate("kind", pricing),
+        }
+        if self.keep_records:
+            report["by_file"] = self.aggregate("file", pricing)
+            report["calls"] = [
+                record | {"cost": self.record_cost(record, pricing)}
+                for record in self.records
+            ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+LEDGER = UsageLedger()
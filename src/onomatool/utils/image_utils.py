@@ -3,6 +3,9 @@ import os
 
 from PIL import Image as PILImage
 
+# Longest side of PNGs rendered from SVGs
+SVG_MAX_SIDE = 1024
+
 
 def convert_svg_to_png(svg_path: str, tempdir: str) -> str:
     """
@@ -20,16 +23,19 @@ def convert_svg_to_png(svg_path: str, tempdir: str) -> str:
         svg_data = f.read()
     # Render to PNG bytes (max 1024px side, aspect ratio preserved)
     png_bytes = cairosvg.svg2png(
-        bytestring=svg_data, output_width=1024, output_height=1024, scale=1.0
+        bytestring=svg_data,
+        output_width=SVG_MAX_SIDE,
+        output_height=SVG_MAX_SIDE,
+        scale=1.0,
     )
     img = PILImage.open(io.BytesIO(png_bytes))
     w, h = img.size
     if w > h:
-        new_w = 1024
-        new_h = int(h * (1024 / w))
+        new_w = SVG_MAX_SIDE
+        new_h = int(h * (SVG_MAX_SIDE / w))
     else:
-        new_h = 1024
-        new_w = int(w * (1024 / h))
+        new_h = SVG_MAX_SIDE
+        new_w = int(w * (SVG_MAX_SIDE / h))
     img = img.resize((new_w, new_h), PILImage.LANCZOS)
     png_path = os.path.join(tempdir, "rendered.png")
     img.save(png_path)
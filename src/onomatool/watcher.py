@@ -0,0 +1,229 @@
+"""
+Directory watching for `onomatool --watch`.
+
+New or moved-in files are detected with inotify on Linux, or by polling the
+directory everywhere else. Files are only handed over once they are quiescent:
+no events (or size/mtime changes) for `settle` seconds and, when inotify is
+available, closed for writing. Files that become ready together are delivered
+as one batch so bursts from scanners are processed back to back.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+# inotify event masks (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Files that are created but never report IN_CLOSE_WRITE (e.g. writers that keep
+# the handle open) are released after this many settle periods of inactivity.
+UNCLOSED_SETTLE_FACTOR = 10
+
+
+class _PendingFile:
+    """Debounce state for a single file that has not been processed yet."""
+
+    __slots__ = ("last_event", "closed", "stat")
+
+    def __init__(self, now: float, closed: bool = False):
+        self.last_event = now
+        self.closed = closed
+        self.stat = None
+
+
+class PollingSource:
+    """Detect new files by listing the directory at a fixed interval."""
+
+    def __init__(self, directory: str, interval: float = 1.0):
+        self.directory = directory
+        self.interval = interval
+        self.known = set(self._list())
+
+    def _list(self) -> list[str]:
+        try:
+            return [
+                entry.path
+                for entry in os.scandir(self.directory)
+                if entry.is_file(follow_symlinks=False)
+            ]
+        except FileNotFoundError:
+            return []
+
+    def read(self, timeout: float) -> list[tuple[str, bool]]:
+        """Return (path, closed) pairs for files that appeared since the last call."""
+        time.sleep(min(timeout, self.interval))
+        current = set(self._list())
+        new = current - self.known
+        self.known = current
+        # Polling cannot see close() calls; quiescence is judged on stat alone
+        return [(path, False) for path in sorted(new)]
+
+    def close(self) -> None:
+        pass
+
+
+class InotifySource:
+    """Detect new files with Linux inotify via libc (no extra dependency)."""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.directory = directory
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {directory}")
+
+    def read(self, timeout: float) -> list[tuple[str, bool]]:
+        """Return (path, closed) pairs for file events within the timeout."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if not name or mask & IN_ISDIR:
+                continue
+            path = os.path.join(self.directory, os.fsdecode(name))
+            closed = bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))
+            events.append((path, closed))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def open_source(directory: str, use_inotify: bool | None = None, interval=1.0):
+    """
+    Open the best available event source for a directory.
+
+    Args:
+        directory: Directory to watch (not recursive)
+        use_inotify: True to require inotify, False to force polling,
+            None to use inotify when available
+        interval: Polling interval in seconds
+
+    Returns:
+        An InotifySource or PollingSource
+    """
+    if use_inotify is not False and sys.platform.startswith("linux"):
+        try:
+            return InotifySource(directory)
+        except (OSError, AttributeError):
+            if use_inotify:
+                raise
+    return PollingSource(directory, interval=interval)
+
+
+class Debouncer:
+    """Track pending files and release them once they are quiescent."""
+
+    def __init__(self, settle: float = 2.0, require_close: bool = True):
+        self.settle = settle
+        self.require_close = require_close
+        self.pending: dict[str, _PendingFile] = {}
+
+    def touch(self, path: str, closed: bool, now: float) -> None:
+        """Record an event for a path."""
+        entry = self.pending.get(path)
+        if entry is None:
+            self.pending[path] = _PendingFile(now, closed)
+            return
+        entry.last_event = now
+        entry.closed = entry.closed or closed
+
+    def ready(self, now: float) -> list[str]:
+        """Pop and return every pending path that is ready to be processed."""
+        released = []
+        for path, entry in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                # Temporary file that was removed or moved away again
+                del self.pending[path]
+                continue
+            snapshot = (st.st_size, st.st_mtime_ns)
+            if snapshot != entry.stat:
+                # Still being written; restart the settle window
+                if entry.stat is not None:
+                    entry.last_event = now
+                entry.stat = snapshot
+                continue
+            idle = now - entry.last_event
+            if idle < self.settle:
+                continue
+            if (
+                self.require_close
+                and not entry.closed
+                and idle < self.settle * UNCLOSED_SETTLE_FACTOR
+            ):
+                continue
+            del self.pending[path]
+            released.append(path)
+        return sorted(released)
+
+
+def watch_directory(
+    directory: str,
+    handle_batch: Callable[[list[str]], None],
+    settle: float = 2.0,
+    use_inotify: bool | None = None,
+    poll_interval: float = 1.0,
+    max_batch: int = 64,
+    stop_event: threading.Event | None = None,
+) -> None:
+    """
+    Watch a directory and call `handle_batch` with files that are ready.
+
+    Args:
+        directory: Directory to watch
+        handle_batch: Callback receiving a list of file paths
+        settle: Seconds a file must be quiescent before it is released
+        use_inotify: See `open_source`
+        poll_interval: Polling interval when inotify is not used
+        max_batch: Maximum number of files handed over in one batch
+        stop_event: Optional event that ends the watch loop when set
+    """
+    source = open_source(directory, use_inotify=use_inotify, interval=poll_interval)
+    debouncer = Debouncer(
+        settle=settle, require_close=isinstance(source, InotifySource)
+    )
+    tick = max(min(settle / 2, poll_interval), 0.01)
+    try:
+        while stop_event is None or not stop_event.is_set():
+            now = time.monotonic()
+            for path, closed in source.read(tick):
+                debouncer.touch(path, closed, now)
+            ready = debouncer.ready(time.monotonic())
+            for start in range(0, len(ready), max_batch):
+                handle_batch(ready[start : start + max_batch])
+    finally:
+        source.close()
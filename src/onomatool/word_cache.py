@@ -0,0 +1,117 @@
+"""
+Convention-neutral cache of LLM suggestions (`--word-cache`).
+
+The naming convention is part of every LLM request, so switching from
+`snake_case` to `kebab-case` used to mean asking the LLM again. With the word
+cache, each answer is stored as word lists (`["quarterly", "budget", "review"]`)
+under a key built from everything in the request except the convention: the
+provider and model, the prompt settings, and the file content or image. A
+later request for the same content in any built-in convention is rendered
+locally from the cached words (see `onomatool.naming.render_name`), with the
+`min_filename_words`, `max_filename_words` and digit limits applied.
+
+    [word_cache]
+    enabled = true
+    path = "~/.cache/onomatool/words.jsonl"
+"""
+
+import hashlib
+import json
+import os
+
+# Prompt settings that change what the LLM answers
+_PROMPT_KEYS = ("system_prompt", "user_prompt", "image_prompt")
+
+
+class WordCache:
+    """Word lists of earlier suggestions, keyed by convention-neutral request."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, list[list[str]]] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path: str) -> None:
+        """Load word lists persisted by an earlier run (later lines win)."""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    words = [list(map(str, w)) for w in record["words"]]
+                    self._entries[record["key"]] = words
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+
+    @staticmethod
+    def key(
+        config,
+        kind: str,
+        content: str,
+        image_url: str | None = None,
+        hard: bool = False,
+    ) -> str:
+        """Key of a request's content and settings, without the naming convention."""
+        material = json.dumps(
+            [
+                config.get("default_provider", "openai"),
+                config.get("llm_model", "gpt-4o"),
+                [config.get(key) or "" for key in _PROMPT_KEYS],
+                kind,
+                hard,
+                content,
+                hashlib.sha256((image_url or "").encode("ascii")).hexdigest(),
+            ]
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, min_suggestions: int = 1) -> list[list[str]] | None:
+        """
+        Cached word lists, or None.
+
+        Args:
+            key: Key from `key()`
+            min_suggestions: Skip entries with fewer word lists (a cut-off
+                streamed response cannot serve a request for all three)
+        """
+        words = self._entries.get(key)
+        if words is None or len(words) < min_suggestions:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return words
+
+    def put(self, key: str, words: list[list[str]]) -> None:
+        """Store word lists (and append them to the persisted cache)."""
+        words = [list(w) for w in words if w]
+        if not words:
+            return
+        self._entries[key] = words
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "words": words}) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_CACHES: dict[str | None, WordCache] = {}
+
+
+def get_word_cache(config) -> WordCache | None:
+    """The shared cache for a config's `word_cache` table, or None if disabled."""
+    settings = config.get("word_cache") or {}
+    if not settings.get("enabled", False):
+        return None
+    path = settings.get("path") or None
+    if path:
+        path = os.path.abspath(os.path.expanduser(path))
+    cache = _CACHES.get(path)
+    if cache is None:
+        cache = _CACHES[path] = WordCache(path)
+    return cache
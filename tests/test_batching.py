@@ -0,0 +1,191 @@
+import pytest
+import toml
+
+from onomatool import batching, cli, llm_integration
+from onomatool.batching import SuggestionBatcher
+from onomatool.budget import DEADLINE
+from onomatool.llm_integration import get_batch_suggestions
+from onomatool.models import get_batch_model_for_naming_convention
+from onomatool.testing import StubServer
+
+
+def _config(server_url="http://127.0.0.1:9"):
+    return {
+        "default_provider": "openai",
+        "openai_base_url": server_url,
+        "openai_api_key": "test",
+        "llm_model": "stub-model",
+        "naming_convention": "snake_case",
+    }
+
+
+def test_batch_names_every_file_in_one_request():
+    items = [(f"/notes/note_{i}.md", f"Note {i} about the budget") for i in range(5)]
+    with StubServer() as server:
+        results = get_batch_suggestions(items, config=_config(server.url))
+        assert server.request_count == 1
+    assert set(results) == {path for path, _ in items}
+    assert all(len(suggestions) == 3 for suggestions in results.values())
+    # Items are named individually, not copied from one another
+    assert len({tuple(s) for s in results.values()}) == 5
+
+
+def test_invalid_and_missing_items_are_retried_alone(monkeypatch):
+    batch_model = get_batch_model_for_naming_convention("snake_case")
+    calls = []
+
+    def fake_call_llm(request, config, verbose_level=0):
+        calls.append(request.kind)
+        if request.kind == "batch":
+            return batch_model(
+                files=[
+                    {"id": "1", "suggestions": ["good_one", "good_two", "good_three"]},
+                    # Near-miss names are repaired; this item has none usable
+                    {"id": "2", "suggestions": ["", "???", "!"]},
+                ]
+            )
+        return ["retry_one", "retry_two", "retry_three"]
+
+    monkeypatch.setattr(llm_integration, "call_llm", fake_call_llm)
+    results = get_batch_suggestions(
+        [("a.md", "alpha"), ("b.md", "beta"), ("c.md", "gamma")], config=_config()
+    )
+    assert calls == ["batch", "text", "text"]
+    assert results["a.md"] == ["good_one", "good_two", "good_three"]
+    assert (
+        results["b.md"] == results["c.md"] == ["retry_one", "retry_two", "retry_three"]
+    )
+
+
+def test_failed_retry_keeps_the_other_results(monkeypatch, capsys):
+    batch_model = get_batch_model_for_naming_convention("snake_case")
+
+    def fake_call_llm(request, config, verbose_level=0):
+        if request.kind == "batch":
+            good = ["good_one", "good_two", "good_three"]
+            return batch_model(files=[{"id": "1", "suggestions": good}])
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(llm_integration, "call_llm", fake_call_llm)
+    items = [("a.md", "alpha"), ("b.md", "beta")]
+    failed = {}
+    results = get_batch_suggestions(
+        items,
+        config=_config(),
+        handle_failure=lambda path, err: failed.update({path: str(err)}),
+    )
+    assert results == {"a.md": ["good_one", "good_two", "good_three"]}
+    assert failed == {"b.md": "boom"}
+    # Without a handler the failure is printed
+    assert get_batch_suggestions(items, config=_config()) == results
+    assert "[ERROR] b.md: boom" in capsys.readouterr().out
+
+    # The batcher names the good file and reports only the failed one
+    named, failed = {}, {}
+    batcher = SuggestionBatcher(
+        _config(),
+        1000,
+        lambda path, s: named.update({path: s}),
+        handle_failure=lambda path, err: failed.update({path: str(err)}),
+    )
+    for path, content in items:
+        batcher.add(path, content)
+    batcher.flush()
+    assert list(named) == ["a.md"] and failed == {"b.md": "boom"}
+    assert batcher.batches == 1
+
+    # Without a failure handler only the failed file stays queued
+    batcher.handle_failure = None
+    for path, content in items:
+        batcher.add(path, content)
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.flush()
+    assert "b.md" in batcher and len(batcher) == 1
+
+
+def test_batcher_packs_under_budget(monkeypatch):
+    batches = []
+
+    def fake_batch(items, verbose_level=0, config=None, handle_failure=None):
+        batches.append([path for path, _ in items])
+        return {path: [f"name_for_{path}"] for path, _ in items}
+
+    monkeypatch.setattr(batching, "get_batch_suggestions", fake_batch)
+    named = {}
+    batcher = SuggestionBatcher({}, 200, lambda path, s: named.update({path: s}))
+    # 38 estimated tokens each: five fit in the budget, the sixth starts a batch
+    paths = [f"note_{i}" for i in range(7)]
+    for path in paths:
+        assert batcher.add(path, "x" * 100)
+    assert not batcher.add("big", "x" * 1000)
+    batcher.flush()
+    assert batches == [paths[:5], paths[5:]]
+    assert set(named) == set(paths)
+
+    batches.clear()
+    batcher = SuggestionBatcher({}, 10_000, lambda path, s: None, max_files=3)
+    for path in paths:
+        batcher.add(path, "x" * 40)
+    batcher.flush()
+    assert [len(b) for b in batches] == [3, 3, 1]
+
+
+def test_cli_batch_tokens(tmp_path, capsys):
+    for i in range(6):
+        (tmp_path / f"note{i}.txt").write_text(f"Short note number {i} on hiring")
+    with StubServer() as server:
+        config_path = tmp_path / "onomarc.toml"
+        config_path.write_text(toml.dumps(_config(server.url)))
+        exit_code = cli.main(
+            [
+                str(tmp_path / "*.txt"),
+                "--config",
+                str(config_path),
+                "--dry-run",
+                "--batch-tokens",
+                "2000",
+            ]
+        )
+        assert server.request_count == 1
+    assert exit_code == 0
+    assert capsys.readouterr().out.count("--dry-run->") == 6
+
+
+def test_flush_ignores_file_deadline_and_reports_failures(monkeypatch):
+    seen = []
+
+    def fake_batch(items, verbose_level=0, config=None, handle_failure=None):
+        seen.append(DEADLINE.remaining())
+        if len(seen) > 1:
+            raise RuntimeError("service unavailable")
+        return {path: [f"name_for_{path}"] for path, _ in items}
+
+    monkeypatch.setattr(batching, "get_batch_suggestions", fake_batch)
+    named, failed = {}, {}
+    batcher = SuggestionBatcher(
+        {},
+        1000,
+        lambda path, s: named.update({path: s}),
+        max_files=2,
+        handle_failure=lambda path, err: failed.update({path: str(err)}),
+    )
+    DEADLINE.start("trigger.md", 0.001)
+    try:
+        batcher.add("a", "x")
+        batcher.add("trigger.md", "x")
+        # The flush ran without the triggering file's deadline, which is back
+        assert seen == [None]
+        assert DEADLINE.file_path == "trigger.md"
+    finally:
+        DEADLINE.clear()
+    batcher.add("b", "x")
+    batcher.add("c", "x")
+    assert set(named) == {"a", "trigger.md"}
+    assert failed == {"b": "service unavailable", "c": "service unavailable"}
+
+    # Without a failure handler the files stay queued
+    batcher.handle_failure = None
+    batcher.add("d", "x")
+    with pytest.raises(RuntimeError):
+        batcher.flush()
+    assert "d" in batcher and len(batcher) == 1
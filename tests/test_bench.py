@@ -0,0 +1,33 @@
+import os
+
+from onomatool import bench
+from onomatool.bench import generate_corpus, peak_rss_mb, percentile, run_benchmark
+
+
+def test_percentile():
+    values = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 95) == 1.0
+    assert percentile([], 50) == 0.0
+
+
+def test_peak_rss_without_resource(monkeypatch):
+    assert peak_rss_mb() > 0
+    monkeypatch.setattr(bench, "resource", None)
+    assert peak_rss_mb() == 0.0
+
+
+def test_generate_corpus(tmp_path):
+    paths = generate_corpus(str(tmp_path), 2, types=("text", "svg", "docx"))
+    assert len(paths) == 6
+    assert all(os.path.getsize(p) > 0 for p in paths)
+
+
+def test_run_benchmark_text(tmp_path):
+    report = run_benchmark(files_per_type=3, types=("text",), latency=0.0)
+    assert report["exit_code"] == 0
+    assert report["named"] == 3
+    assert report["llm_calls"] == 3
+    assert report["calls_per_file"] == 1.0
+    assert report["files_per_sec"] > 0
+    assert report["by_type"]["text"]["files"] == 3
@@ -0,0 +1,207 @@
+import json
+import subprocess
+import time
+
+import pytest
+import toml
+
+from onomatool import cli
+from onomatool.budget import (
+    DEADLINE,
+    DeadlineExceeded,
+    FileDeadline,
+    RunBudget,
+    RunSummary,
+)
+from onomatool.llm_integration import get_suggestions
+from onomatool.processors import markitdown_processor
+from onomatool.processors.markitdown_processor import MarkitdownProcessor
+from onomatool.testing import StubServer
+from onomatool.usage import LEDGER
+
+
+def test_file_deadline_caps_call_timeouts():
+    now = [100.0]
+    deadline = FileDeadline(clock=lambda: now[0])
+    assert deadline.timeout(60.0) == 60.0
+    deadline.start("a.pdf", 10)
+    assert deadline.timeout(60.0) == 10
+    now[0] += 8
+    assert deadline.timeout(60.0) == pytest.approx(2)
+    now[0] += 2
+    with pytest.raises(DeadlineExceeded, match="a.pdf"):
+        deadline.timeout(60.0)
+    deadline.clear()
+    assert deadline.timeout(None) is None
+
+
+def test_run_budget_limits():
+    LEDGER.reset()
+    now = [0.0]
+    budget = RunBudget(time_budget=30, clock=lambda: now[0])
+    assert budget.exhausted() is None
+    now[0] = 31
+    assert budget.exhausted() == "time budget of 30s reached"
+
+    budget = RunBudget(max_tokens_total=1000, max_cost=1.0, pricing={})
+    LEDGER.record("openai", "m", "text", 600, 50)
+    assert budget.exhausted() is None
+    LEDGER.record("openai", "m", "text", 300, 50)
+    assert budget.exhausted() == "token limit of 1000 reached"
+    LEDGER.reset()
+
+
+def test_llm_call_stops_at_file_deadline():
+    with StubServer(latency=2.0) as server:
+        config = {
+            "openai_api_key": "test",
+            "openai_base_url": server.url,
+            "llm_model": "stub-model",
+        }
+        DEADLINE.start("slow.md", 0.3)
+        start = time.perf_counter()
+        try:
+            with pytest.raises(DeadlineExceeded):
+                get_suggestions("Budget notes", config=config)
+        finally:
+            DEADLINE.clear()
+        assert time.perf_counter() - start < 2.0
+
+
+def test_token_limit_stops_run_and_resume_finishes(tmp_path, capsys, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(4):
+        (tmp_path / f"note_{i}.md").write_text(f"# Notes {i}\n\nBudget review {i}")
+    summary_path = tmp_path / "summary.json"
+    with StubServer() as server:
+        config_path = tmp_path / "onomarc.toml"
+        config_path.write_text(
+            toml.dumps(
+                {
+                    "openai_base_url": server.url,
+                    "openai_api_key": "test",
+                    "llm_model": "stub-model",
+                }
+            )
+        )
+        pattern = str(tmp_path / "*.md")
+        base_args = [pattern, "--config", str(config_path), "--dry-run"]
+        assert cli.main([*base_args, "--max-tokens-total", "1"]) == 0
+        assert server.request_count == 1
+        summary = json.loads((tmp_path / cli.DEFAULT_SUMMARY_PATH).read_text())
+        assert summary["stopped"] == "token limit of 1 reached"
+        assert len(summary["done"]) == 1 and len(summary["remaining"]) == 3
+
+        (tmp_path / cli.DEFAULT_SUMMARY_PATH).rename(summary_path)
+        args = [*base_args, "--resume", str(summary_path)]
+        assert cli.main(args) == 0
+        assert server.request_count == 4
+    summary = RunSummary.load(str(summary_path))
+    assert summary.done_count == 4
+    assert "[BUDGET] Stopped" in capsys.readouterr().out
+
+
+def test_rate_limits_retried_within_file_deadline():
+    with StubServer(faults=[429, 503, 200], retry_after=0.05) as server:
+        config = {
+            "openai_api_key": "test",
+            "openai_base_url": server.url,
+            "llm_model": "stub-model",
+        }
+        DEADLINE.start("busy.md", 10)
+        try:
+            assert get_suggestions("Budget notes", config=config)
+        finally:
+            DEADLINE.clear()
+        assert server.status_counts == {429: 1, 503: 1, 200: 1}
+
+
+def test_failed_llm_call_recorded_and_run_continues(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in range(2):
+        (tmp_path / f"note_{i}.md").write_text(f"# Notes {i}")
+    with StubServer(error_rate=1.0, error_status=400) as server:
+        config_path = tmp_path / "onomarc.toml"
+        config_path.write_text(
+            toml.dumps(
+                {
+                    "openai_base_url": server.url,
+                    "openai_api_key": "test",
+                    "llm_model": "stub-model",
+                    "file_deadline": 30,
+                }
+            )
+        )
+        args = [str(tmp_path / "*.md"), "--config", str(config_path), "--dry-run"]
+        assert cli.main([*args, "--summary", "run.json"]) == 0
+    summary = json.loads((tmp_path / "run.json").read_text())
+    assert [entry["path"] for entry in summary["failed"]] == [
+        str(tmp_path / "note_0.md"),
+        str(tmp_path / "note_1.md"),
+    ]
+    assert summary["done"] == []
+
+
+def test_pptx_conversion_timeouts_are_raised(tmp_path, monkeypatch):
+    deck = tmp_path / "deck.pptx"
+    deck.write_bytes(b"x")
+    processor = MarkitdownProcessor({})
+    monkeypatch.setattr(
+        processor.md, "convert", lambda path: type("R", (), {"text_content": "x"})
+    )
+
+    def slow_run(cmd, **kwargs):
+        raise subprocess.TimeoutExpired(cmd, kwargs["timeout"])
+
+    monkeypatch.setattr(markitdown_processor.subprocess, "run", slow_run)
+    with pytest.raises(subprocess.TimeoutExpired):
+        processor.process(str(deck))
+
+    DEADLINE.start(str(deck), 0.001)
+    try:
+        time.sleep(0.01)
+        with pytest.raises(DeadlineExceeded):
+            processor.process(str(deck))
+    finally:
+        DEADLINE.clear()
+
+
+def test_timed_out_extraction_recorded_as_failed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "deck.pptx").write_bytes(b"x")
+
+    def timed_out(self, path, **kwargs):
+        raise subprocess.TimeoutExpired(["soffice"], 1.0)
+
+    monkeypatch.setattr(MarkitdownProcessor, "process", timed_out)
+    config_path = tmp_path / "onomarc.toml"
+    config_path.write_text(toml.dumps({"default_provider": "mock"}))
+    args = [str(tmp_path / "*.pptx"), "--config", str(config_path), "--dry-run"]
+    assert cli.main([*args, "--summary", "run.json"]) == 0
+    summary = json.loads((tmp_path / "run.json").read_text())
+    assert [entry["path"] for entry in summary["failed"]] == [
+        str(tmp_path / "deck.pptx")
+    ]
+
+
+def test_run_summary_streams_done_entries(tmp_path):
+    summary = RunSummary()
+    summary.add_done("/in/a.md", "budget_notes.md")
+    summary.add_done("/in/b.md", None)
+    summary.add_failed("/in/c.md", RuntimeError("boom"))
+    summary.add_remaining("/in/d.md")
+    path = str(tmp_path / "run.json")
+    summary.write(path)
+    summary.close()
+    data = json.loads(open(path, encoding="utf-8").read())
+    assert data["done"] == [
+        {"path": "/in/a.md", "name": "budget_notes.md"},
+        {"path": "/in/b.md", "name": None},
+    ]
+    assert data["failed"] == [{"path": "/in/c.md", "error": "boom"}]
+    assert data["remaining"] == ["/in/d.md"]
+    assert summary.remaining_count == 1
+
+    loaded = RunSummary.load(path)
+    assert loaded.done_count == 2
+    assert loaded.done_paths() == {"/in/a.md", "/in/budget_notes.md", "/in/b.md"}
@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+from onomatool.cassette import get_cassette, normalize_request, request_key
+from onomatool.llm_integration import _CLIENT_CACHE, LLMRequest, get_suggestions
+from onomatool.testing import StubServer
+from onomatool.usage import LEDGER
+
+
+def _config(server_url, **extra):
+    return {
+        "default_provider": "openai",
+        "openai_base_url": server_url,
+        "openai_api_key": "test",
+        "llm_model": "stub-model",
+        "naming_convention": "snake_case",
+    } | extra
+
+
+def test_image_data_is_hashed_in_key():
+    def request(data):
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "name this"},
+                    {"type": "image_url", "image_url": {"url": data}},
+                ],
+            }
+        ]
+        return normalize_request(
+            LLMRequest("openai", "m", "snake_case", messages, kind="image"), 100
+        )
+
+    first = request("data:image/png;base64,AAAA")
+    assert "AAAA" not in str(first)
+    assert request_key(first) == request_key(request("data:image/png;base64,AAAA"))
+    assert request_key(first) != request_key(request("data:image/png;base64,BBBB"))
+
+
+def test_record_then_replay_without_server(tmp_path):
+    cassette_dir = str(tmp_path / "cassette")
+    LEDGER.reset()
+    with StubServer(latency=0.2) as server:
+        recorded = get_suggestions(
+            "Quarterly budget notes",
+            config=_config(server.url, record_dir=cassette_dir),
+        )
+        assert server.request_count >= 1
+    _CLIENT_CACHE.clear()
+    recorded_usage = LEDGER.totals()
+    assert get_cassette(cassette_dir).recorded == 1
+    assert len(os.listdir(cassette_dir)) == 1
+
+    # The server is gone: the replay must come entirely from the cassette
+    LEDGER.reset()
+    start = time.perf_counter()
+    replayed = get_suggestions(
+        "Quarterly budget notes",
+        config=_config(
+            "http://127.0.0.1:9", replay_dir=cassette_dir, replay_timing="fast"
+        ),
+    )
+    assert time.perf_counter() - start < 0.2
+    assert replayed == recorded
+    assert LEDGER.totals()["prompt_tokens"] == recorded_usage["prompt_tokens"]
+
+    start = time.perf_counter()
+    get_suggestions(
+        "Quarterly budget notes",
+        config=_config("http://127.0.0.1:9", replay_dir=cassette_dir),
+    )
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_replay_miss_raises(tmp_path):
+    with pytest.raises(RuntimeError, match="No cassette entry"):
+        get_suggestions(
+            "never recorded",
+            config=_config(
+                "http://127.0.0.1:9", replay_dir=str(tmp_path), replay_timing="fast"
+            ),
+        )
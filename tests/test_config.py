@@ -1,8 +1,10 @@
 import os
 
+import pytest
 import toml
 
-from onomatool.config import DEFAULT_CONFIG, get_config
+from onomatool.config import DEFAULT_CONFIG, Config, get_config
+from onomatool.prompts import get_prompt_parts
 
 
 def test_get_config_default(monkeypatch):
@@ -27,3 +29,41 @@ def test_get_config_error(monkeypatch, tmp_path):
     monkeypatch.setattr("toml.load", lambda f: (_ for _ in ()).throw(Exception("fail")))
     # Should fallback to DEFAULT_CONFIG
     assert get_config(str(config_path)) == DEFAULT_CONFIG
+
+
+def test_config_is_merged_frozen_and_shared(tmp_path):
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(toml.dumps({"llm_model": "m", "markitdown": {"x": 1}}))
+    config = get_config(str(config_path))
+    assert get_config(str(config_path)) is config
+    assert config["naming_convention"] == DEFAULT_CONFIG["naming_convention"]
+    assert config["markitdown"]["enable_plugins"] is False
+    assert config["markitdown"]["x"] == 1
+    with pytest.raises(TypeError):
+        config["llm_model"] = "other"
+    with pytest.raises(TypeError):
+        config["markitdown"]["x"] = 2
+
+
+def test_config_override():
+    config = Config({"llm_model": "base"})
+    changed = config.override(llm_model="other", markitdown={"enable_plugins": True})
+    assert changed["llm_model"] == "other"
+    assert changed["markitdown"]["docintel_endpoint"] == ""
+    assert config["llm_model"] == "base"
+    assert changed.to_dict()["markitdown"]["enable_plugins"] is True
+
+
+def test_config_validation():
+    with pytest.raises(ValueError, match="min_filename_words must be int"):
+        Config({"min_filename_words": "five"})
+    with pytest.raises(ValueError, match="between 1 and max_filename_words"):
+        Config({"min_filename_words": 9, "max_filename_words": 3})
+
+
+def test_prompt_parts_are_memoized():
+    config = Config({"user_prompt": "Name: {content}"})
+    first = get_prompt_parts("snake_case", config)
+    assert get_prompt_parts("snake_case", config) is first
+    overridden = config.override(user_prompt="Other: {content}")
+    assert "Other:" in get_prompt_parts("snake_case", overridden)[0]
@@ -0,0 +1,73 @@
+from onomatool.distill import distill, distill_for_config
+from onomatool.testing import STUB_WORDS
+
+_FILLER = " ".join(STUB_WORDS * 5)
+
+
+def _long_markdown() -> str:
+    sections = [
+        f"## Section {i}\n\n" + "\n\n".join([_FILLER] * 10) for i in range(1, 11)
+    ]
+    return (
+        "---\ntitle: Fleet maintenance handbook\nauthor: Ops team\n---\n"
+        "# Fleet Maintenance Handbook\n\n"
+        "Author: Jane Ops\nDate: 2024-03-01\n\n"
+        "This handbook covers the servicing schedule of the delivery fleet.\n\n"
+        + "\n\n".join(sections)
+    )
+
+
+def test_short_content_unchanged():
+    assert distill("# Notes\n\nshort", max_tokens=100) == "# Notes\n\nshort"
+    markdown = _long_markdown()
+    config = {"distill": {"enabled": False}}
+    assert distill_for_config(markdown, None, config) == markdown
+
+
+def test_markdown_digest_keeps_naming_signal():
+    markdown = _long_markdown()
+    digest = distill(markdown, "handbook.md", max_tokens=500)
+    assert len(digest) <= 2000 < len(markdown) / 20
+    assert "title: Fleet maintenance handbook" in digest
+    assert "Title:\nFleet Maintenance Handbook" in digest
+    assert "Author: Jane Ops" in digest
+    assert "  Section 1\n  Section 2" in digest
+    assert "servicing schedule of the delivery fleet" in digest
+
+
+def test_html_digest_uses_title_and_meta():
+    page = (
+        "<!DOCTYPE html><html><head><title>Acme &amp; Co Pricing</title>"
+        '<meta name="description" content="Plans and prices for Acme cloud">'
+        '<meta property="og:site_name" content="Acme">'
+        "<script>var tracking = 1;</script></head><body>"
+        "<h1>Pricing</h1><p>Choose the plan that fits your team.</p>"
+        + f"<p>{_FILLER}</p>" * 40
+        + "</body></html>"
+    )
+    digest = distill(page, "index.html", max_tokens=300)
+    assert "Title:\nAcme & Co Pricing" in digest
+    assert "description: Plans and prices for Acme cloud" in digest
+    assert "og:site_name: Acme" in digest
+    assert "tracking" not in digest
+    assert "Choose the plan that fits your team." in digest
+
+
+def test_code_bundle_digest_keeps_tree_and_readme():
+    files = ["src/app.py", "src/db.py", "tests/test_app.py", "README.md"]
+    bundle = (
+        "This file is a merged representation of the entire codebase.\n\n"
+        "# Directory Structure\n```\n" + "\n".join(files) + "\n```\n\n# Files\n\n"
+    )
+    for path in files:
+        body = (
+            "# Ledgerly\n\nA double-entry bookkeeping API."
+            if path == "README.md"
+            else _FILLER * 20
+        )
+        bundle += f"## File: {path}\n```\n{body}\n```\n\n"
+    digest = distill(bundle, "bundle.md", max_tokens=400)
+    assert "codebase bundle" in digest
+    assert "File tree:\nsrc/app.py\nsrc/db.py\ntests/test_app.py\nREADME.md" in digest
+    assert "A double-entry bookkeeping API." in digest
+    assert len(digest) < len(bundle) / 5
@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import openai
+import pytest
+
+from onomatool.endpoints import Endpoint, EndpointPool, is_endpoint_error
+from onomatool.llm_integration import get_suggestions
+from onomatool.testing import StubServer
+
+
+def _connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://x"))
+
+
+def test_weighted_least_outstanding_selection():
+    a, b = Endpoint("http://a", weight=2), Endpoint("http://b")
+    pool = EndpointPool([a, b])
+    assert [pool.select().url for _ in range(3)] == ["http://a", "http://a", "http://b"]
+    assert (a.outstanding, b.outstanding) == (2, 1)
+
+
+def test_ejection_and_readmission():
+    now = [0.0]
+    a, b = Endpoint("http://a"), Endpoint("http://b")
+    pool = EndpointPool([a, b], max_failures=2, eject_seconds=10, clock=lambda: now[0])
+    for _ in range(2):
+        pool.release(pool.select(exclude={b}), _connection_error(), 0.1)
+    assert a.ejections == 1
+    assert {pool.select().url for _ in range(3)} == {"http://b"}
+    # Errors about the request itself do not count against the endpoint
+    assert not is_endpoint_error(ValueError("bad schema"))
+
+    now[0] = 11.0
+    for endpoint in (a, b):
+        endpoint.outstanding = 0
+    trial = pool.select()
+    assert trial is a
+    pool.release(trial, None, 0.1)
+    assert a.consecutive_failures == 0 and a.ejected_until <= now[0]
+
+
+def test_failed_call_is_retried_on_another_endpoint():
+    pool = EndpointPool([Endpoint("http://a"), Endpoint("http://b")])
+
+    def call(endpoint):
+        if endpoint.url == "http://a":
+            raise _connection_error()
+        return endpoint.url
+
+    assert pool.call(call) == "http://b"
+    with pytest.raises(ValueError):
+        pool.call(lambda endpoint: (_ for _ in ()).throw(ValueError("bad")))
+
+
+def test_hedged_request_wins_over_slow_replica():
+    slow, fast = Endpoint("http://slow"), Endpoint("http://fast")
+    pool = EndpointPool([slow, fast], hedge=True)
+    slow.latencies.extend([0.01] * 20)
+
+    def call(endpoint):
+        if endpoint is slow:
+            time.sleep(1.0)
+        return endpoint.url
+
+    start = time.perf_counter()
+    assert pool.call(call) == "http://fast"
+    assert time.perf_counter() - start < 0.5
+    assert (pool.hedged, pool.hedge_wins) == (1, 1)
+
+
+def test_get_suggestions_spreads_over_replicas():
+    # Sequential calls all fit on the first replica; concurrent ones spread out
+    with StubServer(latency=0.2) as a, StubServer(latency=0.2) as b:
+        config = {
+            "openai_api_key": "test",
+            "llm_model": "stub-model",
+            "openai_endpoints": [{"url": a.url}, {"url": b.url, "weight": 1.0}],
+        }
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(
+                executor.map(
+                    lambda i: get_suggestions(f"Budget notes {i}", config=config),
+                    range(4),
+                )
+            )
+        assert a.request_count > 0 and b.request_count > 0
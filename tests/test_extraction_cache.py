@@ -0,0 +1,109 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from onomatool.bench import _write_pdf
+from onomatool.extraction_cache import ExtractionCache
+from onomatool.file_dispatcher import FileDispatcher
+
+
+def _config(tmp_path, **settings):
+    return {
+        "extraction_cache": {
+            "enabled": True,
+            "path": str(tmp_path / "cache"),
+            **settings,
+        }
+    }
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("extraction should have come from the cache")
+
+
+def test_pdf_extraction_restored_from_cache(tmp_path, monkeypatch):
+    pdf_path = str(tmp_path / "report.pdf")
+    _write_pdf(pdf_path, 2)
+    dispatcher = FileDispatcher(_config(tmp_path))
+    # The PDF text converter is an optional MarkItDown extra
+    monkeypatch.setattr(
+        dispatcher.markitdown_processor.md,
+        "convert",
+        lambda path: SimpleNamespace(text_content="# Report 2\n\nQuarterly notes"),
+    )
+    first = dispatcher.process(pdf_path)
+    assert first["images"]
+    pages = [open(p, "rb").read() for p in first["images"]]
+    first["tempdir"].cleanup()
+
+    # A later run (e.g., with a new prompt) skips MarkItDown and PyMuPDF
+    dispatcher = FileDispatcher(_config(tmp_path))
+    monkeypatch.setattr(dispatcher.markitdown_processor, "process", _fail)
+    cached = dispatcher.process(pdf_path)
+    assert cached["markdown"] == first["markdown"]
+    assert [os.path.basename(p) for p in cached["images"]] == [
+        os.path.basename(p) for p in first["images"]
+    ]
+    assert [open(p, "rb").read() for p in cached["images"]] == pages
+    cached["tempdir"].cleanup()
+    assert (dispatcher.extraction_cache.hits, dispatcher.extraction_cache.misses) == (
+        1,
+        0,
+    )
+
+    # Different content or settings miss
+    cache = dispatcher.extraction_cache
+    key = cache.key(pdf_path, {"dpi": 72})
+    assert cache.key(pdf_path, {"dpi": 150}) != key
+    _write_pdf(pdf_path, 3)
+    assert cache.key(pdf_path, {"dpi": 72}) != key
+
+
+def test_svg_render_cached(tmp_path, monkeypatch):
+    svg_path = tmp_path / "diagram.svg"
+    svg_path.write_text("<svg xmlns='http://www.w3.org/2000/svg'/>")
+
+    def render(path, tempdir):
+        png_path = os.path.join(tempdir, "rendered.png")
+        Image.new("RGB", (8, 8), "red").save(png_path)
+        return png_path
+
+    monkeypatch.setattr("onomatool.file_dispatcher.convert_svg_to_png", render)
+    out_dir = tmp_path / "first"
+    out_dir.mkdir()
+    FileDispatcher(_config(tmp_path)).render_svg(str(svg_path), str(out_dir))
+
+    monkeypatch.setattr("onomatool.file_dispatcher.convert_svg_to_png", _fail)
+    out_dir = tmp_path / "second"
+    out_dir.mkdir()
+    png_path = FileDispatcher(_config(tmp_path)).render_svg(str(svg_path), str(out_dir))
+    assert png_path == str(out_dir / "rendered.png")
+    assert Image.open(png_path).size == (8, 8)
+
+
+def test_least_recently_used_entries_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=10**6)
+    blob = os.urandom(900).hex()
+    for i in range(3):
+        cache.put(f"{i:040x}", blob)
+        os.utime(cache._entry_path(f"{i:040x}"), (i, i))
+    # Room for three entries, not four
+    cache.max_bytes = int(cache.size * 1.2)
+    # Reading an entry makes it recent again
+    assert cache.get(f"{0:040x}") == blob
+    cache.put(f"{3:040x}", blob)
+    assert cache.size <= cache.max_bytes
+    assert cache.get(f"{1:040x}") is None
+    assert cache.get(f"{0:040x}") == blob
+    assert cache.get(f"{3:040x}") == blob
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_text_files_bypass_cache(tmp_path, enabled):
+    note = tmp_path / "note.md"
+    note.write_text("# Note\n\nhello")
+    dispatcher = FileDispatcher(_config(tmp_path, enabled=enabled) if enabled else {})
+    assert dispatcher.process(str(note)).startswith("# Note")
+    assert not (tmp_path / "cache").exists()
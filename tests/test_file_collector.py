@@ -1,6 +1,6 @@
 import os
 
-from onomatool.file_collector import collect_files
+from onomatool.file_collector import collect_files, iter_files
 
 
 def test_collect_files_basic(tmp_path):
@@ -23,3 +23,10 @@ def test_collect_files_recursive(tmp_path):
 def test_collect_files_no_match(tmp_path):
     files = collect_files(str(tmp_path / "*.nomatch"))
     assert files == []
+
+
+def test_iter_files_is_lazy(tmp_path):
+    (tmp_path / "a.txt").write_text("1")
+    files = iter_files(str(tmp_path / "*.txt"))
+    assert not isinstance(files, list)
+    assert [os.path.basename(f) for f in files] == ["a.txt"]
@@ -0,0 +1,61 @@
+from PIL import Image
+
+from onomatool.llm_integration import (
+    _CLIENT_CACHE,
+    get_batch_suggestions,
+    get_suggestions,
+)
+from onomatool.models import get_model_for_naming_convention
+from onomatool.testing import StubServer
+from onomatool.usage import LEDGER
+
+
+def _config(server, **settings):
+    return {
+        "default_provider": "google",
+        "google_api_key": "test",
+        "google_base_url": server.root_url,
+    } | settings
+
+
+def test_structured_output_with_configured_model():
+    LEDGER.reset()
+    with StubServer() as server:
+        config = _config(server, naming_convention="kebab-case")
+        suggestions = get_suggestions("Quarterly budget review", config=config)
+        client = _CLIENT_CACHE[("genai", "test", server.root_url)]
+        get_suggestions("Another budget review", config=config)
+        # One client per API key and base URL, reused across calls
+        assert _CLIENT_CACHE[("genai", "test", server.root_url)] is client
+        request = server.requests[-1]
+    get_model_for_naming_convention("kebab-case")(suggestions=suggestions)
+    assert request["model"] == "gemini-2.5-flash"
+    assert request["messages"][0]["role"] == "system"
+    assert (
+        request["response_format"]["json_schema"]["name"]
+        == "KebabCaseFilenameSuggestions"
+    )
+    by_model = LEDGER.aggregate("model")
+    assert list(by_model) == ["gemini-2.5-flash"]
+    assert by_model["gemini-2.5-flash"]["calls"] == 2
+    assert by_model["gemini-2.5-flash"]["prompt_tokens"] > 0
+    LEDGER.reset()
+
+
+def test_image_is_sent_as_inline_part(tmp_path):
+    image_path = tmp_path / "photo.png"
+    Image.new("RGB", (32, 32), color=(200, 20, 20)).save(image_path)
+    with StubServer() as server:
+        config = _config(server, google_model="gemini-2.5-pro")
+        suggestions = get_suggestions("", file_path=str(image_path), config=config)
+        assert server.image_part_count == 1
+        assert server.requests[-1]["model"] == "gemini-2.5-pro"
+    assert len(suggestions) == 3
+
+
+def test_batch_uses_a_single_request():
+    with StubServer() as server:
+        items = [(f"note_{i}.md", f"Meeting notes {i}") for i in range(3)]
+        results = get_batch_suggestions(items, config=_config(server))
+        assert server.request_count == 1
+    assert set(results) == {path for path, _ in items}
@@ -0,0 +1,79 @@
+import random
+
+from PIL import Image, ImageDraw
+
+from onomatool.image_hashes import BKTree, ImageHashCache, hamming, image_hash
+from onomatool.llm_integration import get_suggestions
+from onomatool.testing import StubServer
+
+
+def _photo(path, seed: int, size=(640, 480), fmt="PNG") -> str:
+    rng = random.Random(seed)
+    img = Image.new("RGB", (640, 480), (rng.randrange(256), 90, 160))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(600), rng.randrange(440)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse(
+            (x, y, x + rng.randrange(40, 200), y + rng.randrange(40, 200)), color
+        )
+    img.resize(size).save(path, format=fmt)
+    return str(path)
+
+
+def test_resized_copy_hashes_close(tmp_path):
+    original = _photo(tmp_path / "a.png", 1)
+    resized = _photo(tmp_path / "b.jpg", 1, size=(320, 240), fmt="JPEG")
+    other = _photo(tmp_path / "c.png", 2)
+    for algorithm in ("phash", "dhash"):
+        first = image_hash(original, algorithm)
+        assert hamming(first, image_hash(resized, algorithm)) <= 4
+        assert hamming(first, image_hash(other, algorithm)) > 10
+    assert image_hash(str(tmp_path / "missing.png")) is None
+
+
+def test_bk_tree_search_matches_linear_scan():
+    rng = random.Random(0)
+    keys = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for key in keys:
+        tree.add(key, key)
+    query = keys[7] ^ 0b1011
+    found = tree.search(query, 12)
+    expected = sorted((hamming(query, k), k) for k in keys if hamming(query, k) <= 12)
+    assert found == expected
+    assert found[0] == (3, keys[7])
+    assert len(tree) == 500
+
+
+def test_near_identical_image_skips_vision_call(tmp_path):
+    original = _photo(tmp_path / "burst_1.png", 1)
+    copy = _photo(tmp_path / "burst_2.jpg", 1, size=(600, 450), fmt="JPEG")
+    other = _photo(tmp_path / "other.png", 3)
+    cache_path = tmp_path / "hashes.jsonl"
+    with StubServer() as server:
+        config = {
+            "openai_api_key": "test",
+            "openai_base_url": server.url,
+            "llm_model": "stub-model",
+            "image_cache": {"enabled": True, "path": str(cache_path)},
+        }
+        first = get_suggestions("", file_path=original, config=config)
+        assert get_suggestions("", file_path=copy, config=config) == first
+        get_suggestions("", file_path=other, config=config)
+        assert server.request_count == 2
+
+    # A new run finds the persisted hashes, per naming convention
+    cache = ImageHashCache(path=str(cache_path))
+    assert len(cache) == 2
+    key = cache.hash(copy)
+    assert cache.lookup(key, "snake_case") == first
+    assert cache.lookup(key, "kebab-case") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_partial_suggestions_not_reused_for_full_request():
+    cache = ImageHashCache()
+    cache.add(0xFF, "snake_case", ["only_first"])
+    assert cache.lookup(0xFE, "snake_case", min_suggestions=3) is None
+    assert cache.lookup(0xFE, "snake_case") == ["only_first"]
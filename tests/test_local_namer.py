@@ -0,0 +1,113 @@
+import zipfile
+
+import fitz
+import toml
+
+from onomatool import cli
+from onomatool.local_namer import LocalNamer, markdown_heading
+from onomatool.naming import render_name
+
+
+def test_render_name_conventions():
+    words = ["Café", "Budget", "Review", "2024"]
+    assert render_name(words, "snake_case") == "cafe_budget_review_2024"
+    assert render_name(words, "kebab-case") == "cafe-budget-review-2024"
+    assert render_name(words, "camelCase") == "cafeBudgetReview2024"
+    assert render_name(words, "PascalCase") == "CafeBudgetReview2024"
+    assert render_name(words, "natural language") == "Cafe Budget Review 2024"
+    assert render_name(["2024", "plan"], "PascalCase") is None
+    assert render_name(["!!"], "snake_case") is None
+    assert render_name(words, "unregistered convention") is None
+
+
+def test_markdown_heading():
+    assert markdown_heading("intro\n# Platform Roadmap #\nbody") == "Platform Roadmap"
+    assert markdown_heading("Release Notes\n=====\n\n# Later") == "Release Notes"
+    assert markdown_heading("## Only a subheading") is None
+
+
+def test_confident_heading_is_named_locally():
+    namer = LocalNamer(min_words=3, max_words=8)
+    markdown = "# Quarterly Budget Review for the Platform Team\n\nDetails."
+    suggestions = namer.try_name("notes.md", markdown)
+    assert suggestions[0] == "quarterly_budget_review_for_the_platform_team"
+    assert namer.named == 1
+
+
+def test_short_title_is_padded_with_keywords_and_may_escalate():
+    namer = LocalNamer(min_words=5, min_confidence=0.7)
+    markdown = (
+        "# Roadmap\n\n" + "Kubernetes migration plan for kubernetes clusters. " * 5
+    )
+    suggestions, confidence = namer.suggest("plan.md", markdown)
+    assert suggestions[0].startswith("roadmap_kubernetes")
+    assert confidence < 0.7
+    assert namer.try_name("plan.md", markdown) is None
+    assert namer.escalated == 1
+
+
+def test_junk_metadata_is_ignored(tmp_path):
+    path = tmp_path / "report.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Hello")
+    doc.set_metadata({"title": "Microsoft Word - report.docx"})
+    doc.save(path)
+    doc.close()
+    assert LocalNamer().candidates(str(path), "") == []
+
+
+def test_metadata_titles(tmp_path):
+    pdf_path = tmp_path / "scan.pdf"
+    doc = fitz.open()
+    doc.new_page()
+    doc.set_metadata({"title": "Annual Security Audit Findings Summary"})
+    doc.save(pdf_path)
+    doc.close()
+
+    docx_path = tmp_path / "doc.docx"
+    with zipfile.ZipFile(docx_path, "w") as z:
+        z.writestr(
+            "docProps/core.xml",
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/'
+            '2006/metadata/core-properties" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            "<dc:title>Vendor Contract Renewal Proposal</dc:title></cp:coreProperties>",
+        )
+
+    eml_path = tmp_path / "mail.eml"
+    eml_path.write_text("Subject: Re: Fwd: Offsite Planning Agenda\n\nBody\n")
+    html_path = tmp_path / "page.html"
+    html_path.write_text("<html><title>Team Onboarding &amp; Setup</title></html>")
+
+    namer = LocalNamer(min_words=1)
+    assert namer.candidates(str(pdf_path), "") == [
+        ("pdf_title", ["annual", "security", "audit", "findings", "summary"])
+    ]
+    assert namer.candidates(str(docx_path), "")[0][1][0] == "vendor"
+    assert namer.candidates(str(eml_path), "")[0] == (
+        "email_subject",
+        ["offsite", "planning", "agenda"],
+    )
+    assert namer.candidates(str(html_path), "")[0][1] == ["team", "onboarding", "setup"]
+
+
+def test_cli_local_naming_skips_llm(tmp_path, capsys):
+    note = tmp_path / "a.md"
+    note.write_text("# Incident Review for the Payments Outage\n\nTimeline.")
+    config_path = tmp_path / "onomarc.toml"
+    # An unreachable endpoint: the file must be named without any LLM call
+    config_path.write_text(
+        toml.dumps(
+            {
+                "openai_base_url": "http://127.0.0.1:9",
+                "openai_api_key": "test",
+                "min_filename_words": 3,
+            }
+        )
+    )
+    exit_code = cli.main(
+        [str(note), "--config", str(config_path), "--dry-run", "--local-naming"]
+    )
+    out = capsys.readouterr().out
+    assert exit_code == 0
+    assert "a.md --dry-run-> incident_review_for_the_payments_outage.md" in out
+    assert "Named 1 files locally, 0 escalated to the LLM" in out
@@ -0,0 +1,54 @@
+from onomatool import memory
+from onomatool.memory import MemoryGuard, current_rss_mb
+
+
+def test_current_rss_mb_positive():
+    assert current_rss_mb() > 0
+
+
+def test_current_rss_mb_without_proc_or_resource(monkeypatch):
+    def no_proc(*args, **kwargs):
+        raise OSError("no /proc")
+
+    monkeypatch.setattr("builtins.open", no_proc)
+    assert current_rss_mb() > 0
+    monkeypatch.setattr(memory, "resource", None)
+    assert current_rss_mb() == 0.0
+
+
+def test_guard_disabled_without_limit():
+    guard = MemoryGuard(None, rss_func=lambda: 10_000)
+    assert guard.check() is True
+    assert guard.pressure_events == 0
+
+
+def test_guard_runs_relief_until_below_limit():
+    rss = [500.0]
+    released = []
+
+    def relieve():
+        released.append(True)
+        rss[0] = 100.0
+
+    guard = MemoryGuard(200, rss_func=lambda: rss[0])
+    guard.add_relief(relieve)
+    assert guard.check() is True
+    assert released == [True]
+    assert guard.pressure_events == 1
+
+
+def test_guard_stops_relief_once_it_fails(capsys):
+    rss = [500.0]
+    released = []
+    guard = MemoryGuard(100, rss_func=lambda: rss[0])
+    guard.add_relief(lambda: released.append(True))
+    assert guard.check() is False
+    assert "[MEMORY]" in capsys.readouterr().out
+    # Relief is not repeated for every file at the same level...
+    assert guard.check() is False
+    assert released == [True]
+    # ...only once memory grows past where it failed
+    rss[0] = 600.0
+    assert guard.check() is False
+    assert released == [True, True]
+    assert guard.pressure_events == 2
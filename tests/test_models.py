@@ -0,0 +1,78 @@
+import pytest
+import toml
+from pydantic import ValidationError
+
+from onomatool.config import get_config
+from onomatool.llm_integration import get_pydantic_model_and_schema
+from onomatool.models import (
+    SnakeCaseFilenameSuggestions,
+    get_naming_convention,
+    register_config_conventions,
+    register_naming_convention,
+)
+
+
+def test_builtin_conventions_are_cached():
+    convention = get_naming_convention("kebab-case")
+    assert convention.matches("my-file") and not convention.matches("my_file")
+    model, schema = get_pydantic_model_and_schema("kebab-case")
+    assert model is convention.model
+    assert schema is convention.response_format
+    assert get_pydantic_model_and_schema("no-such-convention")[0] is (
+        SnakeCaseFilenameSuggestions
+    )
+
+
+def test_builtin_validation_messages():
+    with pytest.raises(ValidationError, match="'Bad Name' is not valid snake_case"):
+        SnakeCaseFilenameSuggestions(suggestions=["good_name", "Bad Name", "other"])
+
+
+def test_custom_convention_from_config():
+    register_config_conventions(
+        {
+            "naming_conventions": {
+                "SCREAMING_SNAKE": {
+                    "pattern": "^[A-Z0-9]+(_[A-Z0-9]+)*$",
+                    "description": "Upper case words joined by underscores",
+                }
+            }
+        }
+    )
+    convention = get_naming_convention("SCREAMING_SNAKE")
+    model, schema = get_pydantic_model_and_schema("SCREAMING_SNAKE")
+    assert model.__name__ == "ScreamingSnakeFilenameSuggestions"
+    assert schema["json_schema"]["schema"]["description"] == (
+        "Upper case words joined by underscores"
+    )
+    model(suggestions=["ANNUAL_REPORT", "BUDGET", "Q3_NOTES"])
+    with pytest.raises(ValidationError):
+        model(suggestions=["annual_report", "BUDGET", "NOTES"])
+    # Registering the same convention again keeps the cached entry
+    assert (
+        register_naming_convention(
+            "SCREAMING_SNAKE",
+            "^[A-Z0-9]+(_[A-Z0-9]+)*$",
+            "Upper case words joined by underscores",
+        )
+        is convention
+    )
+
+
+def test_invalid_custom_convention():
+    with pytest.raises(ValueError, match="needs a 'pattern'"):
+        register_config_conventions({"naming_conventions": {"broken": {}}})
+    with pytest.raises(ValueError, match="Invalid pattern"):
+        register_naming_convention("broken", "([a-z")
+
+
+def test_custom_convention_from_config_file(tmp_path):
+    config_path = tmp_path / "config.toml"
+    config_path.write_text(
+        toml.dumps(
+            {"naming_conventions": {"SCREAM": {"pattern": "^[A-Z]+(_[A-Z]+)*$"}}}
+        )
+    )
+    config = get_config(str(config_path))
+    register_config_conventions(config)
+    assert get_naming_convention("SCREAM").matches("ANNUAL_REPORT")
@@ -0,0 +1,197 @@
+import pytest
+
+from onomatool import cli, testing
+from onomatool.llm_integration import get_suggestions, repair_suggestions
+from onomatool.models import (
+    get_model_for_naming_convention,
+    get_naming_convention,
+    get_unchecked_model,
+    register_naming_convention,
+)
+from onomatool.naming import (
+    RENDERABLE_CONVENTIONS,
+    limit_words,
+    name_words,
+    render_for_config,
+    render_name,
+    repair_name,
+    repair_names,
+)
+from onomatool.testing import StubServer
+
+WORDS = ["quarterly", "budget", "review", "q3"]
+RENDERED = {
+    "snake_case": "quarterly_budget_review_q3",
+    "kebab-case": "quarterly-budget-review-q3",
+    "dot.notation": "quarterly.budget.review.q3",
+    "camelCase": "quarterlyBudgetReviewQ3",
+    "PascalCase": "QuarterlyBudgetReviewQ3",
+    "natural language": "Quarterly Budget Review Q3",
+}
+
+
+@pytest.mark.parametrize("convention", RENDERABLE_CONVENTIONS)
+def test_render_every_convention_round_trips(convention):
+    name = render_name(WORDS, convention)
+    assert name == RENDERED[convention]
+    assert get_naming_convention(convention).matches(name)
+    assert name_words(name) == WORDS
+    for other in RENDERABLE_CONVENTIONS:
+        assert render_name(name_words(name), other) == RENDERED[other]
+
+
+def test_camel_case_joins_numbers_to_previous_word():
+    name = render_name(["budget", "2024"], "camelCase")
+    assert name == "budget2024"
+    assert render_name(name_words(name), "snake_case") == "budget2024"
+
+
+def test_word_limits():
+    assert limit_words(["Café report", "12345678901", "v12"]) == [
+        "cafe",
+        "report",
+        "1234567890",
+        "v12",
+    ]
+    assert limit_words(WORDS, max_words=2) == ["quarterly", "budget"]
+    assert render_name(WORDS, "snake_case", min_words=6) is None
+    assert render_name(WORDS, "snake_case", max_words=3) == "quarterly_budget_review"
+    assert render_name(["scan", "20240101123045"], "snake_case") == "scan_2024010112"
+    config = {"naming_convention": "kebab-case", "min_filename_words": 2}
+    assert render_for_config(["one"], config) is None
+    assert render_for_config(["one", "two"], config) == "one-two"
+
+
+def test_word_limits_applied_to_llm_output():
+    config = {"min_filename_words": 3, "max_filename_words": 4}
+    suggestions = [
+        "short_name",
+        "a_much_longer_name_than_allowed",
+        "id_123456789012_x",
+    ]
+    assert repair_suggestions(suggestions, config, "snake_case") == [
+        "a_much_longer_name",
+        "id_1234567890_x",
+    ]
+    # Short names are kept when nothing longer is left
+    assert repair_suggestions(["a_b"], config, "snake_case") == ["a_b"]
+
+
+def test_near_miss_names_repaired():
+    assert repair_name("Quarterly_Report 2024", "snake_case") == "quarterly_report_2024"
+    assert repair_name("  Résumé -- Jane  DOE ", "kebab-case") == "resume-jane-doe"
+    assert repair_name("budget report.pdf", "PascalCase") == "BudgetReportPdf"
+    assert (
+        repair_name("invoice_20250101123456_for_acme", "snake_case")
+        == "invoice_2025010112_for_acme"
+    )
+    assert repair_name("!!!", "snake_case") is None
+    register_naming_convention("upper_words", r"^[A-Z]+( [A-Z]+)*$")
+    assert repair_name(" CAFÉ   MENU ", "upper_words") == "CAFE MENU"
+    assert repair_name("cafe menu", "upper_words") is None
+
+    names, notes = repair_names(
+        ["Budget Review Notes", "budget_review_notes", "", "notes"],
+        "snake_case",
+        min_words=2,
+    )
+    assert names == ["budget_review_notes"]
+    assert notes == [
+        "'Budget Review Notes' -> 'budget_review_notes'",
+        "dropped duplicate 'budget_review_notes'",
+        "dropped unusable ''",
+        "dropped 'notes' (under 2 words)",
+    ]
+    assert repair_names(["ok_name"], "snake_case") == (["ok_name"], [])
+
+
+def test_valid_names_pass_through_unchanged():
+    for name, convention in [
+        ("PDFReportSummaryForClientReview", "PascalCase"),
+        ("iPhone Photo Backup From Vacation Trip", "natural language"),
+        ("quarterly_report_2024", "snake_case"),
+    ]:
+        assert repair_name(name, convention, max_words=15) == name
+    # Valid names over the word limit are still cut
+    assert repair_name("OneTwoThreeFour", "PascalCase", max_words=2) == "OneTwo"
+
+
+def test_unchecked_model_sends_the_same_schema():
+    for convention in RENDERABLE_CONVENTIONS:
+        assert (
+            get_unchecked_model(convention).model_json_schema()
+            == get_model_for_naming_convention(convention).model_json_schema()
+        )
+
+
+def test_near_miss_response_repaired_without_retry(monkeypatch, capsys):
+    answer = ["Quarterly_Report 2024", "quarterly report 2024", "Q3 Café Summary"]
+    monkeypatch.setattr(testing, "stub_suggestions", lambda *a, **k: answer)
+    with StubServer() as server:
+        config = {
+            "openai_api_key": "test",
+            "openai_base_url": server.url,
+            "min_filename_words": 3,
+        }
+        suggestions = get_suggestions("Q3 report", verbose_level=1, config=config)
+        assert server.request_count == 1
+    assert suggestions == ["quarterly_report_2024", "q3_cafe_summary"]
+    assert "Repaired suggestion: 'Quarterly_Report 2024'" in capsys.readouterr().out
+
+
+def test_json_fallback_accepts_any_number_of_usable_names(monkeypatch):
+    # Too many names fails the structured parse; the fallback repairs them
+    answer = ["quarterly_report", "Quarterly Report", "q3_summary", "notes_q3"]
+    monkeypatch.setattr(testing, "stub_suggestions", lambda *a, **k: answer)
+    with StubServer() as server:
+        config = {
+            "openai_api_key": "test",
+            "openai_base_url": server.url,
+            "min_filename_words": 2,
+        }
+        suggestions = get_suggestions("Q3 report", config=config)
+        assert server.request_count == 2
+    assert suggestions == ["quarterly_report", "q3_summary", "notes_q3"]
+
+
+def test_unusable_response_still_retried(monkeypatch):
+    monkeypatch.setattr(testing, "stub_suggestions", lambda *a, **k: ["", "?", "!"])
+    with StubServer() as server:
+        config = {"openai_api_key": "test", "openai_base_url": server.url}
+        with pytest.raises(RuntimeError, match="no usable suggestions"):
+            get_suggestions("Q3 report", config=config)
+        assert server.request_count == 2
+
+
+def test_word_cache_renders_other_conventions_locally(tmp_path):
+    with StubServer() as server:
+        config = {
+            "openai_api_key": "test",
+            "openai_base_url": server.url,
+            "llm_model": "stub-model",
+            "word_cache": {"enabled": True, "path": str(tmp_path / "words.jsonl")},
+        }
+        snake = get_suggestions("Minutes of the board meeting", config=config)
+        kebab = get_suggestions(
+            "Minutes of the board meeting",
+            config={**config, "naming_convention": "kebab-case"},
+        )
+        assert server.request_count == 1
+    assert kebab == [name.replace("_", "-") for name in snake]
+
+
+def test_reformat_command(tmp_path, capsys):
+    (tmp_path / "annual_budget_review.pdf").write_text("x")
+    (tmp_path / "Team Offsite Plan.md").write_text("x")
+    (tmp_path / "already.dotted.txt").write_text("x")
+    pattern = str(tmp_path / "*")
+    assert cli.main(["reformat", pattern, "--to", "dot.notation", "--dry-run"]) == 0
+    assert "2 would be renamed, 1 unchanged" in capsys.readouterr().out
+    assert (tmp_path / "annual_budget_review.pdf").exists()
+
+    assert cli.main(["reformat", pattern, "--to", "dot.notation"]) == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "already.dotted.txt",
+        "annual.budget.review.pdf",
+        "team.offsite.plan.md",
+    ]
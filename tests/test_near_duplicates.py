@@ -0,0 +1,78 @@
+import random
+
+from onomatool.near_duplicates import (
+    NearDuplicateIndex,
+    NearDuplicateNamer,
+    adapt_suggestion,
+    choose_bands,
+    minhash,
+    shingles,
+    similarity,
+)
+from onomatool.testing import STUB_WORDS, StubServer
+
+
+def _body(seed: int, lines: int = 40) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(STUB_WORDS) for _ in range(10)) for _ in range(lines)]
+
+
+def _report(month: str, changed: int = 0) -> str:
+    body = _body(1)
+    for i in range(changed):
+        body[i * 3] = " ".join(_body(100 + i, 1))
+    return f"# Sales report {month} 2024\n\n" + "\n".join(body)
+
+
+def test_signature_similarity():
+    march, april = (
+        minhash(shingles(_report("march"))),
+        minhash(shingles(_report("april"))),
+    )
+    unrelated = minhash(shingles("\n".join(_body(2))))
+    assert similarity(march, april) > 0.9
+    assert similarity(march, unrelated) < 0.2
+    assert choose_bands(0.7) == 16
+
+
+def test_adapt_suggestion_swaps_dates():
+    markdown = "Sales report for April 2025, draft v3"
+    assert (
+        adapt_suggestion("march_2024_sales_report_v2", markdown, "snake_case")
+        == "april_2025_sales_report_v3"
+    )
+    assert adapt_suggestion("SalesReport", markdown, "PascalCase") == "SalesReport"
+
+
+def test_near_copy_reuses_adapted_name():
+    namer = NearDuplicateNamer(NearDuplicateIndex(0.7))
+    namer.remember("march.md", _report("march"), ["march_2024_sales_report"] * 3)
+    assert (
+        namer.try_name("april.md", _report("april"), config={})
+        == ["april_2024_sales_report"] * 3
+    )
+    assert namer.try_name("other.md", "\n".join(_body(2)), config={}) is None
+    assert namer.reused == 1
+
+
+def test_similar_document_sends_differences_only(tmp_path):
+    index_path = tmp_path / "index.jsonl"
+    config = {"near_duplicates": {"index_path": str(index_path)}}
+    namer = NearDuplicateNamer.from_config(config)
+    namer.remember("march.md", _report("march"), ["march_2024_sales_report"] * 3)
+    # A new run loads the persisted index
+    namer = NearDuplicateNamer.from_config(config)
+    assert len(namer.index) == 1
+
+    edited = _report("march", changed=4)
+    with StubServer() as server:
+        llm_config = {
+            "openai_api_key": "test",
+            "openai_base_url": server.url,
+            "llm_model": "stub-model",
+        }
+        suggestions = namer.try_name("edited.md", edited, llm_config)
+        prompt = server.requests[-1]["messages"][-1]["content"]
+    assert namer.diff_prompts == 1 and len(suggestions) == 3
+    assert "march_2024_sales_report" in prompt
+    assert len(prompt) < len(edited) / 2
@@ -0,0 +1,55 @@
+from onomatool.normalize import normalize_content, normalize_for_config
+
+
+def _pages(count: int = 4) -> str:
+    pages = []
+    for number in range(1, count + 1):
+        pages.append(
+            "ACME Corp Confidential - Internal Use Only\n\n"
+            f"Body text of page {number} about the warehouse audit.\n\n"
+            "Printed 2024-05-01   by the audit system\n\n"
+            f"Page {number} of {count}\n\f"
+        )
+    return "".join(pages)
+
+
+def test_repeated_headers_and_page_numbers_removed():
+    text = normalize_content(_pages(), "audit.pdf")
+    assert text.count("ACME Corp Confidential") == 1
+    assert text.count("Printed 2024-05-01 by the audit system") == 1
+    assert "Page " not in text
+    for number in range(1, 5):
+        assert f"page {number} about the warehouse audit" in text
+    # Code keeps its repeated lines
+    code = "def a():\n    return None\n" * 3
+    assert normalize_content(code, "module.py").count("return None") == 3
+
+
+def test_data_uris_urls_and_tables_abbreviated():
+    payload = "iVBORw0KGgo" * 50
+    url = "https://tracker.example.com/click/" + "a" * 80 + "?utm_source=mail"
+    rows = "\n".join(f"| item {i} | {i * 3} |" for i in range(200))
+    text = normalize_content(
+        f"![Logo](data:image/png;base64,{payload})\n"
+        f'<img src="data:image/png;base64,{payload}">\n'
+        f"See {url} for details.\n\n"
+        f"| name | qty |\n|---|---|\n{rows}\n\n"
+        "The   end.\n\n\n\n",
+        "report.docx",
+    )
+    assert payload not in text
+    assert "[image: Logo]" in text
+    assert 'src="data:image/png,…"' in text
+    assert "https://tracker.example.com/click…" in text
+    assert "| item 4 | 12 |\n| … 195 more rows |" in text
+    assert "item 5 " not in text
+    assert text.endswith("The end.")
+
+
+def test_year_lines_survive_and_config_switch():
+    assert normalize_content("Annual report\n2024\n", "report.pdf") == (
+        "Annual report\n2024"
+    )
+    raw = "a  b\n\n\n\nc"
+    assert normalize_for_config(raw, "x.md", {"normalize_content": False}) == raw
+    assert normalize_for_config(raw, "x.md", {}) == "a b\n\nc"
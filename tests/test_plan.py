@@ -0,0 +1,95 @@
+import json
+
+from onomatool.cli import main
+from onomatool.plan import (
+    PlannedRename,
+    PlannedRenames,
+    PlanWriter,
+    apply_plan,
+    file_fingerprint,
+    read_plan,
+)
+
+MOCK_CONFIG = "tests/mock_config.toml"
+
+
+def _write_plan(tmp_path, entries):
+    plan_path = tmp_path / "plan.jsonl"
+    with PlanWriter(str(plan_path), "snake_case") as writer:
+        for file_path, suggestions in entries:
+            writer.write(str(file_path), suggestions)
+    return plan_path
+
+
+def test_plan_records_fingerprint(tmp_path):
+    src = tmp_path / "a.txt"
+    src.write_text("data")
+    plan_path = _write_plan(tmp_path, [(src, ["one", "two", "three"])])
+    (record,) = list(read_plan(str(plan_path)))
+    assert record["suggestions"] == ["one", "two", "three"]
+    assert record["fingerprint"] == file_fingerprint(str(src))
+
+
+def test_apply_plan_bulk_conflicts(tmp_path, monkeypatch):
+    monkeypatch.setattr("builtins.print", lambda *a, **k: None)
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("a")
+    b.write_text("b")
+    (tmp_path / "report.txt").write_text("existing")
+    plan_path = _write_plan(
+        tmp_path, [(a, ["report", "x", "y"]), (b, ["report", "x", "y"])]
+    )
+    stats = apply_plan(str(plan_path))
+    assert stats["renamed"] == 2
+    assert (tmp_path / "report_2.txt").read_text() == "a"
+    assert (tmp_path / "report_3.txt").read_text() == "b"
+
+
+def test_apply_plan_skips_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr("builtins.print", lambda *a, **k: None)
+    src = tmp_path / "a.txt"
+    src.write_text("data")
+    plan_path = _write_plan(tmp_path, [(src, ["renamed", "x", "y"])])
+    src.write_text("changed!")
+    stats = apply_plan(str(plan_path))
+    assert stats == {"renamed": 0, "skipped": 1, "missing": 0}
+    assert src.exists()
+
+
+def test_apply_plan_uses_choice(tmp_path, monkeypatch):
+    monkeypatch.setattr("builtins.print", lambda *a, **k: None)
+    src = tmp_path / "a.md"
+    src.write_text("data")
+    plan_path = _write_plan(tmp_path, [(src, ["one", "two", "three"])])
+    record = json.loads(plan_path.read_text())
+    record["choice"] = 2
+    plan_path.write_text(json.dumps(record) + "\n")
+    apply_plan(str(plan_path))
+    assert (tmp_path / "three.md").exists()
+
+
+def test_cli_plan_out_and_apply(tmp_path):
+    src = tmp_path / "note.md"
+    src.write_text("# Note\nSome content")
+    plan_path = tmp_path / "plan.jsonl"
+    assert main([str(src), "--config", MOCK_CONFIG, "--plan-out", str(plan_path)]) == 0
+    assert src.exists()
+    assert main(["apply", str(plan_path)]) == 0
+    assert (tmp_path / "mock_file_one.md").exists()
+
+
+def test_planned_renames_spill_to_disk():
+    planned = PlannedRenames(max_in_memory=2)
+    for i in range(5):
+        planned.append((f"docs/file_{i}.txt", f"name_{i}"))
+    assert len(planned) == 5
+    assert planned._spilled == 4
+    assert list(planned) == [(f"docs/file_{i}.txt", f"name_{i}") for i in range(5)]
+    planned.close()
+
+
+def test_planned_rename_interns_directory():
+    a = PlannedRename("some/long/directory/a.txt", "x")
+    b = PlannedRename("/".join(["some", "long", "directory", "b.txt"]), "y")
+    assert a.directory is b.directory
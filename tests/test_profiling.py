@@ -0,0 +1,62 @@
+import json
+
+from onomatool.cli import main
+from onomatool.profiling import PROFILER, Profiler, span
+
+MOCK_CONFIG = "tests/mock_config.toml"
+
+
+def test_span_disabled_records_nothing():
+    profiler = Profiler()
+    with profiler.span("stage"):
+        pass
+    assert profiler.records == []
+
+
+def test_stage_stats_and_histogram():
+    profiler = Profiler()
+    profiler.enabled = True
+    for _ in range(3):
+        with profiler.span("llm", provider="openai", model="gpt-4o"):
+            pass
+    with profiler.span("extract"):
+        pass
+    stats = profiler.stage_stats()
+    assert stats["llm"]["count"] == 3
+    assert stats["extract"]["count"] == 1
+    assert profiler.llm_histograms()["openai/gpt-4o"][0] == 3
+    assert "LLM latency openai/gpt-4o" in profiler.format_summary()
+
+
+def test_span_records_errors():
+    profiler = Profiler()
+    profiler.enabled = True
+    try:
+        with profiler.span("llm"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert profiler.records[0][4]["error"] == "RuntimeError"
+
+
+def test_cli_profile_trace(tmp_path, capsys):
+    src = tmp_path / "note.md"
+    src.write_text("# Note\nSome content")
+    trace_path = tmp_path / "trace.json"
+    try:
+        result = main(
+            [str(src), "--config", MOCK_CONFIG, "--profile-trace", str(trace_path)]
+        )
+    finally:
+        PROFILER.enabled = False
+    assert result == 0
+    assert "Profile:" in capsys.readouterr().out
+    names = {
+        event["name"] for event in json.loads(trace_path.read_text())["traceEvents"]
+    }
+    assert {"glob", "file", "extract", "rename"} <= names
+    # Global helper is a no-op again once profiling is disabled
+    before = len(PROFILER.records)
+    with span("noop"):
+        pass
+    assert len(PROFILER.records) == before
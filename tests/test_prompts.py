@@ -0,0 +1,65 @@
+from PIL import Image
+
+from onomatool.llm_integration import get_suggestions
+from onomatool.prompts import DEFAULT_SYSTEM_PROMPT, get_prompt_parts
+from onomatool.testing import PrefixCache, StubServer
+from onomatool.usage import LEDGER
+
+
+def _config(server_url, **extra):
+    return {
+        "default_provider": "openai",
+        "openai_base_url": server_url,
+        "openai_api_key": "test",
+        "llm_model": "stub-model",
+        "naming_convention": "kebab-case",
+    } | extra
+
+
+def test_custom_template_is_split_at_content():
+    prefix, suffix = get_prompt_parts(
+        "snake_case",
+        {
+            "system_prompt": "SYS",
+            "user_prompt": "Name it ({naming_convention}): {content} END",
+        },
+    )
+    assert prefix == "SYS\n\nName it (snake_case):"
+    assert suffix == " END"
+
+
+def test_convention_is_part_of_prefix():
+    prefix, suffix = get_prompt_parts("camelCase", {})
+    assert prefix.startswith(DEFAULT_SYSTEM_PROMPT)
+    assert prefix.endswith("Naming convention: camelCase")
+    assert suffix == ""
+
+
+def test_requests_share_static_prefix(tmp_path):
+    image_path = tmp_path / "photo.png"
+    Image.new("RGB", (8, 8), "red").save(image_path)
+    with StubServer() as server:
+        config = _config(server.url)
+        get_suggestions("First document", config=config)
+        get_suggestions("A different, longer second document", config=config)
+        get_suggestions("", file_path=str(image_path), config=config)
+        first, second, image = [request["messages"] for request in server.requests]
+    assert first[0] == second[0]
+    assert first[0]["role"] == "system"
+    assert first[1]["content"] == "First document"
+    # Image calls carry the system prompt too, ahead of the image part
+    assert image[0]["content"].startswith(DEFAULT_SYSTEM_PROMPT)
+    assert image[1]["content"][0]["type"] == "image_url"
+
+
+def test_cached_tokens_are_reported(capsys):
+    LEDGER.reset()
+    with StubServer() as server:
+        server.prefix_cache = PrefixCache(min_tokens=64, block_tokens=32)
+        config = _config(server.url)
+        with LEDGER.capture() as calls:
+            get_suggestions("Budget review notes", config=config)
+            get_suggestions("Vendor contract draft", verbose_level=1, config=config)
+    assert calls[0]["cached_tokens"] == 0
+    assert calls[1]["cached_tokens"] >= 64
+    assert f"({calls[1]['cached_tokens']} cached)" in capsys.readouterr().out
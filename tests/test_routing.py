@@ -0,0 +1,97 @@
+import pytest
+
+from onomatool import llm_integration
+from onomatool.config import Config
+from onomatool.llm_integration import get_suggestions
+from onomatool.routing import is_generic_name, is_hard_file, model_tiers
+from onomatool.testing import StubServer
+
+
+def test_generic_names():
+    assert is_generic_name("document_file_one")
+    assert is_generic_name("untitledImage2")
+    assert is_generic_name("Scan Page 3")
+    assert not is_generic_name("quarterly_budget_review")
+    assert not is_generic_name("vendorContractDraft")
+
+
+def test_model_tiers_from_config():
+    assert model_tiers({"llm_model": "gpt-4o"}) == [
+        ("openai", "gpt-4o", {"llm_model": "gpt-4o"})
+    ]
+    config = Config(
+        {
+            "model_tiers": [
+                {"model": "small", "openai_base_url": "http://localhost:11434/v1"},
+                {"model": "gpt-4o"},
+            ]
+        }
+    )
+    tiers = model_tiers(config)
+    assert model_tiers(config) is tiers
+    assert [(provider, model) for provider, model, _ in tiers] == [
+        ("openai", "small"),
+        ("openai", "gpt-4o"),
+    ]
+    assert tiers[0][2]["openai_base_url"] == "http://localhost:11434/v1"
+    assert tiers[1][2]["openai_base_url"] == "https://api.openai.com/v1"
+    with pytest.raises(ValueError, match="needs a 'model'"):
+        model_tiers({"model_tiers": [{"openai_base_url": "x"}]})
+
+
+def test_hard_files():
+    config = {"hard_file_types": [".PPTX"]}
+    assert is_hard_file("deck.pptx", config)
+    assert not is_hard_file("notes.md", config)
+    assert is_hard_file("report.pdf", config, page_images=3)
+
+
+def test_escalation(monkeypatch):
+    answers = {
+        "broken": RuntimeError("connection refused"),
+        "small": ["document_file_one", "document_file_two", "document_file_three"],
+        "invalid": ["Not Snake Case", "x", "y"],
+        "big": ["budget_review_notes", "budget_notes", "review_notes"],
+    }
+    calls = []
+
+    def fake_call_llm(request, config, verbose_level=0):
+        calls.append(request.model)
+        answer = answers[request.model]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(llm_integration, "call_llm", fake_call_llm)
+    config = {
+        "model_tiers": [
+            {"model": "broken"},
+            {"model": "small"},
+            {"model": "invalid"},
+            {"model": "big"},
+        ]
+    }
+    assert get_suggestions("notes", config=config)[0] == "budget_review_notes"
+    assert calls == ["broken", "small", "invalid", "big"]
+
+    calls.clear()
+    get_suggestions("notes", config=config, hard=True)
+    assert calls == ["big"]
+
+
+def test_tiers_use_their_own_endpoint():
+    with StubServer() as cheap, StubServer() as flagship:
+        config = Config(
+            {
+                "openai_api_key": "test",
+                "model_tiers": [
+                    {"model": "cheap", "openai_base_url": cheap.url},
+                    {"model": "flagship", "openai_base_url": flagship.url},
+                ],
+            }
+        )
+        get_suggestions("Budget review notes", config=config)
+        assert (cheap.request_count, flagship.request_count) == (1, 0)
+        get_suggestions("Budget review notes", config=config, hard=True)
+        assert (cheap.request_count, flagship.request_count) == (1, 1)
+        assert flagship.requests[-1]["model"] == "flagship"
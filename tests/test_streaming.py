@@ -0,0 +1,65 @@
+import json
+import time
+
+from onomatool.llm_integration import get_suggestions
+from onomatool.streaming import SuggestionStreamParser
+from onomatool.testing import StubServer
+
+
+def test_parser_yields_suggestions_as_they_complete():
+    text = json.dumps({"suggestions": ["quarterly_report", 'say "hi"', "cé"]})
+    parser = SuggestionStreamParser()
+    completed = []
+    for i in range(len(text)):
+        completed.append(parser.feed(text[i]))
+    assert parser.suggestions == ["quarterly_report", 'say "hi"', "cé"]
+    assert parser.done
+    # Each suggestion is reported once, by the piece that closed its string
+    assert sum(completed, []) == parser.suggestions
+    assert [i for i, c in enumerate(completed) if c][0] == text.index('t", ') + 1
+
+
+def test_parser_waits_for_key_and_unterminated_strings():
+    parser = SuggestionStreamParser()
+    assert parser.feed('{"sugges') == []
+    assert parser.feed('tions": ["annual_bud') == []
+    assert parser.feed('get", "x') == ["annual_budget"]
+    assert not parser.done
+
+
+def _config(server, **settings):
+    return {
+        "openai_api_key": "test",
+        "openai_base_url": server.url,
+        "llm_model": "stub-model",
+    } | settings
+
+
+def test_first_only_cancels_the_stream():
+    with StubServer(token_latency=0.02) as server:
+        start = time.perf_counter()
+        full = get_suggestions("Budget notes", config=_config(server))
+        full_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first = get_suggestions("Budget notes", config=_config(server), first_only=True)
+        first_elapsed = time.perf_counter() - start
+
+        assert len(full) == 3
+        assert first == full[:1]
+        assert server.requests[-1]["stream"] is True
+        assert first_elapsed < full_elapsed
+        deadline = time.monotonic() + 2
+        while not server.cancelled_streams and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server.cancelled_streams == 1
+
+
+def test_first_suggestion_only_setting_and_opt_out():
+    with StubServer() as server:
+        config = _config(server, first_suggestion_only=True)
+        assert len(get_suggestions("Budget notes", config=config)) < 3
+
+        config = _config(server, first_suggestion_only=True, stream_suggestions=False)
+        assert len(get_suggestions("Budget notes", config=config)) == 3
+        assert not server.requests[-1].get("stream")
@@ -0,0 +1,87 @@
+import json
+
+import httpx
+import pytest
+from openai import OpenAI
+
+from onomatool.models import KebabCaseFilenameSuggestions
+from onomatool.testing import PrefixCache, StubServer, make_latency_sampler
+
+
+def _client(server, max_retries=0):
+    return OpenAI(base_url=server.url, api_key="test", max_retries=max_retries)
+
+
+def test_structured_parse_and_usage():
+    with StubServer() as server:
+        response = _client(server).beta.chat.completions.parse(
+            model="stub-model",
+            messages=[{"role": "user", "content": "hello"}],
+            response_format=KebabCaseFilenameSuggestions,
+        )
+    parsed = response.choices[0].message.parsed
+    assert len(parsed.suggestions) == 3
+    assert all("-" in s for s in parsed.suggestions)
+    assert response.usage.prompt_tokens > 0
+    assert response.usage.prompt_tokens_details.cached_tokens == 0
+
+
+def test_image_parts_are_counted():
+    with StubServer() as server:
+        _client(server).chat.completions.create(
+            model="stub-model",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": "name this"},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": "data:image/png;base64,AAAA"},
+                        },
+                    ],
+                }
+            ],
+        )
+        assert server.image_part_count == 1
+
+
+def test_scripted_faults_and_retry_after():
+    with StubServer(faults=[429, 503, 200], retry_after=0) as server:
+        response = httpx.post(
+            f"{server.url}/chat/completions", json={"model": "m", "messages": []}
+        )
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "0"
+        # The OpenAI client honours Retry-After and retries through the 503
+        result = _client(server, max_retries=2).chat.completions.create(
+            model="m", messages=[{"role": "user", "content": "x"}]
+        )
+        assert json.loads(result.choices[0].message.content)["suggestions"]
+        assert server.status_counts == {429: 1, 503: 1, 200: 1}
+        assert server.rate_limited_count == 1
+        assert server.error_count == 1
+
+
+def test_latency_samplers():
+    import random
+
+    rng = random.Random(1)
+    assert make_latency_sampler(0.5)(rng) == 0.5
+    assert make_latency_sampler("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= make_latency_sampler("uniform:0.1,0.2")(rng) <= 0.2
+    assert make_latency_sampler("lognormal:0.3,0.5")(rng) > 0
+    scripted = make_latency_sampler([0.1, 0.2])
+    assert [scripted(rng) for _ in range(3)] == [0.1, 0.2, 0.1]
+    with pytest.raises(ValueError):
+        make_latency_sampler("zipf:1")
+
+
+def test_prefix_cache_credits_shared_prefix():
+    cache = PrefixCache(min_tokens=128, block_tokens=64)
+    prefix = "static instructions " * 100
+    assert cache.lookup_and_store(prefix + "file one") == 0
+    cached = cache.lookup_and_store(prefix + "file two")
+    assert cached >= 128
+    assert cached <= len(prefix) // 4
+    assert cache.lookup_and_store("different " * 200) == 0
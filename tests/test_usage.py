@@ -0,0 +1,92 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from onomatool.bench import run_benchmark
+from onomatool.usage import (
+    UsageLedger,
+    estimate_cost,
+    get_pricing,
+    price_for_model,
+    usage_from_response,
+)
+
+
+def test_price_for_model_longest_prefix():
+    pricing = get_pricing()
+    assert price_for_model("gpt-4o-mini-2024-07-18", pricing) == pricing["gpt-4o-mini"]
+    assert price_for_model("gpt-4o-2024-08-06", pricing) == pricing["gpt-4o"]
+    assert price_for_model("llama3", pricing) is None
+
+
+def test_pricing_override_from_config():
+    pricing = get_pricing({"pricing": {"llama3": {"input": 0.0, "output": 0.0}}})
+    assert estimate_cost("llama3", 1000, 100, 0, pricing) == 0.0
+
+
+def test_estimate_cost_with_cached_tokens():
+    pricing = {"m": {"input": 2.0, "cached_input": 1.0, "output": 10.0}}
+    cost = estimate_cost("m", 1_000_000, 100_000, 500_000, pricing)
+    assert cost == 0.5 * 2.0 + 0.5 * 1.0 + 0.1 * 10.0
+
+
+def test_usage_from_openai_response():
+    response = SimpleNamespace(
+        usage=SimpleNamespace(
+            prompt_tokens=120,
+            completion_tokens=30,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=64),
+        )
+    )
+    assert usage_from_response(response) == (120, 30, 64)
+    assert usage_from_response(SimpleNamespace()) == (0, 0, 0)
+
+
+def test_ledger_attributes_calls_to_current_file():
+    ledger = UsageLedger()
+    ledger.current_file = "docs/report.pdf"
+    ledger.record("openai", "gpt-4o", "image", 100, 10, file_path="/tmp/page_1.png")
+    ledger.record("openai", "gpt-4o", "text", 200, 10, 100)
+    ledger.current_file = None
+    ledger.record("openai", "gpt-4o", "text", 50, 5, file_path="notes.md")
+    by_ext = ledger.aggregate("ext")
+    assert by_ext[".pdf"]["calls"] == 2
+    assert by_ext[".pdf"]["prompt_tokens"] == 300
+    assert by_ext[".md"]["calls"] == 1
+    totals = ledger.totals(get_pricing())
+    assert totals["calls"] == 3
+    assert totals["cached_tokens"] == 100
+    assert totals["cost"] > 0
+    # Per-call records (and the per-file breakdown) are off by default
+    assert ledger.records == []
+    assert ledger.aggregate("file") == {}
+
+
+def test_ledger_keeps_records_when_asked():
+    ledger = UsageLedger(keep_records=True)
+    with ledger.capture() as calls:
+        ledger.record("openai", "gpt-4o", "text", 100, 10, file_path="a.md")
+    ledger.record("openai", "gpt-4o-mini", "text", 50, 5, file_path="a.md")
+    assert [record["model"] for record in calls] == ["gpt-4o"]
+    assert len(ledger.records) == 2
+    by_file = ledger.aggregate("file", get_pricing())
+    assert by_file["a.md"]["calls"] == 2
+    by_model = ledger.aggregate("model", get_pricing())
+    assert by_file["a.md"]["cost"] == pytest.approx(
+        by_model["gpt-4o"]["cost"] + by_model["gpt-4o-mini"]["cost"]
+    )
+
+
+def test_usage_report_from_cli(tmp_path):
+    report_path = tmp_path / "usage.json"
+    report = run_benchmark(
+        files_per_type=2,
+        types=("text",),
+        extra_args=["--usage-report", str(report_path)],
+    )
+    assert report["exit_code"] == 0
+    usage = json.loads(report_path.read_text())
+    assert usage["totals"]["calls"] == 2
+    assert usage["totals"]["prompt_tokens"] > 0
+    assert set(usage["by_extension"]) == {".md"}
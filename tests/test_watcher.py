@@ -0,0 +1,76 @@
+import threading
+
+from onomatool.watcher import Debouncer, watch_directory
+
+
+def test_debouncer_waits_for_quiescence(tmp_path):
+    f = tmp_path / "scan.pdf"
+    f.write_text("partial")
+    debouncer = Debouncer(settle=1.0, require_close=False)
+    debouncer.touch(str(f), closed=False, now=0.0)
+    # First look only records the size/mtime snapshot
+    assert debouncer.ready(now=0.5) == []
+    assert debouncer.ready(now=0.9) == []
+    assert debouncer.ready(now=1.5) == [str(f)]
+    assert debouncer.pending == {}
+
+
+def test_debouncer_requires_close(tmp_path):
+    f = tmp_path / "scan.pdf"
+    f.write_text("data")
+    debouncer = Debouncer(settle=1.0, require_close=True)
+    debouncer.touch(str(f), closed=False, now=0.0)
+    debouncer.ready(now=0.0)
+    assert debouncer.ready(now=2.0) == []
+    debouncer.touch(str(f), closed=True, now=2.0)
+    debouncer.ready(now=2.0)
+    assert debouncer.ready(now=3.5) == [str(f)]
+
+
+def test_debouncer_drops_removed_files(tmp_path):
+    debouncer = Debouncer(settle=0.0)
+    debouncer.touch(str(tmp_path / "gone.tmp"), closed=True, now=0.0)
+    assert debouncer.ready(now=1.0) == []
+    assert debouncer.pending == {}
+
+
+def _watch_until(tmp_path, use_inotify):
+    batches = []
+    stop = threading.Event()
+
+    def handle_batch(paths):
+        batches.append(paths)
+        stop.set()
+
+    thread = threading.Thread(
+        target=watch_directory,
+        args=(str(tmp_path), handle_batch),
+        kwargs={
+            "settle": 0.05,
+            "use_inotify": use_inotify,
+            "poll_interval": 0.02,
+            "stop_event": stop,
+        },
+    )
+    thread.start()
+    # Give the watcher time to take its initial snapshot
+    threading.Event().wait(0.1)
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    thread.join(timeout=5)
+    stop.set()
+    return batches
+
+
+def test_watch_directory_polling(tmp_path):
+    (tmp_path / "existing.txt").write_text("ignored")
+    batches = _watch_until(tmp_path, use_inotify=False)
+    assert batches
+    assert {p.rsplit("/", 1)[-1] for p in batches[0]} <= {"a.txt", "b.txt"}
+    assert "existing.txt" not in " ".join(batches[0])
+
+
+def test_watch_directory_default_source(tmp_path):
+    batches = _watch_until(tmp_path, use_inotify=None)
+    assert batches
+    assert all(p.endswith(".txt") for p in batches[0])